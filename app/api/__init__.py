@@ -28,10 +28,15 @@ def create_app(config_class=None):
         "https://fantasy-sports-optimizer-steel.vercel.app",
     ])
 
+    # Fast JSON serialization and response compression
+    from app.api.responses import init_app as init_responses
+    init_responses(app)
+
     # Register API blueprints
     from app.api.routes import (
         health_bp, lines_bp, discrepancies_bp, filters_bp,
-        comparison_bp, parlay_bp, calculators_bp
+        comparison_bp, parlay_bp, calculators_bp, arbitrage_bp,
+        middles_bp, signals_bp, stream_bp, batch_bp, search_bp
     )
 
     app.register_blueprint(health_bp, url_prefix='/api')
@@ -41,6 +46,12 @@ def create_app(config_class=None):
     app.register_blueprint(comparison_bp, url_prefix='/api')
     app.register_blueprint(parlay_bp, url_prefix='/api')
     app.register_blueprint(calculators_bp, url_prefix='/api')
+    app.register_blueprint(arbitrage_bp, url_prefix='/api')
+    app.register_blueprint(middles_bp, url_prefix='/api')
+    app.register_blueprint(signals_bp, url_prefix='/api')
+    app.register_blueprint(stream_bp, url_prefix='/api')
+    app.register_blueprint(batch_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
 
     # Serve React frontend (for production - single server deployment)
     @app.route('/')
@@ -0,0 +1,285 @@
+"""
+Generation-aware response cache and conditional requests for read endpoints.
+
+The data behind /compare, /discrepancies, /parlay/ev-lines and the filter
+lists only changes when a sync commits. Responses are cached keyed by
+endpoint, normalized query parameters and the current data version, held in
+a byte-bounded LRU, and dropped as soon as a new sync is seen. Concurrent
+identical misses are collapsed so only one request does the work.
+
+Read endpoints also carry a strong ETag built from the same inputs, so a
+client that already holds the current representation gets a 304 before any
+query runs. With upcoming_only set, both are also keyed by the next game
+start, since the filter's result changes as games start.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, make_response, request
+from config import get_config
+from app.data_sources import get_data_version, on_sync
+from app.api.responses import etag_variants, negotiated_format
+from app.api.services.matchup_service import upcoming_key
+
+# How long a duplicate request waits for the in-flight one before computing itself
+SINGLE_FLIGHT_TIMEOUT = 30
+
+
+class ResponseCache:
+    """Byte-bounded LRU of serialized responses with single-flight misses."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def _check_version(self, version):
+        """Drop everything if the data version moved forward (caller holds the lock).
+
+        Versions only grow, so a request that read an older version (a slow
+        leader finishing after a sync) never resets the cache backwards.
+
+        Returns:
+            True if `version` is the cache's current version
+        """
+        if self.version is None or version > self.version:
+            self.entries.clear()
+            self.bytes_held = 0
+            self.version = version
+        return version == self.version
+
+    def _lookup(self, key, version):
+        """Entry for `key` at `version`, or None (caller holds the lock)."""
+        if not self._check_version(version):
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                self.hits += 1
+            return entry
+
+    def put(self, key, version, body, headers):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if not self._check_version(version):
+                return
+            if key in self.entries:
+                self.bytes_held -= len(self.entries.pop(key)[0])
+            self.entries[key] = (body, headers)
+            self.bytes_held += size
+            while self.bytes_held > self.max_bytes:
+                _, (old_body, _) = self.entries.popitem(last=False)
+                self.bytes_held -= len(old_body)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes_held = 0
+            self.version = None
+
+    def begin(self, key):
+        """Claim a miss. Returns (is_leader, event).
+
+        Only the leader is counted here; a follower is counted once, by
+        `follow`, as a hit or a miss depending on what it finds.
+        """
+        with self.lock:
+            event = self.in_flight.get(key)
+            if event is not None:
+                return False, event
+            self.misses += 1
+            event = self.in_flight[key] = threading.Event()
+            return True, event
+
+    def follow(self, key, version, event):
+        """Wait for the leader, then look the entry up (counted once)."""
+        event.wait(SINGLE_FLIGHT_TIMEOUT)
+        with self.lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def finish(self, key):
+        with self.lock:
+            event = self.in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes_held': self.bytes_held,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'data_version': self.version,
+            }
+
+
+response_cache = ResponseCache(get_config().RESPONSE_CACHE_MAX_BYTES)
+
+
+@on_sync
+def invalidate_response_cache(changes=None):
+    """Drop every cached response once a sync commits."""
+    response_cache.clear()
+
+
+def normalize_params(args, lists=(), lower=()):
+    """Build a canonical, hashable form of the query parameters.
+
+    Args:
+        args: Request query parameters (MultiDict)
+        lists: Comma-separated parameters whose order doesn't matter
+        lower: Parameters the service matches case-insensitively
+
+    Returns:
+        Tuple of (name, value) pairs, sorted by name
+    """
+    normalized = []
+    for name in sorted(args.keys()):
+        value = args.get(name, '')
+        if name in lists:
+            items = [item.strip() for item in value.split(',') if item.strip()]
+            if name in lower:
+                items = [item.lower() for item in items]
+            value = ','.join(sorted(set(items)))
+        else:
+            value = value.strip()
+            if name in lower:
+                value = value.lower()
+        if value:
+            normalized.append((name, value))
+    return tuple(normalized)
+
+
+def cached_response(lists=(), lower=()):
+    """Cache a JSON GET endpoint's successful responses per data version.
+
+    Only 200 responses are stored; errors always go through to the view.
+
+    Args:
+        lists: Comma-separated parameters to sort (e.g., 'books')
+        lower: Parameters the service already matches case-insensitively
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = get_data_version()
+            key = (request.endpoint, negotiated_format(), tuple(sorted(kwargs.items())),
+                   normalize_params(request.args, lists, lower), _upcoming_window())
+
+            entry = response_cache.get(key, version)
+            if entry is None:
+                leader, event = response_cache.begin(key)
+                if not leader:
+                    entry = response_cache.follow(key, version, event)
+
+            if entry is not None:
+                body, headers = entry
+                response = Response(body, status=200, headers=headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    headers = {'Content-Type': response.headers.get('Content-Type', 'application/json')}
+                    response_cache.put(key, version, response.get_data(), headers)
+            finally:
+                if leader:
+                    response_cache.finish(key)
+
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
+
+
+def _upcoming_window():
+    """Next game start if the request filters to upcoming games (else None)."""
+    return upcoming_key(request.args.get('upcoming_only') in ('1', 'true'))
+
+
+def compute_etag(version):
+    """Strong ETag for the current request at a data version.
+
+    Derived from the endpoint, negotiated format, URL arguments and the exact
+    query string, so two URLs never share a tag even if the cache treats them
+    as equal.
+    """
+    identity = repr((
+        request.endpoint,
+        negotiated_format(),
+        sorted(request.view_args.items()) if request.view_args else (),
+        sorted(request.args.items(multi=True)),
+        version,
+        _upcoming_window(),
+    ))
+    digest = hashlib.sha1(identity.encode()).hexdigest()[:16]
+    return f'{version:x}-{digest}'
+
+
+def conditional_response(max_age=None):
+    """Answer If-None-Match with 304 when the data version hasn't moved.
+
+    Must sit above any other caching decorator so a match returns before
+    the view (or the database) is touched. Successful responses get the
+    ETag; error responses are left alone.
+
+    Args:
+        max_age: Seconds a browser may reuse the response without asking
+            (None means always revalidate)
+    """
+    if max_age:
+        cache_control = f'public, max-age={max_age}, must-revalidate'
+    else:
+        cache_control = 'no-cache'
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = compute_etag(get_data_version())
+            # The client may hold a compressed variant of this representation
+            held = next((tag for tag in etag_variants(etag) if tag in request.if_none_match), None)
+
+            if held is not None:
+                response = Response(status=304)
+                response.set_etag(held)
+                response.headers['Cache-Control'] = cache_control
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+
+        return wrapper
+    return decorator
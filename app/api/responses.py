@@ -0,0 +1,314 @@
+"""
+JSON serialization, streaming and compression for API responses.
+
+Responses are serialized with orjson when it is installed (several times
+faster than the stdlib encoder on large lists) and fall back to Flask's
+default provider otherwise. JSON bodies above a size threshold are
+compressed with brotli or gzip, whichever the client accepts and is
+available; compressed bodies of ETagged responses are memoized so repeat
+requests for the same data version don't pay for compression again.
+
+Bulk endpoints can also stream newline-delimited JSON (one row per line)
+when the client asks for it with `Accept: application/x-ndjson` or
+`?stream=1`. Rows that were rendered ahead of time (Fragment) are written
+out as-is in both formats.
+
+Consumers that pull whole slates can ask for a compact binary form with
+`Accept: application/x-msgpack` (when msgpack is installed): the same
+envelope as the JSON, packed with MessagePack, with every list of objects
+laid out by column and every string in those columns replaced by its
+index in one shared string table. See `columnar`.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from config import get_config
+from app.api.services.fragments import Fragment
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Content codings we can produce, in order of preference
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+# Accept types that select each non-JSON representation
+FORMAT_MIMETYPES = {
+    NDJSON_MIMETYPE: 'ndjson',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/msgpack': 'msgpack',
+}
+
+# Bodies compress_response may compress
+COMPRESSIBLE_MIMETYPES = ('application/json', MSGPACK_MIMETYPE)
+
+# Upper bound on memoized compressed bodies (bytes)
+COMPRESSED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keeps the default provider's behaviour for key sorting and for types
+    orjson doesn't handle natively (Decimal, dates), and renders datetimes
+    the same way the default provider does.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return self._dump_bytes(obj).decode()
+
+    def _dump_bytes(self, obj):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dump_bytes(obj), mimetype=self.mimetype)
+
+
+def json_provider_class():
+    """The fastest JSON provider available in this environment."""
+    return OrjsonProvider if orjson is not None else DefaultJSONProvider
+
+
+def _dumper():
+    """Serializer to bytes of the app's JSON provider."""
+    provider = current_app.json
+    if isinstance(provider, OrjsonProvider):
+        return provider._dump_bytes
+
+    def dump(obj):
+        return provider.dumps(obj, separators=(',', ':')).encode()
+    return dump
+
+
+def fragments_response(result):
+    """JSON response for a result whose lists may hold pre-rendered Fragments.
+
+    Top-level values are serialized as usual; lists are assembled by joining
+    their items, so Fragments are copied into the body without re-encoding.
+    """
+    dump = _dumper()
+
+    def value(item):
+        if isinstance(item, Fragment):
+            return item
+        if isinstance(item, list):
+            return b'[' + b','.join(value(element) for element in item) + b']'
+        return dump(item)
+
+    keys = sorted(result) if current_app.json.sort_keys else list(result)
+    body = b'{' + b','.join(dump(key) + b':' + value(result[key]) for key in keys) + b'}'
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def negotiated_format():
+    """Representation the client asked for: 'json', 'ndjson' or 'msgpack'."""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return 'ndjson'
+    offered = ['application/json'] + [
+        mimetype for mimetype, name in FORMAT_MIMETYPES.items() if name != 'msgpack' or msgpack is not None
+    ]
+    return FORMAT_MIMETYPES.get(request.accept_mimetypes.best_match(offered), 'json')
+
+
+def columnar(result):
+    """Column-oriented form of a response envelope, for binary encodings.
+
+    Every list of objects becomes a table, {length, columns}. A column is
+    one of:
+        {type: 'string', values}: indexes into the top-level `strings`
+            table (None stays None)
+        {type: 'list', lengths, table}: a list of objects per row (e.g. the
+            books of a /compare group); `lengths` has each row's item count
+            (None for no list) and `table` all rows' items, in order
+        {type: 'plain', values}: the values unchanged
+    All other values are kept as they are.
+
+    Returns:
+        The envelope with its object lists as tables, plus `strings`
+    """
+    strings = {}
+
+    def intern(value):
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    def is_rows(value):
+        return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+    def table(rows):
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        columns = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            present = [value for value in values if value is not None]
+            if present and all(isinstance(value, str) for value in present):
+                columns[name] = {
+                    'type': 'string',
+                    'values': [None if value is None else intern(value) for value in values],
+                }
+            elif present and all(is_rows(value) for value in present):
+                columns[name] = {
+                    'type': 'list',
+                    'lengths': [None if value is None else len(value) for value in values],
+                    'table': table([item for value in present for item in value]),
+                }
+            else:
+                columns[name] = {'type': 'plain', 'values': values}
+        return {'length': len(rows), 'columns': columns}
+
+    packed = {key: table(value) if value and is_rows(value) else value for key, value in result.items()}
+    packed['strings'] = list(strings)
+    return packed
+
+
+def packed_response(result):
+    """MessagePack response carrying the columnar form of a JSON envelope."""
+    body = msgpack.packb(columnar(result), default=current_app.json.default)
+    return current_app.response_class(body, mimetype=MSGPACK_MIMETYPE)
+
+
+def ndjson_response(rows):
+    """Stream an iterable of rows as newline-delimited JSON.
+
+    Rows are serialized one at a time as the client reads, so the first
+    byte goes out as soon as the first row exists and nothing is buffered.
+    """
+    dump = _dumper()
+
+    def generate():
+        try:
+            for row in rows:
+                yield (row if isinstance(row, Fragment) else dump(row)) + b'\n'
+        finally:
+            # Release the row source (and its database cursor) on disconnect
+            close = getattr(rows, 'close', None)
+            if close is not None:
+                close()
+
+    response = current_app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def compress(body, encoding, level=6):
+    """Compress a body with the given content coding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _etag_variant(etag, encoding):
+    """Per-encoding strong ETag, so caches never mix representations."""
+    return f'{etag}-{encoding}'
+
+
+class CompressedBodies:
+    """Byte-bounded LRU of compressed bodies keyed by (ETag, encoding)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = body
+            self.bytes_held += len(body)
+            while self.bytes_held > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.bytes_held -= len(old)
+
+
+_compressed = CompressedBodies(COMPRESSED_CACHE_MAX_BYTES)
+
+
+def compress_response(response):
+    """after_request hook: negotiate a content coding for large JSON bodies."""
+    if response.status_code == 304 or response.mimetype == NDJSON_MIMETYPE:
+        response.vary.add('Accept')
+        response.vary.add('Accept-Encoding')
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    # The body we send depends on these even when we don't compress
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    accepted = request.accept_encodings
+    encoding = next((e for e in ENCODINGS if accepted[e]), None)
+    if encoding is None:
+        return response
+
+    config = get_config()
+    body = response.get_data()
+    if len(body) < config.COMPRESS_MIN_BYTES:
+        return response
+
+    etag, weak = response.get_etag()
+    key = (etag, encoding) if etag and not weak else None
+
+    compressed = _compressed.get(key) if key else None
+    if compressed is None:
+        compressed = compress(body, encoding, config.COMPRESS_LEVEL)
+        if key:
+            _compressed.put(key, compressed)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        response.set_etag(_etag_variant(etag, encoding))
+    return response
+
+
+def etag_variants(etag):
+    """Every ETag a client may hold for the representations of `etag`."""
+    return (etag,) + tuple(_etag_variant(etag, encoding) for encoding in ('br', 'gzip'))
+
+
+def init_app(app):
+    """Install the JSON provider and the compression hook on an app."""
+    app.json = json_provider_class()(app)
+    app.after_request(compress_response)
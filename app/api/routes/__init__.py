@@ -6,6 +6,12 @@ from app.api.routes.filters import filters_bp
 from app.api.routes.comparison import comparison_bp
 from app.api.routes.parlay import parlay_bp
 from app.api.routes.calculators import calculators_bp
+from app.api.routes.arbitrage import arbitrage_bp
+from app.api.routes.middles import middles_bp
+from app.api.routes.signals import signals_bp
+from app.api.routes.stream import stream_bp
+from app.api.routes.batch import batch_bp
+from app.api.routes.search import search_bp
 
 __all__ = [
     'health_bp',
@@ -14,5 +20,11 @@ __all__ = [
     'filters_bp',
     'comparison_bp',
     'parlay_bp',
-    'calculators_bp'
+    'calculators_bp',
+    'arbitrage_bp',
+    'middles_bp',
+    'signals_bp',
+    'stream_bp',
+    'batch_bp',
+    'search_bp'
 ]
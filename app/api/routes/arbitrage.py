@@ -0,0 +1,53 @@
+"""Arbitrage API routes."""
+from flask import Blueprint, jsonify, request
+from app.api.cache import conditional_response
+from app.api.services.arbitrage_service import get_arbitrage
+
+arbitrage_bp = Blueprint('arbitrage', __name__)
+
+
+@arbitrage_bp.route('/arbitrage', methods=['GET'])
+@conditional_response()
+def list_arbitrage():
+    """
+    Find markets where backing every side at its best book guarantees a profit.
+
+    Query Parameters:
+        books: Comma-separated list of book names to include (optional)
+        stat_type: Filter by stat type (optional)
+        player: Filter by player name (partial match)
+        team: Filter by team name (partial match)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
+        min_profit: Minimum guaranteed profit in % (default 0)
+        stake: Total stake to split across sides (default 100)
+        refresh: Set to 1 to rescan instead of using the per-sync snapshot
+
+    Returns:
+        JSON with opportunities (best price per side, stake split, profit)
+    """
+    try:
+        min_profit = float(request.args.get('min_profit', 0))
+        total_stake = float(request.args.get('stake', 100))
+    except ValueError:
+        return jsonify({'error': 'min_profit and stake must be numbers'}), 400
+
+    if total_stake <= 0:
+        return jsonify({'error': 'stake must be positive'}), 400
+
+    books_param = request.args.get('books')
+    books = [b.strip() for b in books_param.split(',') if b.strip()] if books_param else None
+
+    result = get_arbitrage(
+        books=books,
+        stat_type=request.args.get('stat_type'),
+        player=request.args.get('player'),
+        team=request.args.get('team'),
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+        min_profit=min_profit,
+        total_stake=total_stake,
+        refresh=request.args.get('refresh') == '1'
+    )
+
+    return jsonify(result)
@@ -0,0 +1,116 @@
+"""Batched read API route: several GET endpoints in one round trip."""
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, current_app, jsonify, make_response, request
+from werkzeug.exceptions import HTTPException, MethodNotAllowed, NotFound
+from config import get_config
+from app.data_sources import get_data_version
+
+batch_bp = Blueprint('batch', __name__)
+
+_config = get_config()
+MAX_REQUESTS = _config.BATCH_MAX_REQUESTS
+_executor = ThreadPoolExecutor(max_workers=_config.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+# Times a batch is re-run when a sync lands while it executes
+MAX_ATTEMPTS = 3
+
+# Endpoints that can't be answered with one JSON body
+UNBATCHABLE = {'batch.run_batch', 'stream.stream_changes'}
+
+
+def _resolve(path):
+    """Map a sub-request path (with or without /api) to (endpoint, view_args)."""
+    if not path.startswith('/api/'):
+        path = '/api/' + path.lstrip('/')
+    adapter = current_app.url_map.bind('localhost')
+    endpoint, view_args = adapter.match(path, method='GET')
+    if '.' not in endpoint or endpoint in UNBATCHABLE:
+        raise NotFound()
+    return path, endpoint, view_args
+
+
+def _dispatch(app, path, endpoint, view_args, params):
+    """Run one GET view in its own request context; returns (status, JSON bytes)."""
+    with app.test_request_context(path, method='GET', query_string=params,
+                                  headers={'Accept': 'application/json'}):
+        try:
+            response = make_response(app.view_functions[endpoint](**view_args))
+        except HTTPException as e:
+            return e.code, app.json.dumps({'error': e.description}).encode()
+        except Exception:
+            app.logger.exception('Batched request to %s failed', path)
+            return 500, app.json.dumps({'error': 'Internal server error'}).encode()
+        return response.status_code, response.get_data()
+
+
+def _run(app, jobs):
+    """Run the resolved jobs concurrently; results keep request order.
+
+    Each job is (dispatch args, None), or (None, result) when it was already
+    answered while resolving.
+    """
+    futures = [_executor.submit(_dispatch, app, *args) if args else None for args, _ in jobs]
+    return [future.result() if future else result for future, (_, result) in zip(futures, jobs)]
+
+
+@batch_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """
+    Run several read endpoints in one round trip.
+
+    Sub-requests run concurrently (each through the normal response cache)
+    and the whole batch is answered from one data version: if a sync lands
+    mid-batch it is re-run, so every part reflects the same snapshot.
+
+    Request Body:
+        requests: List of {id, path, params}, where path is a GET endpoint
+            (e.g., '/filters/teams' or '/api/lines') and params its query
+            parameters (values may be lists). id defaults to the index.
+
+    Returns:
+        JSON with version and responses (in request order), each holding
+        id, status and the endpoint's body
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+        return jsonify({'error': 'Body must be a JSON object with a requests list'}), 400
+
+    subrequests = data['requests']
+    if not subrequests:
+        return jsonify({'error': 'requests must not be empty'}), 400
+    if len(subrequests) > MAX_REQUESTS:
+        return jsonify({'error': f'At most {MAX_REQUESTS} requests per batch'}), 400
+
+    ids = []
+    jobs = []
+    dumps = current_app.json.dumps
+    for index, sub in enumerate(subrequests):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+            return jsonify({'error': f'Request {index} needs a path'}), 400
+        params = sub.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({'error': f'Request {index} params must be an object'}), 400
+        # Bodies are spliced into one JSON document, so streaming is off
+        params = {k: v for k, v in params.items() if k != 'stream'}
+
+        ids.append(sub.get('id', index))
+        try:
+            jobs.append((_resolve(sub['path'].split('?', 1)[0]) + (params,), None))
+        except MethodNotAllowed:
+            jobs.append((None, (405, dumps({'error': 'Only GET endpoints can be batched'}).encode())))
+        except NotFound:
+            jobs.append((None, (404, dumps({'error': f"Unknown endpoint: {sub['path']}"}).encode())))
+
+    app = current_app._get_current_object()
+    for _ in range(MAX_ATTEMPTS):
+        version = get_data_version()
+        results = _run(app, jobs)
+        if get_data_version() == version:
+            break
+
+    parts = [
+        b'{"id":' + dumps(sub_id).encode() + b',"status":' + str(status).encode() + b',"body":' + body + b'}'
+        for sub_id, (status, body) in zip(ids, results)
+    ]
+    body = b'{"version":' + dumps(version).encode() + b',"responses":[' + b','.join(parts) + b']}'
+    return current_app.response_class(body, mimetype='application/json')
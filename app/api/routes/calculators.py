@@ -1,9 +1,12 @@
 """Calculator API routes."""
 from flask import Blueprint, jsonify, request
+from app.api.cache import conditional_response
 from app.api.services.calculator_service import (
     devig_two_way,
     calculate_parlay_breakeven,
-    PAYOUT_STRUCTURES
+    calculate_slip_ev,
+    score_slips,
+    get_parlay_types as get_registered_parlay_types
 )
 
 calculators_bp = Blueprint('calculators', __name__)
@@ -65,10 +68,12 @@ def parlay_odds():
 
     Request Body:
     {
-        "parlay_type": "5-pick-flex"
+        "parlay_type": "5-pick-flex",
+        "platform": "PrizePicks"  // optional, defaults to PrizePicks
     }
 
-    Valid parlay types: 5-pick-flex, 6-pick-flex, 3-pick-flex, 2-pick-power
+    Valid parlay types are those registered for the platform, see
+    /calculators/parlay-types.
 
     Returns:
     {
@@ -82,15 +87,79 @@ def parlay_odds():
     """
     data = request.get_json()
     parlay_type = data.get('parlay_type') if data else None
+    platform = data.get('platform') if data else None
 
     if not parlay_type:
         return jsonify({
             'error': 'parlay_type is required',
-            'valid_types': list(PAYOUT_STRUCTURES.keys())
+            'valid_types': get_registered_parlay_types(platform)
         }), 400
 
-    result = calculate_parlay_breakeven(parlay_type)
+    result = calculate_parlay_breakeven(parlay_type, platform)
+
+    if 'error' in result:
+        return jsonify(result), 400
+
+    return jsonify(result)
+
+
+@calculators_bp.route('/calculators/slip-ev', methods=['POST'])
+def slip_ev():
+    """Exact EV, ROI and variance for slips whose legs have different probabilities.
+
+    Request Body (single slip):
+    {
+        "parlay_type": "5-pick-flex",
+        "platform": "PrizePicks",  // optional
+        "probabilities": [0.58, 0.61, 0.55, 0.57, 0.60]
+    }
+
+    Request Body (batch scoring):
+    {
+        "parlay_type": "5-pick-flex",
+        "slips": [[0.58, 0.61, 0.55, 0.57, 0.60], [0.56, 0.56, 0.56, 0.56, 0.56]]
+    }
+
+    Returns:
+        Single slip: full breakdown including hit distribution.
+        Batch: {"scores": [{"expected_return", "roi", "variance"}, ...]}
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Request body required'}), 400
 
+    parlay_type = data.get('parlay_type')
+    platform = data.get('platform')
+    if not parlay_type:
+        return jsonify({
+            'error': 'parlay_type is required',
+            'valid_types': get_registered_parlay_types(platform)
+        }), 400
+
+    try:
+        if 'slips' in data:
+            slips = [[float(p) for p in slip] for slip in data['slips']]
+            if any(p < 0 or p > 1 for slip in slips for p in slip):
+                return jsonify({'error': 'Leg probabilities must be between 0 and 1'}), 400
+            scores = score_slips(slips, parlay_type, platform)
+            return jsonify({
+                'parlay_type': parlay_type,
+                'count': len(scores),
+                'scores': [
+                    {
+                        'expected_return': round(expected, 4),
+                        'roi': round(roi, 4),
+                        'variance': round(variance, 4),
+                    }
+                    for expected, roi, variance in scores
+                ],
+            })
+
+        probs = [float(p) for p in data.get('probabilities', [])]
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = calculate_slip_ev(probs, parlay_type, platform)
     if 'error' in result:
         return jsonify(result), 400
 
@@ -98,18 +167,29 @@ def parlay_odds():
 
 
 @calculators_bp.route('/calculators/parlay-types', methods=['GET'])
+@conditional_response()
 def get_parlay_types():
     """Get all available parlay types and their payout structures.
 
-    Returns list of parlay types with their payout info.
+    Query Parameters:
+        platform: Platform whose payout tables to list (optional, default PrizePicks)
+
+    Returns list of parlay types with their payout info. Break-even values
+    are solved once when each table is registered, not per request.
     """
+    platform = request.args.get('platform')
+
     types = []
-    for parlay_type, payouts in PAYOUT_STRUCTURES.items():
-        result = calculate_parlay_breakeven(parlay_type)
+    for parlay_type in get_registered_parlay_types(platform):
+        result = calculate_parlay_breakeven(parlay_type, platform)
+        if 'error' in result:
+            continue
         types.append({
             'type': parlay_type,
+            'platform': result['platform'],
+            'kind': result['kind'],
             'total_picks': result['total_picks'],
-            'payout_structure': payouts,
+            'payout_structure': result['payout_structure'],
             'breakeven_percent': result['breakeven_percent'],
             'breakeven_odds': result['breakeven_odds'],
         })
@@ -1,11 +1,16 @@
 """Line comparison API routes."""
 from flask import Blueprint, jsonify, request
-from app.api.services.comparison_service import get_all_lines_comparison
+from app.api.cache import cached_response, conditional_response
+from app.api.responses import fragments_response, ndjson_response, negotiated_format, packed_response
+from app.api.services.comparison_service import get_all_lines_comparison, iter_comparison
+from app.api.services.odds_screen_service import get_odds_screen
 
 comparison_bp = Blueprint('comparison', __name__)
 
 
 @comparison_bp.route('/compare', methods=['GET'])
+@conditional_response()
+@cached_response(lists=('books',), lower=('team', 'player', 'stat_type', 'sport'))
 def compare_lines():
     """
     Get all lines grouped by player+stat, showing all books side by side.
@@ -13,8 +18,19 @@ def compare_lines():
     Query Parameters:
         books: Comma-separated list of book names to filter by (optional, empty means all)
         team: Filter by team (optional)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
         player: Filter by player name (optional)
         stat_type: Filter by stat type (optional)
+        sort: 'player' (default) or 'spread' (widest disagreement between books first)
+        per_page: Groups per page (optional, max 500; omit for every group)
+        page: Page number (default 1)
+        cursor: next_cursor from the previous page (optional, faster than page)
+        include_total: 'false' to skip the total count (default true)
+        stream: '1' to stream every matching group as NDJSON (same as
+            Accept: application/x-ndjson); paging parameters are ignored
+
+    Send Accept: application/x-msgpack for the columnar MessagePack form.
 
     Returns:
         JSON with comparison data grouped by player+stat
@@ -25,11 +41,102 @@ def compare_lines():
     if books_param:
         books = [b.strip() for b in books_param.split(',') if b.strip()]
 
-    result = get_all_lines_comparison(
+    response_format = negotiated_format()
+    if response_format == 'ndjson':
+        try:
+            rows = iter_comparison(
+                books=books,
+                team=request.args.get('team'),
+                sport=request.args.get('sport'),
+                upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+                player=request.args.get('player'),
+                stat_type=request.args.get('stat_type'),
+                sort=request.args.get('sort', 'player'),
+                rendered=True
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return ndjson_response(rows)
+
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = request.args.get('per_page')
+        per_page = min(max(int(per_page), 1), 500) if per_page else None
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+
+    if per_page is None and (request.args.get('page') or request.args.get('cursor')):
+        per_page = 50
+
+    try:
+        result = get_all_lines_comparison(
+            books=books,
+            team=request.args.get('team'),
+            sport=request.args.get('sport'),
+            upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+            player=request.args.get('player'),
+            stat_type=request.args.get('stat_type'),
+            sort=request.args.get('sort', 'player'),
+            per_page=per_page,
+            page=page,
+            cursor=request.args.get('cursor'),
+            include_total=request.args.get('include_total', 'true').lower() != 'false',
+            rendered=response_format == 'json'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if response_format == 'msgpack':
+        return packed_response(result)
+    return fragments_response(result)
+
+
+@comparison_bp.route('/odds-screen', methods=['GET'])
+@conditional_response()
+def odds_screen():
+    """
+    Get the best price per market side, from the incrementally maintained index.
+
+    Query Parameters:
+        books: Comma-separated list of book names to consider (optional, empty means all)
+        team: Filter by team (optional)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
+        player: Filter by player name (optional)
+        stat_type: Filter by stat type (optional)
+        expand: Comma-separated row ids to include per-book prices for (optional)
+        page: Page number (default 1)
+        per_page: Results per page (default 50, max 200)
+
+    Returns:
+        JSON with one summary row per market side (best price, best book,
+        market-average implied probability) and details for expanded rows
+    """
+    books_param = request.args.get('books')
+    books = None
+    if books_param:
+        books = [b.strip() for b in books_param.split(',') if b.strip()]
+
+    expand_param = request.args.get('expand')
+    expand = [e.strip() for e in expand_param.split(',') if e.strip()] if expand_param else None
+
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 50)), 1), 200)
+    except ValueError:
+        page = 1
+        per_page = 50
+
+    result = get_odds_screen(
         books=books,
         team=request.args.get('team'),
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
         player=request.args.get('player'),
-        stat_type=request.args.get('stat_type')
+        stat_type=request.args.get('stat_type'),
+        expand=expand,
+        page=page,
+        per_page=per_page
     )
 
     return jsonify(result)
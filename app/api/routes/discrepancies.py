@@ -1,10 +1,14 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
+from app.api.cache import cached_response, conditional_response
+from app.api.responses import fragments_response
 from app.api.services.comparison_service import find_discrepancies
 
 discrepancies_bp = Blueprint('discrepancies', __name__)
 
 
 @discrepancies_bp.route('/discrepancies', methods=['GET'])
+@conditional_response()
+@cached_response(lists=('books',), lower=('team', 'player', 'stat_type', 'sport'))
 def list_discrepancies():
     """
     Find lines where sportsbooks have significant odds differences.
@@ -14,6 +18,8 @@ def list_discrepancies():
         stat_type: Filter by stat type
         player: Filter by player name (partial match)
         team: Filter by team name (partial match)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
         books: Comma-separated list of book names to include (optional)
     """
     try:
@@ -25,14 +31,17 @@ def list_discrepancies():
     player = request.args.get('player')
     team = request.args.get('team')
     books_param = request.args.get('books')
-    books = books_param.split(',') if books_param else None
+    books = [b.strip() for b in books_param.split(',') if b.strip()] if books_param else None
 
     result = find_discrepancies(
         min_prob_diff=min_prob_diff,
         stat_type=stat_type,
         player=player,
         team=team,
-        books=books
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+        books=books,
+        rendered=True
     )
 
-    return jsonify(result)
+    return fragments_response(result)
@@ -1,5 +1,9 @@
 from flask import Blueprint, jsonify, request
+from config import get_config
+from app.api.cache import cached_response, conditional_response
 from app.api.services.filter_service import (
+    FACETS,
+    get_facets,
     get_unique_sports,
     get_unique_teams,
     get_unique_players,
@@ -9,8 +13,12 @@ from app.api.services.filter_service import (
 
 filters_bp = Blueprint('filters', __name__)
 
+FILTER_MAX_AGE = get_config().FILTER_CACHE_MAX_AGE
+
 
 @filters_bp.route('/filters/sports', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response()
 def list_sports():
     """Get all unique sports for filter dropdown."""
     sports = get_unique_sports()
@@ -18,37 +26,79 @@ def list_sports():
 
 
 @filters_bp.route('/filters/teams', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response(lower=('team', 'sport'))
 def list_teams():
     """Get all unique team names for filter dropdown.
 
     Query Parameters:
         sport: Filter teams by sport (optional)
+        upcoming_only: '1' for teams with a game that hasn't started yet only
     """
     sport = request.args.get('sport')
-    teams = get_unique_teams(sport=sport)
+    teams = get_unique_teams(
+        sport=sport,
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true')
+    )
     return jsonify({'data': teams})
 
 
 @filters_bp.route('/filters/players', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response(lower=('team', 'sport'))
 def list_players():
     """Get all unique player names for filter dropdown.
 
     Query Parameters:
         team: Filter players by team (optional)
+        sport: Filter players by sport (optional)
+        upcoming_only: '1' for players in a game that hasn't started yet only
     """
     team = request.args.get('team')
-    players = get_unique_players(team=team)
+    players = get_unique_players(
+        team=team,
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true')
+    )
     return jsonify({'data': players})
 
 
 @filters_bp.route('/filters/stat-types', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response()
 def list_stat_types():
     """Get all unique stat types for filter dropdown."""
     stat_types = get_unique_stat_types()
     return jsonify({'data': stat_types})
 
 
+@filters_bp.route('/filters/facets', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response(lower=FACETS)
+def list_facets():
+    """Get line counts per sport, team, player, stat type and book.
+
+    Each facet is counted with every filter but its own, so the panel can
+    show how many lines each choice would leave.
+
+    Query Parameters:
+        sport: Selected sport (optional)
+        team: Selected team (optional)
+        player: Selected player (optional)
+        stat_type: Selected stat type (optional)
+        book: Selected book (optional)
+        upcoming_only: '1' to count only games that haven't started yet
+    """
+    facets = get_facets(
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+        **{name: request.args.get(name) for name in FACETS}
+    )
+    return jsonify({'data': facets})
+
+
 @filters_bp.route('/books', methods=['GET'])
+@conditional_response(max_age=FILTER_MAX_AGE)
+@cached_response()
 def list_books():
     """Get all sportsbooks/platforms."""
     books = get_books()
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from config import get_config
 from app.data_sources import get_last_sync
+from app.api.cache import response_cache
 
 health_bp = Blueprint('health', __name__)
 
@@ -15,3 +16,9 @@ def health_check():
         'database': 'sqlite' if config.DEMO_MODE else 'mysql',
         'last_sync': get_last_sync()
     })
+
+
+@health_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache statistics (entries, bytes held, hit rate)."""
+    return jsonify({'data': response_cache.stats()})
@@ -1,10 +1,14 @@
 from flask import Blueprint, jsonify, request
-from app.api.services.line_service import get_lines, get_line_by_id
+from app.api.cache import conditional_response
+from app.api.responses import ndjson_response, negotiated_format, packed_response
+from app.api.services.line_service import get_lines, get_line_by_id, iter_lines
+from app.api.services.history_service import get_line_history
 
 lines_bp = Blueprint('lines', __name__)
 
 
 @lines_bp.route('/lines', methods=['GET'])
+@conditional_response()
 def list_lines():
     """
     Get betting lines with optional filters.
@@ -12,15 +16,38 @@ def list_lines():
     Query Parameters:
         book: Filter by book name (pinnacle, prizepicks, or all)
         team: Filter by team name (partial match)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
         player: Filter by player name (partial match)
         stat_type: Filter by stat type
         page: Page number (default 1)
         per_page: Results per page (default 50, max 100)
+        cursor: next_cursor from the previous page (optional, faster than page)
+        include_total: 'false' to skip the total count (default true)
+        fields: Comma-separated line fields to return, e.g. id,player_name,points,price
+            (optional, default all)
+        stream: '1' to stream every matching line as NDJSON (same as
+            Accept: application/x-ndjson); paging parameters are ignored
+
+    Send Accept: application/x-msgpack for the columnar MessagePack form.
     """
     book = request.args.get('book')
     team = request.args.get('team')
     player = request.args.get('player')
     stat_type = request.args.get('stat_type')
+    sport = request.args.get('sport')
+    upcoming_only = request.args.get('upcoming_only') in ('1', 'true')
+    fields_param = request.args.get('fields')
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else None
+
+    response_format = negotiated_format()
+    if response_format == 'ndjson':
+        try:
+            rows = iter_lines(book=book, team=team, player=player, stat_type=stat_type,
+                              sport=sport, upcoming_only=upcoming_only, fields=fields)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return ndjson_response(rows)
 
     try:
         page = int(request.args.get('page', 1))
@@ -29,19 +56,30 @@ def list_lines():
         page = 1
         per_page = 50
 
-    result = get_lines(
-        book=book,
-        team=team,
-        player=player,
-        stat_type=stat_type,
-        page=page,
-        per_page=per_page
-    )
+    try:
+        result = get_lines(
+            book=book,
+            team=team,
+            sport=sport,
+            upcoming_only=upcoming_only,
+            player=player,
+            stat_type=stat_type,
+            page=max(page, 1),
+            per_page=max(per_page, 1),
+            cursor=request.args.get('cursor'),
+            include_total=request.args.get('include_total', 'true').lower() != 'false',
+            fields=fields
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    if response_format == 'msgpack':
+        return packed_response(result)
     return jsonify(result)
 
 
 @lines_bp.route('/lines/<int:line_id>', methods=['GET'])
+@conditional_response()
 def get_line(line_id):
     """Get a specific line by ID."""
     result = get_line_by_id(line_id)
@@ -50,3 +88,15 @@ def get_line(line_id):
         return jsonify({'error': 'Line not found'}), 404
 
     return jsonify(result)
+
+
+@lines_bp.route('/lines/<int:line_id>/history', methods=['GET'])
+@conditional_response()
+def get_history(line_id):
+    """Get the price/points movement of a line across syncs."""
+    result = get_line_history(line_id)
+
+    if result is None:
+        return jsonify({'error': 'Line not found'}), 404
+
+    return jsonify(result)
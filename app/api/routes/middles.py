@@ -0,0 +1,67 @@
+"""Middles API routes."""
+from flask import Blueprint, jsonify, request
+from app.api.cache import conditional_response
+from app.api.services.middle_service import get_middles, SORT_KEYS
+
+middles_bp = Blueprint('middles', __name__)
+
+
+@middles_bp.route('/middles', methods=['GET'])
+@conditional_response()
+def list_middles():
+    """
+    Find Over-low / Under-high windows across books.
+
+    Query Parameters:
+        books: Comma-separated list of book names to include (optional)
+        stat_type: Filter by stat type (optional)
+        player: Filter by player name (partial match)
+        team: Filter by team name (partial match)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
+        min_width: Minimum window width in points (default 0)
+        sort: 'score' (default), 'width' or 'price'
+        page: Page number (default 1)
+        per_page: Results per page (default 50, max 100)
+        refresh: Set to 1 to rescan instead of using the per-sync snapshot
+
+    Returns:
+        JSON with ranked middles and pagination info
+    """
+    try:
+        min_width = float(request.args.get('min_width', 0))
+    except ValueError:
+        min_width = 0
+
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 50)), 1), 100)
+    except ValueError:
+        page = 1
+        per_page = 50
+
+    sort = request.args.get('sort', 'score')
+    if sort not in SORT_KEYS:
+        return jsonify({
+            'error': f'Invalid sort: {sort}',
+            'valid_sorts': list(SORT_KEYS.keys())
+        }), 400
+
+    books_param = request.args.get('books')
+    books = [b.strip() for b in books_param.split(',') if b.strip()] if books_param else None
+
+    result = get_middles(
+        books=books,
+        stat_type=request.args.get('stat_type'),
+        player=request.args.get('player'),
+        team=request.args.get('team'),
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+        min_width=min_width,
+        sort=sort,
+        page=page,
+        per_page=per_page,
+        refresh=request.args.get('refresh') == '1'
+    )
+
+    return jsonify(result)
@@ -1,16 +1,26 @@
 """Parlay builder API routes."""
 from flask import Blueprint, jsonify, request
+from config import get_config
+from app.api.cache import cached_response, conditional_response
 from app.api.services.parlay_service import (
     find_ev_lines,
     validate_parlay_lines,
-    get_available_lines
+    get_available_lines,
+    optimize_parlay
+)
+from app.api.services.simulation_service import simulate_slip, DEFAULT_CORRELATIONS
+from app.api.services.calculator_service import (
+    get_payout_table,
+    get_parlay_types as get_registered_parlay_types,
+    implied_to_american
 )
-from app.api.services.calculator_service import BREAKEVEN_PROBS
 
 parlay_bp = Blueprint('parlay', __name__)
 
 
 @parlay_bp.route('/parlay/ev-lines', methods=['GET'])
+@conditional_response()
+@cached_response(lists=('sharp_books', 'fields'), lower=('team', 'player', 'stat_type', 'sport'))
 def get_ev_lines():
     """
     Auto-generate +EV lines for parlay building.
@@ -21,10 +31,14 @@ def get_ev_lines():
     Query Parameters:
         betting_book: User's betting platform (e.g., 'PrizePicks') - required
         sharp_books: Comma-separated list of sharp books (e.g., 'Pinnacle,DraftKings') - required
-        parlay_type: One of '5-pick-flex', '6-pick-flex', '3-pick-flex', '2-pick-power' - required
+        parlay_type: A parlay type registered for the betting book (e.g., '5-pick-flex') - required
         team: Filter by team (optional)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
         player: Filter by player name (optional)
         stat_type: Filter by stat type (optional)
+        fields: Comma-separated EV line fields to return, e.g. id,player_name,edge
+            (optional, default all; leave out sharp_books_data for a much smaller payload)
 
     Returns:
         JSON with +EV lines sorted by edge (highest first)
@@ -42,7 +56,7 @@ def get_ev_lines():
     if not parlay_type:
         return jsonify({
             'error': 'parlay_type is required',
-            'valid_types': list(BREAKEVEN_PROBS.keys())
+            'valid_types': get_registered_parlay_types(betting_book)
         }), 400
 
     sharp_books = [b.strip() for b in sharp_books_str.split(',') if b.strip()]
@@ -50,11 +64,88 @@ def get_ev_lines():
     if not sharp_books:
         return jsonify({'error': 'At least one sharp book is required'}), 400
 
+    fields_param = request.args.get('fields')
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else None
+
     result = find_ev_lines(
         betting_book=betting_book,
         sharp_books=sharp_books,
         parlay_type=parlay_type,
         team=request.args.get('team'),
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+        player=request.args.get('player'),
+        stat_type=request.args.get('stat_type'),
+        fields=fields
+    )
+
+    if 'error' in result:
+        return jsonify(result), 400
+
+    return jsonify(result)
+
+
+@parlay_bp.route('/parlay/optimize', methods=['GET'])
+def optimize():
+    """
+    Find the top-K slips from the +EV pool by exact expected ROI.
+
+    Query Parameters:
+        betting_book: User's betting platform (e.g., 'PrizePicks') - required
+        sharp_books: Comma-separated list of sharp books - required
+        parlay_type: A parlay type registered for the betting book - required
+        top_k: Number of slips to return (default 5, max 50)
+        max_per_matchup: Maximum legs from the same game (optional)
+        required_books: Comma-separated sharp books that must price every leg (optional)
+        time_budget_ms: Search time budget in milliseconds (default 500, max 5000)
+        team: Filter by team (optional)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
+        player: Filter by player name (optional)
+        stat_type: Filter by stat type (optional)
+
+    Returns:
+        JSON with ranked slips; meta.complete is false if the time budget ran out
+    """
+    betting_book = request.args.get('betting_book')
+    sharp_books_str = request.args.get('sharp_books', '')
+    parlay_type = request.args.get('parlay_type')
+
+    if not betting_book:
+        return jsonify({'error': 'betting_book is required'}), 400
+
+    sharp_books = [b.strip() for b in sharp_books_str.split(',') if b.strip()]
+    if not sharp_books:
+        return jsonify({'error': 'sharp_books is required (comma-separated)'}), 400
+
+    if not parlay_type:
+        return jsonify({
+            'error': 'parlay_type is required',
+            'valid_types': get_registered_parlay_types(betting_book)
+        }), 400
+
+    try:
+        top_k = max(1, min(int(request.args.get('top_k', 5)), 50))
+        time_budget_ms = max(10, min(int(request.args.get('time_budget_ms', 500)), 5000))
+        max_per_matchup = request.args.get('max_per_matchup')
+        max_per_matchup = int(max_per_matchup) if max_per_matchup else None
+    except ValueError:
+        return jsonify({'error': 'top_k, time_budget_ms and max_per_matchup must be integers'}), 400
+
+    required_books_str = request.args.get('required_books', '')
+    required_books = [b.strip() for b in required_books_str.split(',') if b.strip()] or None
+
+    result = optimize_parlay(
+        betting_book=betting_book,
+        sharp_books=sharp_books,
+        parlay_type=parlay_type,
+        top_k=top_k,
+        max_per_matchup=max_per_matchup,
+        required_books=required_books,
+        time_budget_ms=time_budget_ms,
+        team=request.args.get('team'),
+        sport=request.args.get('sport'),
+        upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
         player=request.args.get('player'),
         stat_type=request.args.get('stat_type')
     )
@@ -74,7 +165,8 @@ def validate_parlay():
     {
         "line_ids": [1, 2, 3],
         "sharp_books": ["Pinnacle", "DraftKings"],
-        "parlay_type": "5-pick-flex"
+        "parlay_type": "5-pick-flex",
+        "betting_book": "PrizePicks"  // optional, selects the payout table
     }
 
     Returns:
@@ -90,6 +182,7 @@ def validate_parlay():
     line_ids = data.get('line_ids', [])
     sharp_books = data.get('sharp_books', [])
     parlay_type = data.get('parlay_type')
+    betting_book = data.get('betting_book')
 
     if not line_ids:
         return jsonify({'error': 'line_ids is required'}), 400
@@ -100,13 +193,112 @@ def validate_parlay():
     if not parlay_type:
         return jsonify({
             'error': 'parlay_type is required',
-            'valid_types': list(BREAKEVEN_PROBS.keys())
+            'valid_types': get_registered_parlay_types(betting_book)
         }), 400
 
     result = validate_parlay_lines(
         line_ids=line_ids,
         sharp_books=sharp_books,
-        parlay_type=parlay_type
+        parlay_type=parlay_type,
+        betting_book=betting_book
+    )
+
+    if 'error' in result:
+        return jsonify(result), 400
+
+    return jsonify(result)
+
+
+@parlay_bp.route('/parlay/simulate', methods=['POST'])
+def simulate_parlay():
+    """
+    Monte Carlo EV for a slip whose legs are correlated.
+
+    Request Body (from selected lines):
+    {
+        "line_ids": [1, 2, 3, 4, 5],
+        "sharp_books": ["Pinnacle", "DraftKings"],
+        "parlay_type": "5-pick-flex",
+        "betting_book": "PrizePicks",             // optional
+        "correlations": {"same_player": 0.5, "same_matchup": 0.1},  // optional
+        "max_sims": 1000000,                      // optional, capped by SIMULATION_MAX_SIMS
+        "ci_target": 0.01,                        // optional
+        "time_budget_ms": 2000,                   // optional, capped by SIMULATION_TIME_BUDGET_MS
+        "seed": 42                                // optional
+    }
+
+    Or pass "legs" directly instead of line_ids/sharp_books:
+        [{"prob": 0.58, "player_name": "...", "stat_type": "Points",
+          "designation": "Over", "matchup": "A @ B"}, ...]
+
+    Returns:
+        JSON with simulated EV, variance and bust probability (with 95% CIs)
+        alongside the independent-legs exact result
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Request body required'}), 400
+
+    parlay_type = data.get('parlay_type')
+    betting_book = data.get('betting_book')
+    if not parlay_type:
+        return jsonify({
+            'error': 'parlay_type is required',
+            'valid_types': get_registered_parlay_types(betting_book)
+        }), 400
+
+    legs = data.get('legs')
+    if not legs:
+        line_ids = data.get('line_ids', [])
+        sharp_books = data.get('sharp_books', [])
+        if not line_ids or not sharp_books:
+            return jsonify({'error': 'Either legs or line_ids and sharp_books are required'}), 400
+
+        validated = validate_parlay_lines(
+            line_ids=line_ids,
+            sharp_books=sharp_books,
+            parlay_type=parlay_type,
+            betting_book=betting_book
+        )
+        if 'error' in validated:
+            return jsonify(validated), 400
+
+        missing = [l['id'] for l in validated['validated_lines'] if l['sharp_implied_prob'] is None]
+        if missing:
+            return jsonify({'error': 'Some lines have no sharp book data', 'line_ids': missing}), 400
+
+        legs = [dict(l, prob=l['sharp_implied_prob']) for l in validated['validated_lines']]
+
+    try:
+        legs = [dict(leg, prob=float(leg['prob'])) for leg in legs]
+        correlations = {
+            key: float(value)
+            for key, value in (data.get('correlations') or {}).items()
+            if key in DEFAULT_CORRELATIONS
+        }
+        config = get_config()
+        max_sims = max(1000, min(int(data.get('max_sims', 1000000)), config.SIMULATION_MAX_SIMS))
+        ci_target = max(0.0001, float(data.get('ci_target', 0.01)))
+        seed = int(data['seed']) if data.get('seed') is not None else None
+        time_budget_ms = max(10, min(int(data.get('time_budget_ms', config.SIMULATION_TIME_BUDGET_MS)),
+                                     config.SIMULATION_TIME_BUDGET_MS))
+    except (KeyError, ValueError, TypeError):
+        return jsonify({
+            'error': 'legs need a numeric prob; max_sims, ci_target, time_budget_ms and seed must be numbers'
+        }), 400
+
+    if any(abs(rho) >= 1 for rho in correlations.values()):
+        return jsonify({'error': 'Correlations must be between -1 and 1'}), 400
+
+    result = simulate_slip(
+        legs=legs,
+        parlay_type=parlay_type,
+        platform=betting_book,
+        correlations=correlations,
+        max_sims=max_sims,
+        ci_target=ci_target,
+        seed=seed,
+        time_budget_ms=time_budget_ms
     )
 
     if 'error' in result:
@@ -116,6 +308,7 @@ def validate_parlay():
 
 
 @parlay_bp.route('/parlay/lines', methods=['GET'])
+@conditional_response()
 def get_lines_for_selection():
     """
     Get available lines from a betting book for manual selection.
@@ -123,10 +316,14 @@ def get_lines_for_selection():
     Query Parameters:
         betting_book: Book to get lines from (required)
         team: Filter by team (optional)
+        sport: Filter by league, e.g. NBA (optional)
+        upcoming_only: '1' for games that haven't started yet only
         player: Filter by player name (optional)
         stat_type: Filter by stat type (optional)
         page: Page number (default 1)
         per_page: Items per page (default 50)
+        cursor: next_cursor from the previous page (optional, faster than page)
+        include_total: 'false' to skip the total count (default true)
 
     Returns:
         JSON with lines and pagination info
@@ -142,32 +339,51 @@ def get_lines_for_selection():
     except ValueError:
         return jsonify({'error': 'page and per_page must be integers'}), 400
 
-    result = get_available_lines(
-        betting_book=betting_book,
-        team=request.args.get('team'),
-        player=request.args.get('player'),
-        stat_type=request.args.get('stat_type'),
-        page=page,
-        per_page=per_page
-    )
+    try:
+        result = get_available_lines(
+            betting_book=betting_book,
+            team=request.args.get('team'),
+            sport=request.args.get('sport'),
+            upcoming_only=request.args.get('upcoming_only') in ('1', 'true'),
+            player=request.args.get('player'),
+            stat_type=request.args.get('stat_type'),
+            page=max(page, 1),
+            per_page=min(max(per_page, 1), 200),
+            cursor=request.args.get('cursor'),
+            include_total=request.args.get('include_total', 'true').lower() != 'false'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     return jsonify(result)
 
 
 @parlay_bp.route('/parlay/types', methods=['GET'])
+@conditional_response()
 def get_parlay_types():
     """
     Get all available parlay types and their break-even info.
 
+    Query Parameters:
+        betting_book: Platform whose payout tables to list (optional, default PrizePicks)
+
     Returns list of parlay types with break-even probabilities and odds.
     """
+    betting_book = request.args.get('betting_book')
+
     types = []
-    for parlay_type, breakeven_prob in BREAKEVEN_PROBS.items():
+    for parlay_type in get_registered_parlay_types(betting_book):
+        table = get_payout_table(parlay_type, betting_book)
+        breakeven_prob = table['breakeven_prob']
+        if breakeven_prob is None:
+            continue
         types.append({
             'type': parlay_type,
-            'breakeven_prob': breakeven_prob,
+            'platform': table['platform'],
+            'kind': table['kind'],
+            'breakeven_prob': round(breakeven_prob, 4),
             'breakeven_percent': round(breakeven_prob * 100, 2),
-            'breakeven_odds': round(-100 * breakeven_prob / (1 - breakeven_prob)) if breakeven_prob >= 0.5 else round(100 * (1 - breakeven_prob) / breakeven_prob),
+            'breakeven_odds': implied_to_american(breakeven_prob),
         })
 
     return jsonify({'parlay_types': types})
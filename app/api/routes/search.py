@@ -0,0 +1,38 @@
+"""Search API routes."""
+from flask import Blueprint, jsonify, request
+from config import get_config
+from app.api.cache import cached_response, conditional_response
+from app.api.services.search_service import SEARCH_TYPES, search
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search', methods=['GET'])
+@conditional_response(max_age=get_config().FILTER_CACHE_MAX_AGE)
+@cached_response(lists=('type',), lower=('q', 'type'))
+def search_names():
+    """
+    Autocomplete players and teams, best match first.
+
+    Query Parameters:
+        q: Text typed so far (accent- and case-insensitive)
+        type: Comma-separated subset of player,team (default both)
+        limit: Maximum results (default 10, max 50)
+    """
+    query = request.args.get('q', '')
+    types = request.args.get('type')
+    types = [t.strip().lower() for t in types.split(',') if t.strip()] if types else list(SEARCH_TYPES)
+    invalid = [t for t in types if t not in SEARCH_TYPES]
+    if invalid:
+        return jsonify({
+            'error': f"Invalid type: {', '.join(invalid)}",
+            'valid_types': list(SEARCH_TYPES)
+        }), 400
+
+    limit = min(request.args.get('limit', 10, type=int), 50)
+
+    results = search(query, types=types, limit=limit)
+    return jsonify({
+        'data': results,
+        'meta': {'query': query, 'count': len(results)}
+    })
@@ -0,0 +1,59 @@
+"""Steam and stale-line signal API routes."""
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request
+from app.api.cache import conditional_response
+from app.api.services.signal_service import get_signals
+
+signals_bp = Blueprint('signals', __name__)
+
+
+@signals_bp.route('/signals', methods=['GET'])
+@conditional_response()
+def list_signals():
+    """
+    Get steam moves and stale lines detected by recent syncs, newest first.
+
+    Query Parameters:
+        type: 'steam' or 'stale' (optional, default both)
+        book: Only signals involving this book (optional)
+        stat_type: Filter by stat type (optional)
+        min_gap: Minimum gap or move size in % (default 0)
+        since: ISO timestamp; only signals detected after it (optional)
+        limit: Maximum number of signals (default 100, max 1000)
+    """
+    signal_type = request.args.get('type')
+    if signal_type and signal_type not in ('steam', 'stale'):
+        return jsonify({
+            'error': f'Invalid type: {signal_type}',
+            'valid_types': ['steam', 'stale']
+        }), 400
+
+    try:
+        min_gap = float(request.args.get('min_gap', 0))
+    except ValueError:
+        min_gap = 0
+
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        limit = 100
+
+    since = request.args.get('since')
+    if since:
+        try:
+            since = datetime.fromisoformat(since.rstrip('Z'))
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO timestamp'}), 400
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    result = get_signals(
+        signal_type=signal_type,
+        book=request.args.get('book'),
+        stat_type=request.args.get('stat_type'),
+        min_gap=min_gap,
+        since=since or None,
+        limit=limit
+    )
+
+    return jsonify(result)
@@ -0,0 +1,186 @@
+"""
+Change feed API routes: server-sent events and deltas since a version.
+
+Each open /stream holds a worker thread for as long as it is connected
+(up to STREAM_MAX_SECONDS, after which the browser reconnects and resumes
+from its Last-Event-ID). Under gunicorn, run threaded or async workers
+(e.g. `--worker-class gthread --threads 32`, or gevent); with the default
+sync workers every stream ties up a whole worker process.
+"""
+import queue
+import time
+from flask import Blueprint, current_app, jsonify, request
+from app.data_sources import get_data_version
+from app.api.services.feed_service import (
+    RESET, TOPICS, events_since, feed, filter_event, get_changes, poll
+)
+
+stream_bp = Blueprint('stream', __name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Seconds between checks for syncs run by another process
+POLL_SECONDS = 2
+
+# Seconds a stream stays open before the client is made to reconnect
+STREAM_MAX_SECONDS = 600
+
+
+def _split(param):
+    value = request.args.get(param)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+
+def _feed_filters():
+    """Subscriber filters shared by /stream and /changes, or a 400 response."""
+    topics = _split('topics') or list(TOPICS)
+    invalid = [t for t in topics if t not in TOPICS]
+    if invalid:
+        return None, (jsonify({
+            'error': f"Invalid topics: {', '.join(invalid)}",
+            'valid_topics': list(TOPICS)
+        }), 400)
+
+    try:
+        min_prob_diff = float(request.args.get('min_prob_diff', 5))
+    except ValueError:
+        return None, (jsonify({'error': 'min_prob_diff must be a number'}), 400)
+
+    filters = {
+        'topics': topics,
+        'books': _split('books'),
+        'stat_type': request.args.get('stat_type'),
+        'player': request.args.get('player'),
+        'team': request.args.get('team'),
+        'sport': request.args.get('sport'),
+        'upcoming_only': request.args.get('upcoming_only') in ('1', 'true'),
+        'min_prob_diff': min_prob_diff,
+        'betting_book': request.args.get('betting_book'),
+        'sharp_books': _split('sharp_books'),
+        'parlay_type': request.args.get('parlay_type'),
+    }
+    return filters, None
+
+
+@stream_bp.route('/stream', methods=['GET'])
+def stream_changes():
+    """
+    Push each sync's changes as server-sent events.
+
+    Every sync produces one 'sync' event (id = data version) holding only the
+    parts that match this subscriber's filters; syncs with nothing relevant
+    send nothing. Syncs run by any process (e.g. `main.py --fetch-only`
+    from cron) are picked up within POLL_SECONDS. A reconnecting client
+    gets the syncs it missed since its Last-Event-ID. A 'reset' event means
+    the client fell behind and should reload from the regular endpoints.
+
+    Query Parameters:
+        topics: Comma-separated subset of lines,discrepancies,ev (default all)
+        books: Comma-separated list of book names (optional)
+        stat_type: Filter by stat type (optional)
+        player: Filter by player name (partial match)
+        team: Filter by team name (partial match)
+        sport: Filter by league (e.g., NBA)
+        upcoming_only: '1' for games that haven't started yet only
+        min_prob_diff: Discrepancy gap in % that triggers an alert (default 5)
+        betting_book: DFS book for EV alerts (EV needs the next two as well)
+        sharp_books: Comma-separated sharp books for EV alerts
+        parlay_type: Parlay type whose break-even defines +EV
+
+    Returns:
+        text/event-stream
+    """
+    filters, error = _feed_filters()
+    if error:
+        return error
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    dumps = current_app.json.dumps
+    subscription = feed.subscribe()
+
+    def generate():
+        try:
+            # Syncs this process hadn't seen yet are part of what the client loads
+            poll()
+            version = get_data_version()
+            yield f"retry: 5000\nevent: hello\ndata: {dumps({'version': version})}\n\n"
+
+            if last_event_id is not None:
+                missed = events_since(last_event_id)
+                if missed is None:
+                    yield f"event: reset\ndata: {dumps({'version': get_data_version()})}\n\n"
+                for event in missed or ():
+                    view = filter_event(event, **filters)
+                    if view is not None:
+                        yield f"id: {event['version']}\nevent: sync\ndata: {dumps(view)}\n\n"
+
+            opened = last_write = time.monotonic()
+            while time.monotonic() - opened < STREAM_MAX_SECONDS:
+                try:
+                    event = subscription.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    poll()
+                    if time.monotonic() - last_write >= HEARTBEAT_SECONDS:
+                        last_write = time.monotonic()
+                        yield ": keepalive\n\n"
+                    continue
+
+                if event is RESET:
+                    last_write = time.monotonic()
+                    yield f"event: reset\ndata: {dumps({'version': get_data_version()})}\n\n"
+                    continue
+
+                # Already held by the client, or sent while catching up after a reconnect
+                if event['version'] <= version:
+                    continue
+                view = filter_event(event, **filters)
+                if view is not None:
+                    last_write = time.monotonic()
+                    yield f"id: {event['version']}\nevent: sync\ndata: {dumps(view)}\n\n"
+        finally:
+            feed.unsubscribe(subscription)
+
+    response = current_app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@stream_bp.route('/changes', methods=['GET'])
+def get_changes_since():
+    """
+    Get what changed since a data version, as one net diff.
+
+    Lines come back as inserted/updated/removed per outcome, discrepancies
+    as any change to a pair at or above min_prob_diff, and EV entries per
+    market. When `since` is too old (or unknown) the response has
+    reload=true and the client should refetch the full endpoints.
+
+    Query Parameters:
+        since: Data version the client holds (a /stream event id or the
+            version of a previous /changes call)
+        topics, books, stat_type, player, team, sport, upcoming_only,
+        min_prob_diff, betting_book, sharp_books, parlay_type: As for /stream
+
+    Returns:
+        JSON with version, since, reload, lines, discrepancies and ev
+    """
+    try:
+        since = int(request.args['since'])
+    except KeyError:
+        return jsonify({'error': 'since is required'}), 400
+    except ValueError:
+        return jsonify({'error': 'since must be an integer data version'}), 400
+
+    filters, error = _feed_filters()
+    if error:
+        return error
+
+    response = jsonify(get_changes(since, **filters))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,317 @@
+"""
+Cross-book arbitrage scanner.
+
+For every market (matchup + stat + player + line) the best price on each
+side is found across all books in a single pass over the snapshot. When the
+implied probabilities of those best prices sum to less than 1, backing every
+side at its best book locks in a profit regardless of the result.
+"""
+from bisect import bisect_right
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.books import Books
+from app.models.matchups import Matchups
+from app.models.props import Props
+from app.data_sources import get_last_sync, on_sync
+from app.data_sources.sync_log import sync_starts
+from app.api.services.search_service import match_matchups, match_players
+from app.api.services.matchup_service import game_ids
+
+# Latest full scan, keyed by the sync it was computed from
+_snapshot = {'sync': None, 'data': None}
+
+
+def american_to_decimal(odds):
+    """Convert American odds to decimal odds (stake included)."""
+    odds = float(odds)
+    if odds > 0:
+        return 1 + odds / 100
+    return 1 + 100 / abs(odds)
+
+
+def market_side(line_type, player_name, designation, points, home_team):
+    """Split a line into its market key, the side it represents and its line.
+
+    Over/Under markets key on the player, so Over 24.5 and Under 24.5 are
+    the two sides of one market at line 24.5. Spreads key on the game with
+    the home team's handicap as the line, so Home -3.5 and Away +3.5 are the
+    two sides at line -3.5. Moneylines have no line.
+
+    The market key leaves the line out, so a book moving its number stays
+    the same market and side; compare prices across books per line.
+
+    Returns:
+        Tuple of (market_key, side, line), or None if the line has no opposing side
+    """
+    designation = (designation or '').lower()
+    if designation in ('over', 'under'):
+        return player_name.lower().strip(), designation, points
+
+    if line_type == 'spreads':
+        if points is None:
+            return None
+        home_points = points if player_name == home_team else -points
+        return 'spread', player_name, home_points
+
+    if line_type == 'h2h':
+        return 'moneyline', player_name, None
+
+    return None
+
+
+def current_lines(rows, split):
+    """Reduce appended lines to the ones each book currently offers.
+
+    Syncs append rows rather than replacing them, so a book that moved its
+    number (Over 235 -> Over 237.5) or stopped offering a market still has
+    its old rows. Each book is first reduced to its latest row per (market,
+    side), whatever the points, and that row is then kept only if it is
+    from the latest sync that wrote the market; a book missing from that
+    sync no longer lists it.
+
+    Args:
+        rows: Lines with at least line_id and book_name
+        split: Maps a row to a tuple starting with (market, side), or None
+            to skip it
+
+    Returns:
+        List of (row, split) pairs
+    """
+    starts = sync_starts()
+    latest = {}
+    market_syncs = {}
+    for row in rows:
+        parts = split(row)
+        if parts is None:
+            continue
+        market, side = parts[0], parts[1]
+
+        sync = bisect_right(starts, row.line_id)
+        if sync > market_syncs.get(market, -1):
+            market_syncs[market] = sync
+
+        key = (market, side, row.book_name)
+        current = latest.get(key)
+        if current is None or row.line_id > current[0].line_id:
+            latest[key] = (row, parts, sync)
+
+    return [
+        (row, parts) for row, parts, sync in latest.values()
+        if sync == market_syncs[parts[0]]
+    ]
+
+
+def _split(row):
+    """(market, side, line) of a scanned row, or None if it can't be arbitraged."""
+    if row.price is None or not row.player_name:
+        return None
+
+    points = float(row.points) if row.points is not None else None
+    split = market_side(row.line_type, row.player_name, row.designation, points, row.home_team)
+    if split is None:
+        return None
+    market_key, side, line = split
+    return (row.matchup_id, row.units, market_key), side, line
+
+
+def _best_prices(rows, books=None):
+    """Best decimal price per side, per market and line, in two linear passes.
+
+    Lines are first reduced to the ones each book currently offers (see
+    current_lines), then the best price across books is taken per side.
+
+    Args:
+        rows: Scanned lines for every sportsbook
+        books: Book names to take prices from (optional, default all)
+
+    Returns:
+        Dict of (matchup_id, units, market_key, line) -> {side: best entry}
+    """
+    markets = {}
+    for row, (market, side, line) in current_lines(rows, _split):
+        if books and row.book_name not in books:
+            continue
+
+        sides = markets.get(market + (line,))
+        if sides is None:
+            sides = markets[market + (line,)] = {}
+
+        decimal_odds = american_to_decimal(row.price)
+        best = sides.get(side)
+        if best is None or decimal_odds > best['decimal_odds']:
+            sides[side] = {
+                'row': row,
+                'decimal_odds': decimal_odds,
+            }
+
+    return markets
+
+
+def _format_opportunity(sides, total_stake):
+    """Build an arbitrage result from the best entry for each side."""
+    implied_sum = sum(1 / entry['decimal_odds'] for entry in sides.values())
+    payout = total_stake / implied_sum
+    first = next(iter(sides.values()))['row']
+
+    legs = []
+    for side, entry in sorted(sides.items(), key=lambda item: str(item[0])):
+        row = entry['row']
+        implied = 1 / entry['decimal_odds']
+        stake = total_stake * implied / implied_sum
+        legs.append({
+            'id': row.line_id,
+            'side': row.designation or row.player_name,
+            'book': row.book_name,
+            'points': float(row.points) if row.points is not None and row.line_type != 'h2h' else None,
+            'odds': int(row.price),
+            'implied': round(implied * 100, 2),
+            'stake': round(stake, 2),
+        })
+
+    return {
+        'player_name': first.player_name if first.designation else None,
+        'stat_type': first.units,
+        'matchup': f"{first.away_team} @ {first.home_team}" if first.home_team else "Unknown",
+        'matchup_id': first.matchup_id,
+        'legs': legs,
+        'implied_sum': round(implied_sum * 100, 2),
+        'profit_percent': round((1 / implied_sum - 1) * 100, 2),
+        'guaranteed_payout': round(payout, 2),
+        'total_stake': total_stake,
+    }
+
+
+def scan_arbitrage(books=None, total_stake=100.0):
+    """
+    Scan the current lines for cross-book arbitrage.
+
+    Runs in time linear in the number of lines: one pass to reduce each
+    market side to its best price, then one pass over the markets.
+
+    Args:
+        books: List of book names to include (optional, default all sportsbooks)
+        total_stake: Total amount to split across the sides
+
+    Returns:
+        List of arbitrage opportunities, most profitable first
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = (
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.price,
+                Statlines.points, Statlines.designation, Statlines.line_type,
+                Statlines.matchup_id, Books.book_name, Props.units,
+                Matchups.home_team, Matchups.away_team
+            )
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+            .filter(Books.book_type == "Sports Book")
+        )
+
+        # Every book's lines are needed to tell which sync last wrote a market
+        markets = _best_prices(query.yield_per(1000), books)
+
+        opportunities = []
+        for sides in markets.values():
+            if len(sides) < 2:
+                continue
+            # Best prices from one book only can't be an arbitrage across books
+            if len({entry['row'].book_name for entry in sides.values()}) < 2:
+                continue
+            implied_sum = sum(1 / entry['decimal_odds'] for entry in sides.values())
+            if implied_sum < 1:
+                opportunities.append(_format_opportunity(sides, total_stake))
+
+        opportunities.sort(key=lambda x: x['profit_percent'], reverse=True)
+        return opportunities
+
+    finally:
+        session.close()
+
+
+@on_sync
+def refresh_arbitrage(changes=None):
+    """Rescan all books and store the result for the current sync."""
+    _snapshot['data'] = scan_arbitrage()
+    _snapshot['sync'] = get_last_sync()
+    return _snapshot['data']
+
+
+def get_arbitrage(books=None, stat_type=None, player=None, team=None, sport=None,
+                  upcoming_only=False, min_profit=0.0, total_stake=100.0, refresh=False):
+    """
+    Get arbitrage opportunities, served from the per-sync snapshot when possible.
+
+    The unfiltered all-books scan is cached until the next sync. Restricting
+    the books changes which prices are best, so that case rescans.
+
+    Args:
+        books: List of book names to include (optional)
+        stat_type: Filter by stat type
+        player: Filter by player name (partial match)
+        team: Filter by team (partial match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        min_profit: Minimum guaranteed profit in %
+        total_stake: Total amount to split across the sides
+        refresh: Force a rescan even if the snapshot is current
+
+    Returns:
+        Dictionary with arbitrage data and metadata
+    """
+    if books:
+        opportunities = scan_arbitrage(books=books, total_stake=total_stake)
+    else:
+        if refresh or _snapshot['data'] is None or _snapshot['sync'] != get_last_sync():
+            refresh_arbitrage()
+        opportunities = _snapshot['data']
+        if total_stake != 100.0:
+            scale = total_stake / 100.0
+            opportunities = [
+                dict(
+                    opp,
+                    legs=[dict(leg, stake=round(leg['stake'] * scale, 2)) for leg in opp['legs']],
+                    guaranteed_payout=round(opp['guaranteed_payout'] * scale, 2),
+                    total_stake=total_stake,
+                )
+                for opp in opportunities
+            ]
+
+    stat_lower = stat_type.lower() if stat_type else None
+    players = match_players(player) if player else None
+    matchups = match_matchups(team) if team else None
+    games = game_ids(sport, upcoming_only)
+
+    results = []
+    for opp in opportunities:
+        if opp['profit_percent'] < min_profit:
+            continue
+        if stat_lower and (opp['stat_type'] or '').lower() != stat_lower:
+            continue
+        if players is not None and opp['player_name'] not in players:
+            continue
+        if matchups is not None and opp['matchup_id'] not in matchups:
+            continue
+        if games is not None and opp['matchup_id'] not in games:
+            continue
+        results.append(opp)
+
+    return {
+        'data': results,
+        'meta': {
+            'count': len(results),
+            'last_sync': get_last_sync(),
+            'min_profit_applied': min_profit,
+            'total_stake': total_stake,
+            'filters': {
+                'books': books,
+                'stat_type': stat_type,
+                'player': player,
+                'team': team
+            }
+        }
+    }
@@ -4,6 +4,7 @@ Calculator service for betting math operations.
 Provides devigging algorithms and parlay break-even calculations.
 """
 import math
+from functools import lru_cache
 
 
 def american_to_implied(odds):
@@ -134,62 +135,278 @@ def _bisect(func, a, b, tolerance=1e-6, max_iterations=100):
     return (a + b) / 2
 
 
-# Payout structures for PrizePicks-style parlays
-PAYOUT_STRUCTURES = {
+def _brent(func, a, b, tolerance=1e-12, max_iterations=100):
+    """Brent's method for finding a root of func in a bracketing interval.
+
+    Combines bisection, secant and inverse quadratic interpolation, so it
+    converges super-linearly on smooth polynomials but never leaves [a, b].
+
+    Returns:
+        The root, or None if func(a) and func(b) do not bracket a sign change.
+    """
+    fa = func(a)
+    fb = func(b)
+
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if fa * fb > 0:
+        return None
+
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+
+    # c is the previous iterate, d the one before it (unset until the first step)
+    c, fc = a, fa
+    d = None
+    bisected = True
+
+    for _ in range(max_iterations):
+        if fb == 0 or abs(b - a) < tolerance:
+            return b
+
+        if fa != fc and fb != fc:
+            # Inverse quadratic interpolation
+            s = (a * fb * fc / ((fa - fb) * (fa - fc))
+                 + b * fa * fc / ((fb - fa) * (fb - fc))
+                 + c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            # Secant step
+            s = b - fb * (b - a) / (fb - fa)
+
+        # Fall back to bisection unless the step lands between (3a + b) / 4
+        # and b and shrinks fast enough compared with the step before last
+        midpoint = (3 * a + b) / 4
+        use_bisection = (
+            not (min(midpoint, b) < s < max(midpoint, b))
+            or (bisected and abs(s - b) >= abs(b - c) / 2)
+            or (not bisected and abs(s - b) >= abs(c - d) / 2)
+            or (bisected and abs(b - c) < tolerance)
+            or (not bisected and abs(c - d) < tolerance)
+        )
+        if use_bisection:
+            s = (a + b) / 2
+        bisected = use_bisection
+
+        fs = func(s)
+        d, c, fc = c, b, fb
+
+        if fa * fs < 0:
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+
+    return b
+
+
+def _structure_key(picks, payouts, refunds=None):
+    """Build a hashable key describing what a slip returns for each hit count.
+
+    Payouts and refunds are folded into a single return multiplier per hit
+    count, so two tables that pay identically share one cached solution.
+    """
+    returns = {}
+    for table in (payouts, refunds or {}):
+        for hits, multiplier in table.items():
+            hits = int(hits)
+            if hits < 0 or hits > picks:
+                raise ValueError(f"Hit count {hits} is outside a {picks}-pick slip")
+            returns[hits] = returns.get(hits, 0.0) + float(multiplier)
+    return (int(picks), tuple(sorted((k, v) for k, v in returns.items() if v)))
+
+
+@lru_cache(maxsize=None)
+def _solve_breakeven(structure_key):
+    """Solve sum(return_k * C(n,k) * p^k * (1-p)^(n-k)) = 1 for p.
+
+    Cached by structure key, so every distinct payout structure is solved
+    exactly once per process.
+
+    Returns:
+        Break-even per-leg probability, or None if no p in (0, 1) breaks even.
+    """
+    picks, returns = structure_key
+
+    def expected_return(p):
+        total = 0.0
+        for k, multiplier in returns:
+            total += multiplier * math.comb(picks, k) * (p ** k) * ((1 - p) ** (picks - k))
+        return total - 1
+
+    # Expected return is a polynomial in p; scan for the first sign change so
+    # Brent always starts from a valid bracket, even for non-monotone tables.
+    grid = [i / 64 for i in range(65)]
+    previous = grid[0]
+    f_previous = expected_return(previous)
+    for point in grid[1:]:
+        f_point = expected_return(point)
+        if f_previous == 0:
+            return previous
+        if f_previous * f_point < 0:
+            return _brent(expected_return, previous, point)
+        previous, f_previous = point, f_point
+
+    return None
+
+
+# Payout tables by platform. Each entry maps hit count -> payout multiplier
+# (stake included). Refunds map hit count -> fraction of stake returned.
+DEFAULT_PLATFORM = 'PrizePicks'
+
+PAYOUT_TABLES = {}
+
+
+def register_payout_table(platform, parlay_type, payouts, picks=None, refunds=None, kind=None):
+    """Register a platform's payout table and solve its break-even up front.
+
+    Solving happens here rather than per request, so adding a platform costs
+    one root find at import time and nothing afterwards.
+
+    Args:
+        platform: Betting platform name (e.g., 'PrizePicks', 'Underdog')
+        parlay_type: Slip identifier (e.g., '5-pick-flex')
+        payouts: Dict of hit count -> payout multiplier
+        picks: Number of legs (defaults to the highest hit count in payouts)
+        refunds: Optional dict of hit count -> fraction of stake refunded
+        kind: 'power' (all must hit) or 'flex' (partial payouts); inferred if omitted
+
+    Returns:
+        The registered table entry
+    """
+    payouts = {int(k): float(v) for k, v in payouts.items()}
+    refunds = {int(k): float(v) for k, v in (refunds or {}).items()}
+    if picks is None:
+        picks = max(payouts.keys())
+
+    if kind is None:
+        kind = 'power' if set(payouts) == {picks} and not refunds else 'flex'
+
+    structure_key = _structure_key(picks, payouts, refunds)
+    entry = {
+        'platform': platform,
+        'parlay_type': parlay_type,
+        'kind': kind,
+        'total_picks': picks,
+        'payouts': payouts,
+        'refunds': refunds,
+        'structure_key': structure_key,
+        'breakeven_prob': _solve_breakeven(structure_key),
+    }
+    PAYOUT_TABLES.setdefault(platform, {})[parlay_type] = entry
+    return entry
+
+
+def get_payout_table(parlay_type, platform=None):
+    """Look up a registered payout table.
+
+    Falls back to the default platform when the requested platform has no
+    tables at all, so callers can pass the betting book name directly. A
+    known platform without that type gets None, matching get_parlay_types.
+    """
+    if platform:
+        for name, tables in PAYOUT_TABLES.items():
+            if name.lower() == platform.lower():
+                return tables.get(parlay_type)
+    return PAYOUT_TABLES.get(DEFAULT_PLATFORM, {}).get(parlay_type)
+
+
+def get_parlay_types(platform=None):
+    """List the parlay types registered for a platform (default platform if unknown)."""
+    if platform:
+        for name, tables in PAYOUT_TABLES.items():
+            if name.lower() == platform.lower():
+                return list(tables.keys())
+    return list(PAYOUT_TABLES.get(DEFAULT_PLATFORM, {}).keys())
+
+
+def solve_breakeven(payouts, picks=None, refunds=None):
+    """Solve the break-even probability for an arbitrary payout structure.
+
+    Args:
+        payouts: Dict of hit count -> payout multiplier
+        picks: Number of legs (defaults to the highest hit count in payouts)
+        refunds: Optional dict of hit count -> fraction of stake refunded
+
+    Returns:
+        Break-even per-leg probability, or None if the table never breaks even
+    """
+    payouts = {int(k): float(v) for k, v in payouts.items()}
+    if picks is None:
+        picks = max(payouts.keys())
+    return _solve_breakeven(_structure_key(picks, payouts, refunds))
+
+
+for _type, _payouts in {
+    '2-pick-power': {2: 3.0},
+    '3-pick-power': {3: 5.0},
+    '4-pick-power': {4: 10.0},
+    '3-pick-flex': {3: 2.25, 2: 1.25},
+    '4-pick-flex': {4: 5.0, 3: 1.5},
     '5-pick-flex': {5: 10.0, 4: 2.0, 3: 0.4},
     '6-pick-flex': {6: 25.0, 5: 2.0, 4: 0.4},
-    '3-pick-flex': {3: 2.25, 2: 1.25},
-    '2-pick-power': {2: 3.0},
+}.items():
+    register_payout_table('PrizePicks', _type, _payouts)
+
+for _type, _payouts, _refunds in [
+    ('2-pick-power', {2: 3.0}, None),
+    ('3-pick-power', {3: 6.0}, None),
+    ('3-pick-flex', {3: 3.0}, {2: 1.0}),
+    ('4-pick-flex', {4: 6.0, 3: 1.5}, None),
+    ('5-pick-flex', {5: 10.0, 4: 2.5}, None),
+]:
+    register_payout_table('Underdog', _type, _payouts, refunds=_refunds)
+
+# Payout structures for the default platform, kept for existing callers
+PAYOUT_STRUCTURES = {
+    parlay_type: table['payouts']
+    for parlay_type, table in PAYOUT_TABLES[DEFAULT_PLATFORM].items()
 }
 
-# Pre-calculated break-even probabilities for quick reference
+# Break-even probabilities for the default platform, computed from the tables above
 BREAKEVEN_PROBS = {
-    '5-pick-flex': 0.5425,    # ~-119 odds
-    '6-pick-flex': 0.5421,    # ~-118 odds
-    '3-pick-flex': 0.5774,    # ~-137 odds
-    '2-pick-power': 0.5774,   # ~-137 odds
+    parlay_type: round(table['breakeven_prob'], 4)
+    for parlay_type, table in PAYOUT_TABLES[DEFAULT_PLATFORM].items()
 }
 
 
-def calculate_parlay_breakeven(parlay_type):
+def calculate_parlay_breakeven(parlay_type, platform=None):
     """Calculate break-even probability for PrizePicks-style parlays.
 
     Uses the equation: sum(payout * C(n,k) * p^k * (1-p)^(n-k)) = 1
-    Solves for p (break-even probability per pick).
+    Solves for p (break-even probability per pick). The solution is taken
+    from the payout table registry, so no root finding happens per call.
 
     Args:
-        parlay_type: One of '5-pick-flex', '6-pick-flex', '3-pick-flex', '2-pick-power'
+        parlay_type: A registered parlay type (e.g., '5-pick-flex')
+        platform: Platform whose payout table to use (optional)
 
     Returns:
         Dictionary with parlay info, break-even probability, and odds
     """
-    if parlay_type not in PAYOUT_STRUCTURES:
+    table = get_payout_table(parlay_type, platform)
+    if table is None or table['breakeven_prob'] is None:
         return {
             'error': f"Unknown parlay type: {parlay_type}",
-            'valid_types': list(PAYOUT_STRUCTURES.keys())
+            'valid_types': get_parlay_types(platform)
         }
 
-    payouts = PAYOUT_STRUCTURES[parlay_type]
-    n = max(payouts.keys())  # Total picks
-
-    def expected_value(p):
-        """Calculate expected value given probability p."""
-        ev = 0
-        for k, payout in payouts.items():
-            combinations = math.comb(n, k)
-            prob_k = combinations * (p ** k) * ((1 - p) ** (n - k))
-            ev += payout * prob_k
-        return ev - 1  # Subtract 1 (the stake) to find break-even
-
-    # Find break-even probability using bisection
-    # p must be between 0 and 1
-    breakeven_prob = _bisect(expected_value, 0.01, 0.99, tolerance=1e-6)
+    breakeven_prob = table['breakeven_prob']
+    n = table['total_picks']
+    payouts = dict(table['payouts'])
+    for hits, refund in table['refunds'].items():
+        payouts[hits] = payouts.get(hits, 0.0) + refund
 
     # Calculate edge for reference (if you hit at 50% vs break-even)
     edge_vs_coinflip = breakeven_prob - 0.5
 
     return {
         'parlay_type': parlay_type,
+        'platform': table['platform'],
+        'kind': table['kind'],
         'total_picks': n,
         'payout_structure': payouts,
         'breakeven_prob': round(breakeven_prob, 4),
@@ -200,13 +417,142 @@ def calculate_parlay_breakeven(parlay_type):
     }
 
 
-def get_breakeven_prob(parlay_type):
-    """Get the pre-calculated break-even probability for a parlay type.
+def get_breakeven_prob(parlay_type, platform=None):
+    """Get the break-even probability for a parlay type.
 
     Args:
-        parlay_type: One of '5-pick-flex', '6-pick-flex', '3-pick-flex', '2-pick-power'
+        parlay_type: A registered parlay type (e.g., '5-pick-flex')
+        platform: Platform whose payout table to use (optional)
 
     Returns:
         Break-even probability as decimal, or None if invalid type
     """
-    return BREAKEVEN_PROBS.get(parlay_type)
+    table = get_payout_table(parlay_type, platform)
+    if table is None or table['breakeven_prob'] is None:
+        return None
+    return round(table['breakeven_prob'], 4)
+
+
+def hit_distribution(probs):
+    """Exact distribution of the number of hits for legs with differing probabilities.
+
+    Poisson-binomial dynamic program: after processing each leg, dist[k] is
+    the probability of exactly k hits so far. O(n^2) for n legs.
+
+    Args:
+        probs: Per-leg hit probabilities (0.0 to 1.0)
+
+    Returns:
+        List where index k is the probability of exactly k hits
+    """
+    dist = [1.0]
+    for p in probs:
+        q = 1 - p
+        next_dist = [0.0] * (len(dist) + 1)
+        for k, mass in enumerate(dist):
+            next_dist[k] += mass * q
+            next_dist[k + 1] += mass * p
+        dist = next_dist
+    return dist
+
+
+def _returns_vector(table):
+    """Expand a payout table into a list indexed by hit count (stake multiplier)."""
+    returns = [0.0] * (table['total_picks'] + 1)
+    for hits, multiplier in table['structure_key'][1]:
+        returns[hits] = multiplier
+    return returns
+
+
+def score_slips(slips, parlay_type, platform=None):
+    """Score many candidate slips against one payout table.
+
+    The table is expanded once and every slip reuses it, so scoring
+    thousands of slips is a tight loop over their leg probabilities.
+
+    Args:
+        slips: Iterable of per-leg probability lists, one per slip
+        parlay_type: A registered parlay type (e.g., '5-pick-flex')
+        platform: Platform whose payout table to use (optional)
+
+    Returns:
+        List of (expected_return, roi, variance) tuples, in input order.
+        Expected return and variance are per unit staked.
+
+    Raises:
+        ValueError: If the parlay type is unknown or a slip has the wrong leg count
+    """
+    table = get_payout_table(parlay_type, platform)
+    if table is None:
+        raise ValueError(f"Unknown parlay type: {parlay_type}")
+
+    picks = table['total_picks']
+    returns = _returns_vector(table)
+    paying = [(k, r) for k, r in enumerate(returns) if r]
+
+    scores = []
+    for probs in slips:
+        if len(probs) != picks:
+            raise ValueError(f"{parlay_type} needs {picks} legs, got {len(probs)}")
+
+        # Inline Poisson-binomial DP over a fixed-size buffer
+        dist = [1.0] + [0.0] * picks
+        for n, p in enumerate(probs, start=1):
+            q = 1 - p
+            for k in range(n, 0, -1):
+                dist[k] = dist[k] * q + dist[k - 1] * p
+            dist[0] *= q
+
+        expected = 0.0
+        second_moment = 0.0
+        for k, r in paying:
+            expected += dist[k] * r
+            second_moment += dist[k] * r * r
+        scores.append((expected, expected - 1, second_moment - expected * expected))
+
+    return scores
+
+
+def calculate_slip_ev(probs, parlay_type, platform=None):
+    """Exact EV, ROI and variance for one slip with heterogeneous leg probabilities.
+
+    Args:
+        probs: Per-leg hit probabilities (one per pick)
+        parlay_type: A registered parlay type (e.g., '5-pick-flex')
+        platform: Platform whose payout table to use (optional)
+
+    Returns:
+        Dictionary with expected return, ROI, variance and hit distribution
+    """
+    table = get_payout_table(parlay_type, platform)
+    if table is None:
+        return {
+            'error': f"Unknown parlay type: {parlay_type}",
+            'valid_types': get_parlay_types(platform)
+        }
+
+    if len(probs) != table['total_picks']:
+        return {
+            'error': f"{parlay_type} needs {table['total_picks']} legs, got {len(probs)}"
+        }
+
+    if any(p is None or p < 0 or p > 1 for p in probs):
+        return {'error': 'Leg probabilities must be between 0 and 1'}
+
+    expected, roi, variance = score_slips([probs], parlay_type, platform)[0]
+    dist = hit_distribution(probs)
+    returns = _returns_vector(table)
+
+    return {
+        'parlay_type': parlay_type,
+        'platform': table['platform'],
+        'total_picks': table['total_picks'],
+        'leg_probs': [round(p, 4) for p in probs],
+        'expected_return': round(expected, 4),
+        'roi': round(roi, 4),
+        'roi_percent': round(roi * 100, 2),
+        'variance': round(variance, 4),
+        'std_dev': round(math.sqrt(max(variance, 0.0)), 4),
+        'bust_prob': round(sum(d for d, r in zip(dist, returns) if not r), 4),
+        'hit_distribution': {k: round(d, 4) for k, d in enumerate(dist)},
+    }
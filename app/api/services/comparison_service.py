@@ -1,111 +1,354 @@
+import bisect
 from sqlalchemy import func
 from app.db.session import get_session
 from app.models.statlines import Statlines
 from app.models.books import Books
 from app.models.matchups import Matchups
 from app.models.props import Props
+from app.api.services.search_service import match_matchups, match_players
+from app.api.services.matchup_service import (
+    game_filters, game_ids, normalize_sport, team_condition, upcoming_key
+)
+from app.api.services.pagination import GenerationCache, decode_cursor, encode_cursor
+from app.api.services.fragments import FragmentStore, render
+from app.data_sources import get_data_version, on_sync
 
 
-def get_all_lines_comparison(books=None, team=None, player=None, stat_type=None):
-    """
-    Get all lines grouped by player+stat, showing all books side by side.
+# Sort orders for /compare groups -> size of their (unique) sort key
+COMPARE_SORTS = {'player': 3, 'spread': 5}
+
+# Book selections whose spread order is remembered per data version
+MAX_SPREAD_ORDERS = 16
+
+_groups = GenerationCache()
+_spread_orders = GenerationCache(max_entries=MAX_SPREAD_ORDERS)
+_group_fragments = FragmentStore()
+_pair_fragments = FragmentStore()
 
-    Args:
-        books: List of book names to filter by (optional, empty list means all)
-        team: Filter by team (partial match)
-        player: Filter by player name (partial match)
-        stat_type: Filter by stat type
+
+def _load_groups():
+    """Load every line grouped by player+stat, each book's latest line per group.
+
+    Built once per data version and shared by every /compare request. Each
+    group's all-books view is rendered to JSON here, and only again once
+    the group's lines change.
 
     Returns:
-        Dictionary with comparison data grouped by player+stat
+        List of groups in player order
     """
+    version = get_data_version()
+    cached = _groups.get('groups', version)
+    if cached is not None:
+        return cached
+
     Session = get_session()
     session = Session()
 
     try:
         query = (
-            session.query(Statlines, Books, Matchups, Props)
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.points,
+                Statlines.price, Statlines.designation, Statlines.matchup_id, Books.book_name,
+                Books.book_type, Props.units, Matchups.home_team, Matchups.away_team
+            )
             .join(Books, Statlines.book_id == Books.book_id)
             .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
             .join(Props, Statlines.prop_id == Props.prop_id)
         )
 
-        # Apply books filter (list of book names)
-        if books and len(books) > 0:
-            query = query.filter(Books.book_name.in_(books))
-
-        if stat_type:
-            query = query.filter(func.lower(Props.units) == stat_type.lower())
+        grouped = {}
+        for row in query.yield_per(1000):
+            if not row.player_name or not row.units:
+                continue
 
-        if player:
-            player_pattern = f"%{player.lower()}%"
-            query = query.filter(func.lower(Statlines.player_name).like(player_pattern))
+            key = (row.player_name.lower().strip(), row.units.lower().strip())
+            group = grouped.get(key)
+            if group is None:
+                group = grouped[key] = {
+                    'key': key,
+                    'player_name': row.player_name,
+                    'stat_type': row.units,
+                    'matchup': f"{row.away_team} @ {row.home_team}" if row.home_team else "Unknown",
+                    'matchup_ids': set(),
+                    'lines': {},
+                }
+            group['matchup_ids'].add(row.matchup_id)
+
+            # Syncs append, so a book's latest line for the group wins
+            current = group['lines'].get(row.book_name)
+            if current is None or row.line_id > current['line_id']:
+                group['lines'][row.book_name] = {
+                    'line_id': row.line_id,
+                    'book': row.book_name,
+                    'book_type': row.book_type,
+                    'points': float(row.points) if row.points else None,
+                    'price': float(row.price) if row.price else None,
+                    'designation': row.designation,
+                }
 
-        if team:
-            team_pattern = f"%{team.lower()}%"
-            query = query.filter(
-                (func.lower(Matchups.home_team).like(team_pattern)) |
-                (func.lower(Matchups.away_team).like(team_pattern))
+        groups = sorted(grouped.values(), key=lambda g: (g['player_name'],) + g['key'])
+        for group in groups:
+            signature = tuple(sorted(line['line_id'] for line in group['lines'].values()))
+            group['fragment'] = _group_fragments.render(
+                group['key'], signature, lambda group=group: _view(group, None)
             )
+        _group_fragments.retain(grouped)
+        _groups.put('groups', version, groups)
+        return groups
 
-        all_lines = query.all()
+    finally:
+        session.close()
 
-        # Group by (player_name, stat_type)
-        grouped = {}
-        for statline, book_obj, matchup, prop in all_lines:
-            if not statline.player_name or not prop.units:
-                continue
 
-            key = (statline.player_name.lower().strip(), prop.units.lower().strip())
+def _spreads(lines):
+    """Disagreement between books on a group: points range and implied-probability range.
 
-            if key not in grouped:
-                grouped[key] = {
-                    'player_name': statline.player_name,
-                    'stat_type': prop.units,
-                    'matchup': f"{matchup.away_team} @ {matchup.home_team}" if matchup.home_team else "Unknown",
-                    'lines': []
-                }
+    The implied range is taken within each designation (Over vs Over), and the
+    widest one is reported.
+    """
+    points = [l['points'] for l in lines if l['points'] is not None]
+    points_spread = max(points) - min(points) if len(points) > 1 else 0.0
+
+    by_side = {}
+    for l in lines:
+        if l['price'] is not None:
+            by_side.setdefault(l['designation'], []).append(american_to_implied_prob(l['price']))
+    implied_spread = max(
+        (max(probs) - min(probs) for probs in by_side.values() if len(probs) > 1),
+        default=0.0
+    )
+    return round(points_spread, 1), round(implied_spread * 100, 2)
+
+
+def _view(group, books):
+    """A group's lines restricted to `books`, with spreads, or None if it has none left."""
+    if books:
+        lines = [group['lines'][b] for b in books if b in group['lines']]
+    else:
+        lines = list(group['lines'].values())
+    if not lines:
+        return None
+    points_spread, implied_spread = _spreads(lines)
+    return {
+        'player_name': group['player_name'],
+        'stat_type': group['stat_type'],
+        'matchup': group['matchup'],
+        'points_spread': points_spread,
+        'implied_spread': implied_spread,
+        'lines': sorted(
+            ({k: v for k, v in l.items() if k != 'line_id'} for l in lines),
+            key=lambda x: x['book']
+        ),
+    }
+
+
+def _sort_key(group, view, sort):
+    if sort == 'spread':
+        return (-view['points_spread'], -view['implied_spread'], group['player_name']) + group['key']
+    return (group['player_name'],) + group['key']
+
+
+def _ordered(books, sort):
+    """Groups in `sort` order, with their sort keys.
+
+    Player order doesn't depend on the books selected, so every selection
+    pages over the one shared list of all groups (the filter from
+    _group_filter skips groups without lines at the books). Spread order
+    does, so it is computed per book selection; only the order is kept, for
+    the last MAX_SPREAD_ORDERS selections. Views are built when a group is
+    served (see _serve).
 
-            # Avoid duplicate book entries for same player+stat
-            existing_books = [l['book'] for l in grouped[key]['lines']]
-            if book_obj.book_name not in existing_books:
-                grouped[key]['lines'].append({
-                    'book': book_obj.book_name,
-                    'book_type': book_obj.book_type,
-                    'points': float(statline.points) if statline.points else None,
-                    'price': float(statline.price) if statline.price else None,
-                    'designation': statline.designation,
-                })
+    Returns:
+        Tuple of (list of groups, list of sort keys)
+    """
+    version = get_data_version()
+    groups = _load_groups()
+    if sort == 'player':
+        keys = _groups.get('player_keys', version)
+        if keys is None:
+            keys = [_sort_key(group, None, sort) for group in groups]
+            _groups.put('player_keys', version, keys)
+        return groups, keys
+
+    cache_key = tuple(sorted(books)) if books else ()
+    cached = _spread_orders.get(cache_key, version)
+    if cached is not None:
+        return cached
+
+    entries = []
+    for group in groups:
+        view = _view(group, books)
+        if view is not None:
+            entries.append((_sort_key(group, view, sort), group))
+    entries.sort(key=lambda e: e[0])
+
+    ordered = ([group for _, group in entries], [key for key, _ in entries])
+    _spread_orders.put(cache_key, version, ordered)
+    return ordered
+
+
+def _serve(group, books, rendered):
+    """A group's view of `books`; rendered, the all-books view is the stored fragment."""
+    if rendered and not books:
+        return group['fragment']
+    view = _view(group, books)
+    return render(view) if rendered else view
+
+
+def _normalize_filters(stat_type, player, team):
+    return (
+        stat_type.lower().strip() if stat_type else None,
+        player.lower() if player else None,
+        team.lower() if team else None,
+    )
+
+
+def _group_filter(stat_lower, player_lower, team_lower, games=None, books=None):
+    """Predicate over groups for the given filters, or None if nothing is filtered."""
+    if not (stat_lower or player_lower or team_lower or books) and games is None:
+        return None
 
-        # Convert to list and filter to only include entries with multiple books
-        comparisons = []
-        for data in grouped.values():
-            if len(data['lines']) >= 1:  # Show all lines, even single book
-                # Sort lines by book name for consistent display
-                data['lines'].sort(key=lambda x: x['book'])
-                comparisons.append(data)
+    players = {name.lower().strip() for name in match_players(player_lower)} if player_lower else None
+    matchups = match_matchups(team_lower) if team_lower else None
 
-        # Sort by player name
-        comparisons.sort(key=lambda x: x['player_name'])
+    def matches(group):
+        return (
+            (not stat_lower or group['key'][1] == stat_lower)
+            and (players is None or group['key'][0] in players)
+            and (matchups is None or not matchups.isdisjoint(group['matchup_ids']))
+            and (games is None or not games.isdisjoint(group['matchup_ids']))
+            and (not books or any(book in group['lines'] for book in books))
+        )
+    return matches
 
-        return {
-            'data': comparisons,
-            'meta': {
-                'count': len(comparisons),
-                'filters': {
-                    'books': books,
-                    'stat_type': stat_type,
-                    'player': player,
-                    'team': team
-                }
-            }
-        }
 
-    finally:
-        session.close()
+def iter_comparison(books=None, team=None, player=None, stat_type=None, sport=None,
+                    upcoming_only=False, sort='player', rendered=False):
+    """
+    Yield every matching group, in the same shape and order as get_all_lines_comparison.
+
+    Groups are read lazily from the shared per-version index, so nothing is
+    collected per request. With rendered=True the groups are yielded as
+    pre-rendered JSON fragments.
+
+    Raises:
+        ValueError: If the sort is invalid
+    """
+    if sort not in COMPARE_SORTS:
+        raise ValueError(f'Invalid sort: {sort}')
+
+    groups, _ = _ordered(books, sort)
+    matches = _group_filter(*_normalize_filters(stat_type, player, team), game_ids(sport, upcoming_only), books)
+    return (
+        _serve(group, books, rendered)
+        for group in groups if matches is None or matches(group)
+    )
+
+
+def get_all_lines_comparison(books=None, team=None, player=None, stat_type=None, sport=None,
+                             upcoming_only=False, sort='player', per_page=None, page=1,
+                             cursor=None, include_total=True, rendered=False):
+    """
+    Get all lines grouped by player+stat, showing all books side by side.
+
+    Groups are served from an index built once per data version. When
+    per_page is given, one page of groups is returned: a page starts at the
+    cursor's position (a binary search) and stops once it is full, so its
+    cost follows the page size rather than the size of the slate.
+
+    Args:
+        books: List of book names to filter by (optional, empty list means all)
+        team: Filter by team (partial match)
+        player: Filter by player name (partial match)
+        stat_type: Filter by stat type
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only groups with a game that hasn't started yet
+        sort: 'player' (default) or 'spread' (widest disagreement between books first)
+        per_page: Groups per page (optional, default all groups)
+        page: Page number, used when no cursor is given
+        cursor: Cursor from the previous page's next_cursor (optional)
+        include_total: Whether to include the (cached) total count of groups
+        rendered: Return each group as a pre-rendered JSON fragment
 
+    Returns:
+        Dictionary with comparison data grouped by player+stat
 
-def get_line_comparison(primary_book, team=None, player=None, stat_type=None):
+    Raises:
+        ValueError: If the sort or cursor is invalid
+    """
+    if sort not in COMPARE_SORTS:
+        raise ValueError(f'Invalid sort: {sort}')
+
+    version = get_data_version()
+    groups, keys = _ordered(books, sort)
+
+    stat_lower, player_lower, team_lower = _normalize_filters(stat_type, player, team)
+    matches = _group_filter(stat_lower, player_lower, team_lower, game_ids(sport, upcoming_only), books)
+    filtered = matches is not None
+
+    meta = {
+        'sort': sort,
+        'filters': {
+            'books': books,
+            'stat_type': stat_type,
+            'player': player,
+            'team': team,
+            'sport': sport,
+            'upcoming_only': upcoming_only
+        }
+    }
+
+    if not per_page:
+        comparisons = [_serve(group, books, rendered) for group in groups if not filtered or matches(group)]
+        meta['count'] = len(comparisons)
+        return {'data': comparisons, 'meta': meta}
+
+    if cursor:
+        start = bisect.bisect_right(keys, tuple(decode_cursor(cursor, COMPARE_SORTS[sort])))
+        skip = 0
+        page = None
+    elif not filtered:
+        start, skip = (page - 1) * per_page, 0
+    else:
+        start, skip = 0, (page - 1) * per_page
+
+    found = []  # (position, group)
+    position = start
+    while position < len(groups) and len(found) <= per_page:
+        group = groups[position]
+        if not filtered or matches(group):
+            if skip:
+                skip -= 1
+            else:
+                found.append((position, group))
+        position += 1
+
+    has_more = len(found) > per_page
+    found = found[:per_page]
+    comparisons = [_serve(group, books, rendered) for _, group in found]
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(keys[found[-1][0]]) if has_more else None,
+    }
+
+    if include_total:
+        count_key = ('count', tuple(sorted(books)) if books else (), stat_lower, player_lower, team_lower,
+                     normalize_sport(sport), upcoming_key(upcoming_only))
+        total = _groups.get(count_key, version)
+        if total is None:
+            total = sum(1 for group in groups if not filtered or matches(group))
+            _groups.put(count_key, version, total)
+        pagination['total'] = total
+        pagination['total_pages'] = (total + per_page - 1) // per_page
+
+    meta['count'] = len(comparisons)
+    return {'data': comparisons, 'pagination': pagination, 'meta': meta}
+
+
+def get_line_comparison(primary_book, team=None, player=None, stat_type=None, sport=None,
+                        upcoming_only=False):
     """
     Get side-by-side line comparison with a primary book.
 
@@ -116,6 +359,8 @@ def get_line_comparison(primary_book, team=None, player=None, stat_type=None):
         team: Filter by team (partial match)
         player: Filter by player name (partial match)
         stat_type: Filter by stat type
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
 
     Returns:
         Dictionary with comparison data and metadata:
@@ -155,17 +400,12 @@ def get_line_comparison(primary_book, team=None, player=None, stat_type=None):
                 query = query.filter(func.lower(Props.units) == stat_type.lower())
 
             if player:
-                player_pattern = f"%{player.lower()}%"
-                query = query.filter(func.lower(Statlines.player_name).like(player_pattern))
+                query = query.filter(Statlines.player_name.in_(sorted(match_players(player))))
 
             if team:
-                team_pattern = f"%{team.lower()}%"
-                query = query.filter(
-                    (func.lower(Matchups.home_team).like(team_pattern)) |
-                    (func.lower(Matchups.away_team).like(team_pattern))
-                )
+                query = query.filter(team_condition(team))
 
-            return query
+            return query.filter(*game_filters(sport, upcoming_only))
 
         # Get primary book lines
         primary_lines = build_query(primary_book).all()
@@ -237,7 +477,9 @@ def get_line_comparison(primary_book, team=None, player=None, stat_type=None):
                 'filters': {
                     'stat_type': stat_type,
                     'player': player,
-                    'team': team
+                    'team': team,
+                    'sport': sport,
+                    'upcoming_only': upcoming_only
                 }
             }
         }
@@ -265,165 +507,192 @@ def american_to_implied_prob(odds):
         return abs(odds) / (abs(odds) + 100)
 
 
-def find_discrepancies(min_prob_diff=5, stat_type=None, player=None, team=None, books=None):
-    """
-    Find lines where sportsbooks have significant odds differences.
+def _load_pairs():
+    """Every comparable pair of sportsbook lines, found once per data version.
 
-    Only compares actual sportsbooks (book_type='Sports Book'), excluding
-    fantasy/DFS apps like PrizePicks and Underdog which don't have traditional odds.
-
-    Algorithm:
-    1. Get latest lines from all sportsbooks
-    2. Group by (player_name, stat_type) - normalized to lowercase
-    3. For each player+stat, find all pairs of books with lines within ±2 points
-    4. Compare implied probabilities from odds
-    5. Return pairs where probability difference >= min_prob_diff
-
-    Args:
-        min_prob_diff: Minimum implied probability difference in % (default 5)
-        stat_type: Filter by stat type
-        player: Filter by player name (partial match)
-        team: Filter by team (partial match)
-        books: List of book names to include (optional)
+    Lines are grouped into markets by (player_name, stat_type), normalized to
+    lowercase, plus game and side, and each book keeps only its latest line
+    per market. Every two books in a market are then one pair, so each book
+    and game filter selects whole pairs, and filtering the pairs gives the
+    same result as filtering the lines before pairing them. Pairs within 2
+    points of each other are kept with their implied-probability
+    difference, rendered to JSON, largest difference first. Pairs are
+    rendered again only when one of their two lines is new.
 
     Returns:
-        Dictionary with discrepancy data and metadata
+        List of pairs: {key, books, matchup_id, prob_diff, build, fragment, pair_key}
     """
+    version = get_data_version()
+    cached = _groups.get('pairs', version)
+    if cached is not None:
+        return cached
+
     Session = get_session()
     session = Session()
 
     try:
         # Get all lines from sportsbooks only (exclude fantasy apps)
         query = (
-            session.query(Statlines, Books, Matchups, Props)
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.points, Statlines.price,
+                Statlines.designation, Statlines.matchup_id, Books.book_name, Props.units,
+                Matchups.home_team, Matchups.away_team
+            )
             .join(Books, Statlines.book_id == Books.book_id)
             .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
             .join(Props, Statlines.prop_id == Props.prop_id)
             .filter(Books.book_type == "Sports Book")
+            .order_by(Statlines.line_id)
         )
 
-        # Apply books filter
-        if books and len(books) > 0:
-            query = query.filter(Books.book_name.in_(books))
+        # Each book's latest line per (player_name_lower, stat_type_lower, game, side)
+        markets = {}
+        for row in query.yield_per(1000):
+            if not row.player_name or not row.units:
+                continue
+            if row.points is None or row.price is None:
+                continue
 
-        # Apply filters
-        if stat_type:
-            query = query.filter(func.lower(Props.units) == stat_type.lower())
+            key = (row.player_name.lower().strip(), row.units.lower().strip())
+            # Rows arrive in line_id order, so a later row is the book's latest
+            markets.setdefault((key, row.matchup_id, row.designation), {})[row.book_name] = row
+    finally:
+        session.close()
 
-        if player:
-            player_pattern = f"%{player.lower()}%"
-            query = query.filter(func.lower(Statlines.player_name).like(player_pattern))
+    # Find discrepancies by comparing every two books in each market
+    pairs = []
+    for (key, matchup_id, _), latest in markets.items():
+        if len(latest) < 2:
+            continue
+
+        lines = list(latest.values())
+        for i, line1 in enumerate(lines):
+            for line2 in lines[i + 1:]:
+                books = frozenset((line1.book_name, line2.book_name))
+
+                # Only compare if lines are within ±2 points
+                line_diff = abs(float(line1.points) - float(line2.points))
+                if line_diff > 2:
+                    continue
+
+                implied1 = american_to_implied_prob(line1.price)
+                implied2 = american_to_implied_prob(line2.price)
+                prob_diff = abs(implied1 - implied2) * 100
+
+                # Lower implied probability is the better price for the bettor
+                if implied1 < implied2:
+                    better, worse, better_implied, worse_implied = line1, line2, implied1, implied2
+                else:
+                    better, worse, better_implied, worse_implied = line2, line1, implied2, implied1
+
+                def build(line1=line1, better=better, worse=worse, better_implied=better_implied,
+                          worse_implied=worse_implied, prob_diff=prob_diff, line_diff=line_diff):
+                    return {
+                        'player_name': line1.player_name,
+                        'stat_type': line1.units,
+                        'matchup': f"{line1.away_team} @ {line1.home_team}" if line1.home_team else "Unknown",
+                        'book1_name': better.book_name,
+                        'book1_line': float(better.points),
+                        'book1_odds': int(better.price),
+                        'book1_implied': round(better_implied * 100, 1),
+                        'book2_name': worse.book_name,
+                        'book2_line': float(worse.points),
+                        'book2_odds': int(worse.price),
+                        'book2_implied': round(worse_implied * 100, 1),
+                        'prob_difference': round(prob_diff, 1),
+                        'line_difference': round(line_diff, 1),
+                    }
+
+                pair_key = (better.line_id, worse.line_id)
+                pairs.append({
+                    'key': key,
+                    'books': books,
+                    'matchup_id': matchup_id,
+                    'prob_diff': prob_diff,
+                    'build': build,
+                    'fragment': _pair_fragments.render(pair_key, None, build),
+                    'pair_key': pair_key,
+                })
 
-        if team:
-            team_pattern = f"%{team.lower()}%"
-            query = query.filter(
-                (func.lower(Matchups.home_team).like(team_pattern)) |
-                (func.lower(Matchups.away_team).like(team_pattern))
-            )
+    _pair_fragments.retain(pair['pair_key'] for pair in pairs)
 
-        all_lines = query.all()
+    # Sort by probability difference (largest first)
+    pairs.sort(key=lambda pair: round(pair['prob_diff'], 1), reverse=True)
+    _groups.put('pairs', version, pairs)
+    return pairs
 
-        # Group lines by (player_name_lower, stat_type_lower)
-        lines_by_key = {}
-        for statline, book, matchup, prop in all_lines:
-            if not statline.player_name or not prop.units:
-                continue
-            if statline.points is None or statline.price is None:
-                continue
 
-            key = (statline.player_name.lower().strip(), prop.units.lower().strip())
+@on_sync
+def render_markets(changes=None):
+    """Build and render the comparison groups and discrepancy pairs once a sync commits."""
+    _load_groups()
+    _load_pairs()
 
-            if key not in lines_by_key:
-                lines_by_key[key] = []
 
-            lines_by_key[key].append({
-                'book_name': book.book_name,
-                'player_name': statline.player_name,
-                'stat_type': prop.units,
-                'points': float(statline.points),
-                'odds': float(statline.price),
-                'matchup': matchup,
-            })
+def find_discrepancies(min_prob_diff=5, stat_type=None, player=None, team=None, books=None,
+                       sport=None, upcoming_only=False, rendered=False):
+    """
+    Find lines where sportsbooks have significant odds differences.
 
-        # Find discrepancies by comparing all pairs of books for each player+stat
-        discrepancies = []
-        seen_pairs = set()
+    Only compares actual sportsbooks (book_type='Sports Book'), excluding
+    fantasy/DFS apps like PrizePicks and Underdog which don't have traditional odds.
 
-        for key, lines in lines_by_key.items():
-            if len(lines) < 2:
-                continue
+    Algorithm:
+    1. Get latest lines from all sportsbooks
+    2. Group by (player_name, stat_type) - normalized to lowercase - and game and side
+    3. For each market, find all pairs of books with lines within ±2 points
+    4. Compare implied probabilities from odds
+    5. Return pairs where probability difference >= min_prob_diff
 
-            # Compare all pairs of different books
-            for i, line1 in enumerate(lines):
-                for line2 in lines[i + 1:]:
-                    # Skip if same book (could be duplicate entries)
-                    if line1['book_name'] == line2['book_name']:
-                        continue
-
-                    # Create a unique pair key to avoid duplicates
-                    pair_key = tuple(sorted([
-                        f"{line1['book_name']}:{key[0]}:{key[1]}",
-                        f"{line2['book_name']}:{key[0]}:{key[1]}"
-                    ]))
-                    if pair_key in seen_pairs:
-                        continue
-                    seen_pairs.add(pair_key)
-
-                    # Only compare if lines are within ±2 points
-                    line_diff = abs(line1['points'] - line2['points'])
-                    if line_diff > 2:
-                        continue
-
-                    # Calculate implied probabilities
-                    implied1 = american_to_implied_prob(line1['odds'])
-                    implied2 = american_to_implied_prob(line2['odds'])
-
-                    if implied1 is None or implied2 is None:
-                        continue
-
-                    prob_diff = abs(implied1 - implied2) * 100
-
-                    if prob_diff >= min_prob_diff:
-                        # Determine which book has better odds (lower implied = better for bettor)
-                        if implied1 < implied2:
-                            better_book, worse_book = line1, line2
-                            better_implied, worse_implied = implied1, implied2
-                        else:
-                            better_book, worse_book = line2, line1
-                            better_implied, worse_implied = implied2, implied1
-
-                        matchup = line1['matchup']
-                        discrepancies.append({
-                            'player_name': line1['player_name'],
-                            'stat_type': line1['stat_type'],
-                            'matchup': f"{matchup.away_team} @ {matchup.home_team}" if matchup.home_team else "Unknown",
-                            'book1_name': better_book['book_name'],
-                            'book1_line': better_book['points'],
-                            'book1_odds': int(better_book['odds']),
-                            'book1_implied': round(better_implied * 100, 1),
-                            'book2_name': worse_book['book_name'],
-                            'book2_line': worse_book['points'],
-                            'book2_odds': int(worse_book['odds']),
-                            'book2_implied': round(worse_implied * 100, 1),
-                            'prob_difference': round(prob_diff, 1),
-                            'line_difference': round(line_diff, 1),
-                        })
-
-        # Sort by probability difference (largest first)
-        discrepancies.sort(key=lambda x: x['prob_difference'], reverse=True)
+    Steps 1-4 run once per data version (see _load_pairs); a request only
+    selects pairs.
 
-        return {
-            'data': discrepancies,
-            'meta': {
-                'min_prob_diff_applied': min_prob_diff,
-                'count': len(discrepancies),
-                'filters': {
-                    'stat_type': stat_type,
-                    'player': player,
-                    'team': team
-                }
+    Args:
+        min_prob_diff: Minimum implied probability difference in % (default 5)
+        stat_type: Filter by stat type
+        player: Filter by player name (partial match)
+        team: Filter by team (partial match)
+        books: List of book names to include (optional)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        rendered: Return each discrepancy as a pre-rendered JSON fragment
+
+    Returns:
+        Dictionary with discrepancy data and metadata
+    """
+    stat_lower, player_lower, team_lower = _normalize_filters(stat_type, player, team)
+    players = {name.lower().strip() for name in match_players(player_lower)} if player_lower else None
+    matchups = match_matchups(team_lower) if team_lower else None
+    games = game_ids(sport, upcoming_only)
+    books = set(books) if books else None
+
+    discrepancies = []
+    for pair in _load_pairs():
+        if pair['prob_diff'] < min_prob_diff:
+            continue
+        if books is not None and not pair['books'] <= books:
+            continue
+        if stat_lower and pair['key'][1] != stat_lower:
+            continue
+        if players is not None and pair['key'][0] not in players:
+            continue
+        if matchups is not None and pair['matchup_id'] not in matchups:
+            continue
+        if games is not None and pair['matchup_id'] not in games:
+            continue
+        discrepancies.append(pair['fragment'] if rendered else pair['build']())
+
+    return {
+        'data': discrepancies,
+        'meta': {
+            'min_prob_diff_applied': min_prob_diff,
+            'count': len(discrepancies),
+            'filters': {
+                'stat_type': stat_type,
+                'player': player,
+                'team': team,
+                'sport': sport,
+                'upcoming_only': upcoming_only
             }
         }
-
-    finally:
-        session.close()
+    }
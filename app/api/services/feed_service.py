@@ -0,0 +1,652 @@
+"""
+Live change feed and change log.
+
+Each sync's change set is folded into an in-memory view of the latest line
+per outcome (book + game + prop + player + side), and turned into one event:
+lines that were inserted, moved or removed, book pairs whose discrepancy
+changed, and markets whose sharp prices moved under a DFS line. The event is
+built once and handed to every subscriber; each subscriber only filters it.
+Work per sync follows the size of the change, not the number of watchers or
+how often they'd otherwise poll.
+
+The last CHANGE_LOG_SIZE events are also kept so clients can ask for
+everything that changed since a data version they already hold.
+
+Events are built from the persisted sync log (see data_sources.sync_log),
+so every server process produces the same events whichever process ran the
+sync: the syncing process on its on_sync hook, the others as soon as a
+/stream, /changes or signals request sees the data version move. A process
+that starts following replays the last CHANGE_LOG_SIZE syncs. Outcomes of
+games a sync no longer lists are forgotten, so the view stays the size of
+the current slate.
+"""
+import hashlib
+import queue
+import threading
+from collections import deque
+from itertools import combinations
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.books import Books
+from app.models.matchups import Matchups
+from app.models.props import Props
+from app.data_sources import get_data_version, on_sync
+from app.data_sources.sync_log import SyncFollower
+from app.api.services.comparison_service import american_to_implied_prob
+from app.api.services.calculator_service import get_breakeven_prob
+from app.api.services.search_service import match_matchups, match_players
+from app.api.services.matchup_service import game_ids
+
+# Events a subscriber may fall behind by before it is told to reload
+SUBSCRIBER_QUEUE_SIZE = 50
+
+# Books whose lines are within this many points are compared for discrepancies
+DISCREPANCY_MAX_LINE_DIFF = 2
+
+# Syncs kept for /changes; older versions get a full-reload answer
+CHANGE_LOG_SIZE = 50
+
+TOPICS = ('lines', 'discrepancies', 'ev')
+
+# Put on a subscriber's queue when it overflowed and missed events
+RESET = object()
+
+
+class Subscription:
+    """One watcher's queue of pending events."""
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.lagged = False
+
+    def get(self, timeout):
+        """Next event, RESET if events were dropped, or raise queue.Empty."""
+        if self.lagged:
+            self.lagged = False
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            return RESET
+        return self.queue.get(timeout=timeout)
+
+
+class ChangeFeed:
+    """Fan-out of published events to every current subscriber."""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.lagged = True
+
+
+feed = ChangeFeed()
+
+_outcomes = {}  # outcome key -> latest row
+_written_together = {}  # (book, matchup, prop) -> outcome keys last written for it
+_markets = {}  # (player, stat, side) lowercased -> {book: row}
+_log = deque(maxlen=CHANGE_LOG_SIZE)
+_state = {'ready': False, 'version': None}
+_lock = threading.Lock()
+
+
+def _market_key(row):
+    designation = row['designation'].lower() if row['designation'] else 'over'
+    return (row['player_name'].lower().strip(), row['units'].lower().strip(), designation)
+
+
+def _outcome_key(row):
+    return (row['book_name'], row['matchup_id'], row['prop_id'],
+            row['player_name'], row['designation'], row['line_type'])
+
+
+def _batch_key(row):
+    return (row['book_name'], row['matchup_id'], row['prop_id'])
+
+
+def _track(row):
+    """Make `row` the current line for its outcome and market side."""
+    key = _outcome_key(row)
+    _outcomes[key] = row
+    _written_together.setdefault(_batch_key(row), set()).add(key)
+    books = _markets.setdefault(_market_key(row), {})
+    current = books.get(row['book_name'])
+    if current is None or row['line_id'] >= current['line_id']:
+        books[row['book_name']] = row
+
+
+def _load_baseline(before_line_id):
+    """Latest line per outcome written before `before_line_id`.
+
+    Used once per process so the first event is a diff, not the whole slate.
+    With no `before_line_id` every line is loaded.
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = (
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.price,
+                Statlines.points, Statlines.designation, Statlines.line_type,
+                Statlines.matchup_id, Statlines.prop_id, Statlines.book_id,
+                Books.book_name, Books.book_type, Props.units,
+                Matchups.home_team, Matchups.away_team
+            )
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+        )
+        if before_line_id is not None:
+            query = query.filter(Statlines.line_id < before_line_id)
+
+        for r in query.yield_per(1000):
+            if not r.player_name or not r.units:
+                continue
+            row = {
+                'line_id': r.line_id,
+                'book_id': r.book_id,
+                'book_name': r.book_name,
+                'book_type': r.book_type,
+                'matchup_id': r.matchup_id,
+                'home_team': r.home_team,
+                'away_team': r.away_team,
+                'prop_id': r.prop_id,
+                'units': r.units,
+                'player_name': r.player_name,
+                'designation': r.designation,
+                'line_type': r.line_type,
+                'points': float(r.points) if r.points is not None else None,
+                'price': float(r.price) if r.price is not None else None,
+            }
+            current = _outcomes.get(_outcome_key(row))
+            if current is None or r.line_id > current['line_id']:
+                _track(row)
+
+    finally:
+        session.close()
+
+
+def _matchup(row):
+    return f"{row['away_team']} @ {row['home_team']}" if row['home_team'] else "Unknown"
+
+
+def _line_payload(row):
+    return {
+        'key': hashlib.md5(repr(_outcome_key(row)).encode()).hexdigest()[:12],
+        'id': row['line_id'],
+        'player_name': row['player_name'],
+        'book': row['book_name'],
+        'book_type': row['book_type'],
+        'stat_type': row['units'],
+        'matchup': _matchup(row),
+        'matchup_id': row['matchup_id'],
+        'designation': row['designation'],
+        'line_type': row['line_type'],
+        'points': row['points'],
+        'price': row['price'],
+    }
+
+
+def _discrepancies(books):
+    """Implied-probability gap for every pair of sportsbooks on one market side.
+
+    Returns:
+        Dict of (book, book) -> (gap in %, better row, worse row)
+    """
+    priced = sorted(
+        (row for row in books.values()
+         if row['book_type'] == "Sports Book" and row['points'] is not None and row['price'] is not None),
+        key=lambda row: row['book_name']
+    )
+    pairs = {}
+    for a, b in combinations(priced, 2):
+        if abs(a['points'] - b['points']) > DISCREPANCY_MAX_LINE_DIFF:
+            continue
+        implied_a = american_to_implied_prob(a['price'])
+        implied_b = american_to_implied_prob(b['price'])
+        better, worse = (a, b) if implied_a < implied_b else (b, a)
+        pairs[(a['book_name'], b['book_name'])] = (abs(implied_a - implied_b) * 100, better, worse)
+    return pairs
+
+
+def _discrepancy_payload(gap, better, worse, previous_gap):
+    """A book pair's discrepancy; gap is None when the pair no longer compares."""
+    better_implied = american_to_implied_prob(better['price'])
+    worse_implied = american_to_implied_prob(worse['price'])
+    if previous_gap is None:
+        change = 'inserted'
+    elif gap is None:
+        change = 'removed'
+    else:
+        change = 'updated'
+    return {
+        'change': change,
+        'player_name': better['player_name'],
+        'stat_type': better['units'],
+        'designation': better['designation'],
+        'matchup': _matchup(better),
+        'matchup_id': better['matchup_id'],
+        'book1_name': better['book_name'],
+        'book1_line': better['points'],
+        'book1_odds': int(better['price']),
+        'book1_implied': round(better_implied * 100, 1),
+        'book2_name': worse['book_name'],
+        'book2_line': worse['points'],
+        'book2_odds': int(worse['price']),
+        'book2_implied': round(worse_implied * 100, 1),
+        'prob_difference': round(gap, 1) if gap is not None else None,
+        'previous_prob_difference': round(previous_gap, 1) if previous_gap is not None else None,
+        'line_difference': round(abs(better['points'] - worse['points']), 1),
+    }
+
+
+def _sharp_implied(books):
+    return {
+        name: american_to_implied_prob(row['price'])
+        for name, row in books.items()
+        if row['book_type'] == "Sports Book" and row['price'] is not None
+    }
+
+
+def _retain(matchup_ids):
+    """Forget outcomes of games that are no longer in the slate."""
+    for key in [key for key in _outcomes if key[1] not in matchup_ids]:
+        del _outcomes[key]
+    for batch in [batch for batch in _written_together if batch[1] not in matchup_ids]:
+        del _written_together[batch]
+    for key, books in list(_markets.items()):
+        for name in [name for name, row in books.items() if row['matchup_id'] not in matchup_ids]:
+            del books[name]
+        if not books:
+            del _markets[key]
+
+
+def _build_event(changes, sync):
+    """Fold a sync's change set into the current view and describe what changed."""
+    before = {}
+    lines = []
+
+    def touch(row):
+        key = _market_key(row)
+        if key not in before:
+            before[key] = dict(_markets.get(key, {}))
+
+    written = {}
+    for row in changes:
+        if not row['player_name'] or not row['units']:
+            continue
+        key = _outcome_key(row)
+        if key not in written or row['line_id'] > written[key]['line_id']:
+            written[key] = row
+
+    batches = {}
+    for key, row in written.items():
+        batches.setdefault(_batch_key(row), set()).add(key)
+        previous = _outcomes.get(key)
+        if previous is not None and previous['line_id'] > row['line_id']:
+            continue
+        touch(row)
+        _track(row)
+
+        if previous is None:
+            lines.append(dict(_line_payload(row), change='inserted'))
+        elif previous['price'] != row['price'] or previous['points'] != row['points']:
+            lines.append(dict(
+                _line_payload(row),
+                change='updated',
+                previous_price=previous['price'],
+                previous_points=previous['points'],
+            ))
+
+    # An outcome missing from a book's rewrite of its game+prop was pulled
+    for batch, keys in batches.items():
+        for key in _written_together.get(batch, set()) - keys:
+            row = _outcomes.pop(key, None)
+            if row is None:
+                continue
+            touch(row)
+            lines.append(dict(_line_payload(row), change='removed'))
+            books = _markets.get(_market_key(row), {})
+            if books.get(row['book_name']) is row:
+                del books[row['book_name']]
+        _written_together[batch] = keys
+
+    discrepancies = []
+    ev = []
+    for key, old_books in before.items():
+        books = _markets.get(key, {})
+
+        old_pairs = _discrepancies(old_books)
+        new_pairs = _discrepancies(books)
+        for pair, (gap, better, worse) in new_pairs.items():
+            previous = old_pairs.get(pair)
+            previous_gap = previous[0] if previous is not None else None
+            if previous_gap is None or round(previous_gap, 1) != round(gap, 1):
+                discrepancies.append(_discrepancy_payload(gap, better, worse, previous_gap))
+        for pair, (previous_gap, better, worse) in old_pairs.items():
+            if pair not in new_pairs:
+                discrepancies.append(_discrepancy_payload(None, better, worse, previous_gap))
+
+        betting_rows = [row for row in books.values() if row['book_type'] != "Sports Book"]
+        betting = {row['book_name']: {'id': row['line_id'], 'points': row['points']} for row in betting_rows}
+        if betting:
+            implied_before = _sharp_implied(old_books)
+            implied_after = _sharp_implied(books)
+            if implied_before != implied_after:
+                sample = next(iter(betting_rows))
+                ev.append({
+                    'player_name': sample['player_name'],
+                    'stat_type': sample['units'],
+                    'designation': sample['designation'],
+                    'matchup': _matchup(sample),
+                    'matchup_id': sample['matchup_id'],
+                    'betting_lines': betting,
+                    'implied_before': implied_before,
+                    'implied_after': implied_after,
+                })
+
+    event = {
+        'version': sync.version,
+        'previous_version': _state['version'],
+        'synced_at': sync.synced_at.isoformat() + 'Z' if sync.synced_at else None,
+        'lines': lines,
+        'discrepancies': discrepancies,
+        'ev': ev,
+    }
+    _state['version'] = sync.version
+    return event
+
+
+def _apply_sync(changes, sync):
+    """Turn one recorded sync into an event, log it and fan it out to subscribers."""
+    with _lock:
+        if not _state['ready']:
+            _load_baseline(sync.first_line_id)
+            _state['ready'] = True
+        event = _build_event(changes, sync)
+        # Every sync rewrites the whole slate, so games it didn't list are gone
+        if changes:
+            _retain({row['matchup_id'] for row in changes})
+        _log.append(event)
+    feed.publish(event)
+
+
+_follower = SyncFollower(_apply_sync, backlog=CHANGE_LOG_SIZE)
+
+
+def poll():
+    """Publish events for any syncs this process hasn't seen yet.
+
+    Returns:
+        Number of syncs published
+    """
+    return _follower.catch_up()
+
+
+@on_sync
+def publish_changes(changes):
+    """Publish the sync that just committed (and any this process missed)."""
+    return _follower.catch_up(changes)
+
+
+def events_since(version):
+    """Logged events after data version `version`, oldest first.
+
+    Returns:
+        List of events, or None if `version` is older than the log (or
+        unknown) and the client should reload
+    """
+    poll()
+    with _lock:
+        events = list(_log)
+        latest = _state['version']
+
+    if latest != get_data_version():
+        return None
+    if version == latest:
+        return []
+    start = next((i for i, event in enumerate(events) if event['previous_version'] == version), None)
+    if start is None:
+        return None
+    return events[start:]
+
+
+def _ev_crossings(entries, betting_book, sharp_books, breakeven_prob):
+    """EV entries where the sharp average crossed the break-even for one watcher."""
+    def average(implied):
+        probs = [p for name, p in implied.items() if name in sharp_books]
+        return sum(probs) / len(probs) if probs else None
+
+    crossings = []
+    for entry in entries:
+        line = entry['betting_lines'].get(betting_book)
+        if line is None:
+            continue
+        before = average(entry['implied_before'])
+        after = average(entry['implied_after'])
+        was_ev = before is not None and before > breakeven_prob
+        is_ev = after is not None and after > breakeven_prob
+        if was_ev == is_ev:
+            continue
+        crossings.append({
+            'id': line['id'],
+            'player_name': entry['player_name'],
+            'stat_type': entry['stat_type'],
+            'designation': entry['designation'],
+            'points': line['points'],
+            'matchup': entry['matchup'],
+            'matchup_id': entry['matchup_id'],
+            'betting_book': betting_book,
+            'change': 'entered' if is_ev else 'left',
+            'sharp_implied_prob': round(after, 4) if after is not None else None,
+            'edge_percent': round((after - breakeven_prob) * 100, 2) if after is not None else None,
+            'breakeven_prob': breakeven_prob,
+        })
+    return crossings
+
+
+def filter_event(event, topics=TOPICS, books=None, stat_type=None, player=None, team=None,
+                 sport=None, upcoming_only=False, min_prob_diff=5, betting_book=None,
+                 sharp_books=None, parlay_type=None, alerts=True):
+    """
+    One subscriber's view of an event.
+
+    Args:
+        event: Event from the feed
+        topics: Parts of the event to include ('lines', 'discrepancies', 'ev')
+        books: Only lines/discrepancies involving these books (optional)
+        stat_type: Filter by stat type
+        player: Filter by player name (partial match)
+        team: Filter by team (partial match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        min_prob_diff: Discrepancy gap (in %) that matters to this subscriber
+        betting_book: DFS book for EV crossings (EV needs all three EV args)
+        sharp_books: Books averaged for the sharp probability
+        parlay_type: Parlay type whose break-even defines +EV
+        alerts: If True, only discrepancies that just reached min_prob_diff;
+            otherwise every change to a discrepancy at or above it (before
+            or after), so a client can patch its table
+
+    Returns:
+        Dict of the event's filtered parts, or None if nothing is left
+    """
+    stat_lower = stat_type.lower() if stat_type else None
+    players = match_players(player) if player else None
+    matchups = match_matchups(team) if team else None
+    games = game_ids(sport, upcoming_only)
+    books = set(books) if books else None
+
+    def wanted(item):
+        return (
+            (not stat_lower or (item['stat_type'] or '').lower() == stat_lower)
+            and (players is None or item['player_name'] in players)
+            and (matchups is None or item['matchup_id'] in matchups)
+            and (games is None or item['matchup_id'] in games)
+        )
+
+    view = {}
+    if 'lines' in topics:
+        lines = [l for l in event['lines'] if wanted(l) and (not books or l['book'] in books)]
+        if lines:
+            view['lines'] = lines
+
+    def relevant(d):
+        now = d['prob_difference'] is not None and d['prob_difference'] >= min_prob_diff
+        was = d['previous_prob_difference'] is not None and d['previous_prob_difference'] >= min_prob_diff
+        return now and not was if alerts else now or was
+
+    if 'discrepancies' in topics:
+        discrepancies = [
+            d for d in event['discrepancies']
+            if wanted(d)
+            and relevant(d)
+            and (not books or (d['book1_name'] in books and d['book2_name'] in books))
+        ]
+        if discrepancies:
+            view['discrepancies'] = discrepancies
+
+    if 'ev' in topics and betting_book and sharp_books and parlay_type:
+        breakeven_prob = get_breakeven_prob(parlay_type, betting_book)
+        if breakeven_prob:
+            ev = _ev_crossings(
+                [e for e in event['ev'] if wanted(e)], betting_book, set(sharp_books), breakeven_prob
+            )
+            if ev:
+                view['ev'] = ev
+
+    if not view:
+        return None
+    view['version'] = event['version']
+    view['synced_at'] = event['synced_at']
+    return view
+
+
+def _merge(events):
+    """Collapse consecutive events into one net diff.
+
+    Lines are folded per outcome (inserted then removed cancels out; repeated
+    moves keep the first previous value), discrepancies per book pair and EV
+    entries per market. Anything that ended where it started is dropped, so
+    the result is the size of the net change.
+    """
+    lines = {}
+    for event in events:
+        for line in event['lines']:
+            key = line['key']
+            prior = lines.get(key)
+            if prior is None:
+                lines[key] = line
+            elif line['change'] == 'removed':
+                if prior['change'] == 'inserted':
+                    del lines[key]
+                else:
+                    lines[key] = line
+            elif prior['change'] == 'inserted':
+                lines[key] = {k: v for k, v in line.items() if not k.startswith('previous_')}
+                lines[key]['change'] = 'inserted'
+            elif prior['change'] == 'removed':
+                lines[key] = dict(line, change='updated',
+                                  previous_price=prior['price'], previous_points=prior['points'])
+            else:
+                lines[key] = dict(line, previous_price=prior['previous_price'],
+                                  previous_points=prior['previous_points'])
+
+    discrepancies = {}
+    for event in events:
+        for d in event['discrepancies']:
+            key = (d['player_name'], d['stat_type'], d['designation'], d['matchup'],
+                   tuple(sorted((d['book1_name'], d['book2_name']))))
+            prior = discrepancies.get(key)
+            if prior is None:
+                discrepancies[key] = d
+                continue
+            previous = prior['previous_prob_difference']
+            if previous is None and d['prob_difference'] is None:
+                del discrepancies[key]
+                continue
+            merged = dict(d, previous_prob_difference=previous)
+            merged['change'] = 'inserted' if previous is None else 'removed' if d['prob_difference'] is None else 'updated'
+            discrepancies[key] = merged
+
+    ev = {}
+    for event in events:
+        for entry in event['ev']:
+            key = (entry['player_name'], entry['stat_type'], entry['designation'], entry['matchup'])
+            prior = ev.get(key)
+            ev[key] = entry if prior is None else dict(entry, implied_before=prior['implied_before'])
+
+    return {
+        'version': events[-1]['version'],
+        'synced_at': events[-1]['synced_at'],
+        'lines': [
+            line for line in lines.values()
+            if line['change'] != 'updated'
+            or (line['price'], line['points']) != (line['previous_price'], line['previous_points'])
+        ],
+        'discrepancies': [
+            d for d in discrepancies.values()
+            if d['change'] != 'updated' or d['prob_difference'] != d['previous_prob_difference']
+        ],
+        'ev': [entry for entry in ev.values() if entry['implied_before'] != entry['implied_after']],
+    }
+
+
+def get_changes(since, **filters):
+    """
+    Get everything that changed after data version `since`, as one net diff.
+
+    Args:
+        since: Data version the client already holds
+        **filters: Subscriber filters (see filter_event); discrepancies are
+            returned whenever they change at or above min_prob_diff
+
+    Returns:
+        Dictionary with the diff, or reload=True when `since` is older than
+        the change log (or the current sync isn't in the sync log) and the
+        client should fetch the full endpoints again
+    """
+    version = get_data_version()
+    result = {
+        'since': since,
+        'version': version,
+        'reload': False,
+        'lines': [],
+        'discrepancies': [],
+        'ev': [],
+    }
+    if since == version:
+        return result
+
+    events = events_since(since)
+    if events is None:
+        result['reload'] = True
+        return result
+    if not events:
+        return result
+
+    view = filter_event(_merge(events), alerts=False, **filters)
+    if view is not None:
+        for part in TOPICS:
+            result[part] = view.get(part, [])
+    result['synced_at'] = events[-1]['synced_at']
+    result['syncs'] = len(events)
+    return result
@@ -1,172 +1,203 @@
-from sqlalchemy import func, distinct, or_
+import threading
+from sqlalchemy import func
 from app.db.session import get_session
 from app.models.statlines import Statlines
 from app.models.books import Books
 from app.models.matchups import Matchups
 from app.models.props import Props
+from app.data_sources import get_data_version, on_sync
+from app.utils import sport_for_team
+from app.api.services.matchup_service import game_ids
 
-# Sport inference from team names
-TEAM_TO_SPORT = {
-    # NFL Teams
-    'Arizona Cardinals': 'NFL', 'Atlanta Falcons': 'NFL', 'Baltimore Ravens': 'NFL',
-    'Buffalo Bills': 'NFL', 'Carolina Panthers': 'NFL', 'Chicago Bears': 'NFL',
-    'Cincinnati Bengals': 'NFL', 'Cleveland Browns': 'NFL', 'Dallas Cowboys': 'NFL',
-    'Denver Broncos': 'NFL', 'Detroit Lions': 'NFL', 'Green Bay Packers': 'NFL',
-    'Houston Texans': 'NFL', 'Indianapolis Colts': 'NFL', 'Jacksonville Jaguars': 'NFL',
-    'Kansas City Chiefs': 'NFL', 'Las Vegas Raiders': 'NFL', 'Los Angeles Chargers': 'NFL',
-    'Los Angeles Rams': 'NFL', 'Miami Dolphins': 'NFL', 'Minnesota Vikings': 'NFL',
-    'New England Patriots': 'NFL', 'New Orleans Saints': 'NFL', 'New York Giants': 'NFL',
-    'New York Jets': 'NFL', 'Philadelphia Eagles': 'NFL', 'Pittsburgh Steelers': 'NFL',
-    'San Francisco 49ers': 'NFL', 'Seattle Seahawks': 'NFL', 'Tampa Bay Buccaneers': 'NFL',
-    'Tennessee Titans': 'NFL', 'Washington Commanders': 'NFL',
-    # NBA Teams
-    'Atlanta Hawks': 'NBA', 'Boston Celtics': 'NBA', 'Brooklyn Nets': 'NBA',
-    'Charlotte Hornets': 'NBA', 'Chicago Bulls': 'NBA', 'Cleveland Cavaliers': 'NBA',
-    'Dallas Mavericks': 'NBA', 'Denver Nuggets': 'NBA', 'Detroit Pistons': 'NBA',
-    'Golden State Warriors': 'NBA', 'Houston Rockets': 'NBA', 'Indiana Pacers': 'NBA',
-    'Los Angeles Clippers': 'NBA', 'Los Angeles Lakers': 'NBA', 'Memphis Grizzlies': 'NBA',
-    'Miami Heat': 'NBA', 'Milwaukee Bucks': 'NBA', 'Minnesota Timberwolves': 'NBA',
-    'New Orleans Pelicans': 'NBA', 'New York Knicks': 'NBA', 'Oklahoma City Thunder': 'NBA',
-    'Orlando Magic': 'NBA', 'Philadelphia 76ers': 'NBA', 'Phoenix Suns': 'NBA',
-    'Portland Trail Blazers': 'NBA', 'Sacramento Kings': 'NBA', 'San Antonio Spurs': 'NBA',
-    'Toronto Raptors': 'NBA', 'Utah Jazz': 'NBA', 'Washington Wizards': 'NBA',
-    # NHL Teams
-    'Anaheim Ducks': 'NHL', 'Arizona Coyotes': 'NHL', 'Boston Bruins': 'NHL',
-    'Buffalo Sabres': 'NHL', 'Calgary Flames': 'NHL', 'Carolina Hurricanes': 'NHL',
-    'Chicago Blackhawks': 'NHL', 'Colorado Avalanche': 'NHL', 'Columbus Blue Jackets': 'NHL',
-    'Dallas Stars': 'NHL', 'Detroit Red Wings': 'NHL', 'Edmonton Oilers': 'NHL',
-    'Florida Panthers': 'NHL', 'Los Angeles Kings': 'NHL', 'Minnesota Wild': 'NHL',
-    'Montréal Canadiens': 'NHL', 'Nashville Predators': 'NHL', 'New Jersey Devils': 'NHL',
-    'New York Islanders': 'NHL', 'New York Rangers': 'NHL', 'Ottawa Senators': 'NHL',
-    'Philadelphia Flyers': 'NHL', 'Pittsburgh Penguins': 'NHL', 'San Jose Sharks': 'NHL',
-    'Seattle Kraken': 'NHL', 'St. Louis Blues': 'NHL', 'Tampa Bay Lightning': 'NHL',
-    'Toronto Maple Leafs': 'NHL', 'Vancouver Canucks': 'NHL', 'Vegas Golden Knights': 'NHL',
-    'Washington Capitals': 'NHL', 'Winnipeg Jets': 'NHL', 'Utah Mammoth': 'NHL',
-    # MLB Teams
-    'Arizona Diamondbacks': 'MLB', 'Atlanta Braves': 'MLB', 'Baltimore Orioles': 'MLB',
-    'Boston Red Sox': 'MLB', 'Chicago Cubs': 'MLB', 'Chicago White Sox': 'MLB',
-    'Cincinnati Reds': 'MLB', 'Cleveland Guardians': 'MLB', 'Colorado Rockies': 'MLB',
-    'Detroit Tigers': 'MLB', 'Houston Astros': 'MLB', 'Kansas City Royals': 'MLB',
-    'Los Angeles Angels': 'MLB', 'Los Angeles Dodgers': 'MLB', 'Miami Marlins': 'MLB',
-    'Milwaukee Brewers': 'MLB', 'Minnesota Twins': 'MLB', 'New York Mets': 'MLB',
-    'New York Yankees': 'MLB', 'Oakland Athletics': 'MLB', 'Philadelphia Phillies': 'MLB',
-    'Pittsburgh Pirates': 'MLB', 'San Diego Padres': 'MLB', 'San Francisco Giants': 'MLB',
-    'Seattle Mariners': 'MLB', 'St. Louis Cardinals': 'MLB', 'Tampa Bay Rays': 'MLB',
-    'Texas Rangers': 'MLB', 'Toronto Blue Jays': 'MLB', 'Washington Nationals': 'MLB',
-}
+# Filter panel dimensions, in response order
+FACETS = ('sport', 'team', 'player', 'stat_type', 'book')
+
+# Most distinct filter combinations whose counts are remembered per sync
+MAX_FACET_RESULTS = 1000
 
 
 def get_sport_for_team(team_name):
     """Get sport for a team name."""
-    return TEAM_TO_SPORT.get(team_name, None)
+    return sport_for_team(team_name)
+
+
+class FacetIndex:
+    """Counts of current lines per (game, player, stat type, book), rebuilt once per sync.
+
+    A current line is the latest one written for its book + game + prop +
+    player + side. Facet counts for any filter selection are summed from
+    these cells in memory, so the filter panel never touches the database.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.cells = []
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def rebuild(self, version):
+        """Recount the cells from the database for `version`."""
+        Session = get_session()
+        session = Session()
+
+        try:
+            latest = (
+                session.query(func.max(Statlines.line_id).label('line_id'))
+                .group_by(
+                    Statlines.book_id, Statlines.matchup_id, Statlines.prop_id,
+                    Statlines.player_name, Statlines.designation, Statlines.line_type
+                )
+                .subquery()
+            )
+            rows = (
+                session.query(
+                    Statlines.matchup_id, Matchups.sport, Matchups.home_team, Matchups.away_team,
+                    Statlines.player_name, Props.units, Books.book_name, func.count()
+                )
+                .select_from(Statlines)
+                .join(latest, Statlines.line_id == latest.c.line_id)
+                .join(Books, Statlines.book_id == Books.book_id)
+                .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+                .join(Props, Statlines.prop_id == Props.prop_id)
+                .group_by(
+                    Statlines.matchup_id, Matchups.sport, Matchups.home_team, Matchups.away_team,
+                    Statlines.player_name, Props.units, Books.book_name
+                )
+                .all()
+            )
+        finally:
+            session.close()
+
+        cells = []
+        for matchup_id, sport, home, away, player, stat_type, book, count in rows:
+            sport = sport or get_sport_for_team(home) or get_sport_for_team(away)
+            teams = tuple(team for team in (home, away) if team)
+            cells.append(((sport, teams, player, stat_type, book), count, matchup_id))
+
+        with self.lock:
+            self.cells = cells
+            self.results = {}
+            self.version = version
+
+    def counts(self, games=None, **filters):
+        """
+        Facet counts under a filter selection.
+
+        Each facet is counted with every filter except its own applied, so a
+        chosen team still lists the other teams (and their counts) while the
+        stat types shrink to those that team has lines for.
+
+        Args:
+            games: Only count lines of these matchup ids (optional)
+            **filters: Any of sport, team, player, stat_type, book (case-insensitive)
+
+        Returns:
+            Dictionary with total and, per facet, a list of {value, count}
+        """
+        active = tuple(
+            (FACETS.index(name), value.lower())
+            for name, value in sorted(filters.items()) if value
+        )
+        key = (active, games)
+        with self.lock:
+            cached = self.results.get(key)
+            cells = self.cells
+        if cached is not None:
+            return cached
+
+        tallies = [{} for _ in FACETS]
+        total = 0
+        for values, count, matchup_id in cells:
+            if games is not None and matchup_id not in games:
+                continue
+            missed = None
+            for position, wanted in active:
+                if not _matches(values[position], wanted):
+                    if missed is not None:
+                        break
+                    missed = position
+            else:
+                if missed is None:
+                    total += count
+                for position, value in enumerate(values):
+                    if missed is not None and position != missed:
+                        continue
+                    for item in (value if isinstance(value, tuple) else (value,)):
+                        if item:
+                            tallies[position][item] = tallies[position].get(item, 0) + count
+
+        result = {'total': total}
+        for name, tally in zip(FACETS, tallies):
+            result[name] = [{'value': value, 'count': tally[value]} for value in sorted(tally)]
+
+        with self.lock:
+            if len(self.results) >= MAX_FACET_RESULTS:
+                self.results.clear()
+            self.results[key] = result
+        return result
+
+
+def _matches(value, wanted):
+    """Whether a cell value (or any team of a game) equals a lowercased filter."""
+    if isinstance(value, tuple):
+        return any(item.lower() == wanted for item in value)
+    return value is not None and value.lower() == wanted
+
+
+_facets = FacetIndex()
+_build_lock = threading.Lock()
+
+
+@on_sync
+def rebuild_facets(changes=None):
+    """Recount the facet cells once a sync commits."""
+    with _build_lock:
+        _facets.rebuild(get_data_version())
+
+
+def get_facets(sport=None, team=None, player=None, stat_type=None, book=None, upcoming_only=False):
+    """
+    Get cross-filtered facet counts for the filter panel.
+
+    Args:
+        sport: Selected sport (optional)
+        team: Selected team (optional)
+        player: Selected player (optional)
+        stat_type: Selected stat type (optional)
+        book: Selected book (optional)
+        upcoming_only: Only count games that haven't started yet
+
+    Returns:
+        Dictionary with total (lines matching every filter) and, for each of
+        sport, team, player, stat_type and book, a list of {value, count}
+    """
+    version = get_data_version()
+    if _facets.version != version:
+        with _build_lock:
+            if _facets.version != version:
+                _facets.rebuild(version)
+    games = game_ids(upcoming_only=True) if upcoming_only else None
+    return _facets.counts(games, sport=sport, team=team, player=player, stat_type=stat_type, book=book)
 
 
 def get_unique_sports():
-    """Get all unique sports from matchups based on team names."""
-    Session = get_session()
-    session = Session()
-
-    try:
-        # Get all unique teams
-        home_teams = session.query(distinct(Matchups.home_team)).all()
-        away_teams = session.query(distinct(Matchups.away_team)).all()
+    """Get all sports with current lines."""
+    return [f['value'] for f in get_facets()['sport']]
 
-        sports = set()
-        for (team,) in home_teams + away_teams:
-            if team:
-                sport = get_sport_for_team(team)
-                if sport:
-                    sports.add(sport)
 
-        return sorted(list(sports))
-
-    finally:
-        session.close()
+def get_unique_teams(sport=None, upcoming_only=False):
+    """Get all teams with current lines, optionally filtered by sport."""
+    return [f['value'] for f in get_facets(sport=sport, upcoming_only=upcoming_only)['team']]
 
 
-def get_unique_teams(sport=None):
-    """Get all unique team names from matchups, optionally filtered by sport."""
-    Session = get_session()
-    session = Session()
-
-    try:
-        # Get all home teams
-        home_teams = session.query(distinct(Matchups.home_team)).filter(
-            Matchups.home_team.isnot(None)
-        ).all()
-
-        # Get all away teams
-        away_teams = session.query(distinct(Matchups.away_team)).filter(
-            Matchups.away_team.isnot(None)
-        ).all()
-
-        # Combine and deduplicate
-        teams = set()
-        for (team,) in home_teams:
-            if team:
-                # Filter by sport if specified
-                if sport:
-                    team_sport = get_sport_for_team(team)
-                    if team_sport == sport:
-                        teams.add(team)
-                else:
-                    teams.add(team)
-        for (team,) in away_teams:
-            if team:
-                if sport:
-                    team_sport = get_sport_for_team(team)
-                    if team_sport == sport:
-                        teams.add(team)
-                else:
-                    teams.add(team)
-
-        return sorted(list(teams))
-
-    finally:
-        session.close()
-
-
-def get_unique_players(team=None):
-    """Get all unique player names from statlines, optionally filtered by team."""
-    Session = get_session()
-    session = Session()
-
-    try:
-        query = session.query(distinct(Statlines.player_name)).filter(
-            Statlines.player_name.isnot(None)
-        )
-
-        # Filter by team if provided
-        if team:
-            from sqlalchemy import or_
-            query = query.join(Matchups, Statlines.matchup_id == Matchups.matchup_id).filter(
-                or_(
-                    Matchups.home_team == team,
-                    Matchups.away_team == team
-                )
-            )
-
-        players = query.order_by(Statlines.player_name).all()
-        return [player for (player,) in players if player]
-
-    finally:
-        session.close()
+def get_unique_players(team=None, sport=None, upcoming_only=False):
+    """Get all players with current lines, optionally filtered by team and sport."""
+    return [f['value'] for f in get_facets(sport=sport, team=team, upcoming_only=upcoming_only)['player']]
 
 
 def get_unique_stat_types():
-    """Get all unique stat types from props."""
-    Session = get_session()
-    session = Session()
-
-    try:
-        stat_types = session.query(distinct(Props.units)).filter(
-            Props.units.isnot(None)
-        ).order_by(Props.units).all()
-
-        return [stat for (stat,) in stat_types if stat]
-
-    finally:
-        session.close()
+    """Get all stat types with current lines."""
+    return [f['value'] for f in get_facets()['stat_type']]
 
 
 def get_books():
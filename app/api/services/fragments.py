@@ -0,0 +1,63 @@
+"""
+Pre-rendered JSON fragments.
+
+Hot read endpoints return the same per-market objects on every request
+until a sync commits. Each object is serialized to bytes once, and a
+response is assembled by joining the bytes of the objects its filters
+select, so a request does no per-row dict building or JSON encoding.
+
+Fragments are remembered by a signature of the lines they were rendered
+from (line ids only ever grow), so when a sync commits only markets whose
+lines changed are rendered again.
+"""
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Fragment(bytes):
+    """A JSON value that is already serialized; spliced into responses as-is."""
+
+
+def render(obj):
+    """Serialize an object to a Fragment, with the API's key order and spacing."""
+    if orjson is not None:
+        return Fragment(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+    return Fragment(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode())
+
+
+class FragmentStore:
+    """Rendered fragments by key, reused across syncs while their signature holds."""
+
+    def __init__(self):
+        self.entries = {}   # key -> (signature, fragment)
+        self.rendered = 0
+        self.reused = 0
+        self.lock = threading.Lock()
+
+    def render(self, key, signature, build):
+        """Fragment for `key`, rendering `build()` only if its signature changed."""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self.reused += 1
+            return entry[1]
+        fragment = render(build())
+        with self.lock:
+            self.entries[key] = (signature, fragment)
+        self.rendered += 1
+        return fragment
+
+    def retain(self, keys):
+        """Forget fragments of markets that no longer exist."""
+        keys = set(keys)
+        with self.lock:
+            self.entries = {key: entry for key, entry in self.entries.items() if key in keys}
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'rendered': self.rendered, 'reused': self.reused}
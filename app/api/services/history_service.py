@@ -0,0 +1,254 @@
+"""
+Line-movement history.
+
+Each sync's change set is diffed against the last recorded state of every
+outcome (book + game + prop + player + side). A history record is appended
+only when the price or points actually moved. Records are delta-encoded
+against the previous record for the same outcome, so a long quiet stretch
+costs nothing and a move costs one small row.
+"""
+from datetime import datetime
+from decimal import Decimal
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.books import Books
+from app.models.props import Props
+from app.models.outcomes import Outcomes
+from app.models.line_history import LineHistory
+from app.data_sources import get_last_sync, on_sync
+
+
+def _to_epoch(moment):
+    return int((moment - datetime(1970, 1, 1)).total_seconds())
+
+
+def _from_epoch(seconds):
+    return datetime.utcfromtimestamp(seconds)
+
+
+def _price_units(price):
+    return int(round(float(price))) if price is not None else None
+
+
+def _points_units(points):
+    return int(round(float(points) * 10)) if points is not None else None
+
+
+def _line_points(row):
+    """A line's points; moneylines have none (statlines store them as 0)."""
+    return None if row['line_type'] == 'h2h' else row['points']
+
+
+def _delta(current, previous):
+    """Delta column value: NULL for a missing value, absolute after a missing one."""
+    if current is None:
+        return None
+    if previous is None:
+        return current
+    return current - previous
+
+
+def _undelta(previous, delta):
+    if delta is None:
+        return None
+    if previous is None:
+        return delta
+    return previous + delta
+
+
+def encode_record(previous, recorded_at, price, points):
+    """Encode one observation relative to the previous one.
+
+    Args:
+        previous: (recorded_at, price, points) of the last record, or None
+        recorded_at: Observation time (naive UTC datetime)
+        price: American odds, or None
+        points: Line value, or None
+
+    Returns:
+        Tuple of (dt, d_price, d_points); d_price/d_points are None for a missing value
+    """
+    epoch = _to_epoch(recorded_at)
+    if previous is None:
+        return epoch, _price_units(price), _points_units(points)
+
+    prev_at, prev_price, prev_points = previous
+    return (
+        epoch - _to_epoch(prev_at),
+        _delta(_price_units(price), _price_units(prev_price)),
+        _delta(_points_units(points), _points_units(prev_points)),
+    )
+
+
+def decode_records(records):
+    """Decode an outcome's records (in seq order) back into absolute values.
+
+    Returns:
+        List of dicts with recorded_at, price and points (None where missing)
+    """
+    history = []
+    epoch = 0
+    price = points = None
+    for record in records:
+        epoch += record.dt
+        price = _undelta(price, record.d_price)
+        points = _undelta(points, record.d_points)
+        history.append({
+            'recorded_at': _from_epoch(epoch).isoformat() + 'Z',
+            'price': price,
+            'points': points / 10 if points is not None else None,
+        })
+    return history
+
+
+def _sync_time():
+    """Time of the sync that just committed (saved before its hooks run)."""
+    try:
+        return datetime.fromisoformat(get_last_sync().rstrip('Z'))
+    except (AttributeError, ValueError):
+        return datetime.utcnow()
+
+
+def _outcome_key(book_id, matchup_id, prop_id, player_name, designation, line_type):
+    return (book_id, matchup_id, prop_id, player_name, designation, line_type)
+
+
+@on_sync
+def record_history(changes, recorded_at=None):
+    """Append history records for every outcome whose price or points moved.
+
+    Only outcomes in the sync's games are loaded, so cost follows the size
+    of the change set rather than the whole history. Records are stamped
+    with the sync's time unless `recorded_at` is given.
+    """
+    if not changes:
+        return 0
+
+    recorded_at = recorded_at or _sync_time()
+
+    Session = get_session()
+    session = Session()
+
+    try:
+        matchup_ids = {row['matchup_id'] for row in changes}
+        outcomes = {}
+        for outcome in session.query(Outcomes).filter(Outcomes.matchup_id.in_(matchup_ids)):
+            key = _outcome_key(
+                outcome.book_id, outcome.matchup_id, outcome.prop_id,
+                outcome.player_name, outcome.designation, outcome.line_type
+            )
+            outcomes[key] = outcome
+
+        appended = 0
+        for row in changes:
+            key = _outcome_key(
+                row['book_id'], row['matchup_id'], row['prop_id'],
+                row['player_name'], row['designation'], row['line_type']
+            )
+            outcome = outcomes.get(key)
+            points = _line_points(row)
+
+            if outcome is None:
+                outcome = Outcomes(
+                    book_id=row['book_id'],
+                    matchup_id=row['matchup_id'],
+                    prop_id=row['prop_id'],
+                    player_name=row['player_name'],
+                    designation=row['designation'],
+                    line_type=row['line_type'],
+                    record_count=0,
+                )
+                session.add(outcome)
+                session.flush()
+                outcomes[key] = outcome
+                previous = None
+            else:
+                same_price = _price_units(outcome.last_price) == _price_units(row['price'])
+                same_points = _points_units(outcome.last_points) == _points_units(points)
+                if same_price and same_points:
+                    continue
+                previous = (outcome.last_recorded_at, outcome.last_price, outcome.last_points)
+
+            dt, d_price, d_points = encode_record(previous, recorded_at, row['price'], points)
+            session.add(LineHistory(
+                outcome_id=outcome.outcome_id,
+                seq=outcome.record_count,
+                dt=dt,
+                d_price=d_price,
+                d_points=d_points,
+            ))
+            outcome.record_count += 1
+            outcome.last_price = Decimal(str(row['price'])) if row['price'] is not None else None
+            outcome.last_points = Decimal(str(points)) if points is not None else None
+            outcome.last_recorded_at = recorded_at
+            appended += 1
+
+        session.commit()
+        return appended
+
+    except Exception:
+        session.rollback()
+        raise
+
+    finally:
+        session.close()
+
+
+def get_line_history(line_id):
+    """
+    Get the full price/points movement for the outcome a line belongs to.
+
+    Args:
+        line_id: Any statline id for the outcome
+
+    Returns:
+        Dictionary with outcome info and its history, or None if the line doesn't exist
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        result = (
+            session.query(Statlines, Books, Props)
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+            .filter(Statlines.line_id == line_id)
+            .first()
+        )
+        if not result:
+            return None
+
+        statline, book, prop = result
+        outcome = session.query(Outcomes).filter(
+            Outcomes.matchup_id == statline.matchup_id,
+            Outcomes.book_id == statline.book_id,
+            Outcomes.prop_id == statline.prop_id,
+            Outcomes.player_name == statline.player_name,
+            Outcomes.designation == statline.designation,
+            Outcomes.line_type == statline.line_type,
+        ).first()
+
+        history = []
+        if outcome is not None:
+            # Primary key (outcome_id, seq): a single range scan
+            records = (
+                session.query(LineHistory)
+                .filter(LineHistory.outcome_id == outcome.outcome_id)
+                .order_by(LineHistory.seq)
+                .all()
+            )
+            history = decode_records(records)
+
+        return {
+            'line_id': statline.line_id,
+            'outcome_id': outcome.outcome_id if outcome is not None else None,
+            'player_name': statline.player_name,
+            'book': book.book_name,
+            'stat_type': prop.units,
+            'designation': statline.designation,
+            'history': history,
+            'count': len(history),
+        }
+
+    finally:
+        session.close()
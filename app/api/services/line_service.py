@@ -4,93 +4,181 @@ from app.models.statlines import Statlines
 from app.models.books import Books
 from app.models.matchups import Matchups
 from app.models.props import Props
+from app.api.services.pagination import paginate
+from app.api.services.search_service import match_players
+from app.api.services.matchup_service import game_filters, normalize_sport, team_condition, upcoming_key
+
+
+# Line fields -> the column each is read from, in response order
+LINE_FIELDS = {
+    'id': Statlines.line_id,
+    'player_name': Statlines.player_name,
+    'book': Books.book_name,
+    'book_type': Books.book_type,
+    'home_team': Matchups.home_team,
+    'away_team': Matchups.away_team,
+    'stat_type': Props.units,
+    'category': Props.category,
+    'points': Statlines.points,
+    'price': Statlines.price,
+    'designation': Statlines.designation,
+    'line_type': Statlines.line_type,
+}
+
+# Fields stored as DECIMAL and returned as floats
+_DECIMAL_FIELDS = ('points', 'price')
+
+
+def _line_fields(fields=None):
+    """
+    Validate a sparse fieldset, in response order.
+
+    Args:
+        fields: Field names to return (optional, default every field)
 
+    Returns:
+        Tuple of field names
 
-def get_lines(book=None, team=None, player=None, stat_type=None, page=1, per_page=50):
+    Raises:
+        ValueError: If a field is unknown
     """
-    Get betting lines with optional filters.
+    if not fields:
+        return tuple(LINE_FIELDS)
+    unknown = [name for name in fields if name not in LINE_FIELDS]
+    if unknown:
+        raise ValueError(f"Invalid fields: {', '.join(unknown)} (valid: {', '.join(LINE_FIELDS)})")
+    return tuple(name for name in LINE_FIELDS if name in fields)
+
+
+def _lines_query(session, book=None, team=None, player=None, stat_type=None, sport=None,
+                 upcoming_only=False, fields=tuple(LINE_FIELDS)):
+    """Filtered (unordered) query selecting only the columns of `fields` (plus the line id)."""
+    columns = [LINE_FIELDS[name].label(name) for name in fields]
+    query = (
+        session.query(Statlines.line_id.label('_line_id'), *columns)
+        .select_from(Statlines)
+        .join(Books, Statlines.book_id == Books.book_id)
+        .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+        .join(Props, Statlines.prop_id == Props.prop_id)
+    )
+
+    # Apply filters
+    if book and book.lower() != 'all':
+        query = query.filter(func.lower(Books.book_name) == book.lower())
+
+    if team:
+        query = query.filter(team_condition(team))
+
+    if player:
+        query = query.filter(Statlines.player_name.in_(sorted(match_players(player))))
+
+    if stat_type:
+        query = query.filter(func.lower(Props.units) == stat_type.lower())
+
+    return query.filter(*game_filters(sport, upcoming_only))
+
+
+def _format_line(row, fields=tuple(LINE_FIELDS)):
+    line = {name: getattr(row, name) for name in fields}
+    for name in _DECIMAL_FIELDS:
+        if name in line:
+            line[name] = float(line[name]) if line[name] else None
+    return line
+
+
+def get_lines(book=None, team=None, player=None, stat_type=None, sport=None, upcoming_only=False,
+              page=1, per_page=50, cursor=None, include_total=True, fields=None):
+    """
+    Get betting lines with optional filters, newest first.
 
     Args:
         book: Filter by book name ('Pinnacle', 'PrizePicks', or None for all)
         team: Filter by team name (matches home or away team)
         player: Filter by player name (partial match)
         stat_type: Filter by stat type (exact match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
         page: Page number for pagination
         per_page: Number of results per page
+        cursor: Cursor from the previous page (optional, takes precedence over page)
+        include_total: Whether to include the (cached) total count
+        fields: Line fields to return (optional, default all); only their
+            columns are selected
 
     Returns:
         Dictionary with data, pagination info
+
+    Raises:
+        ValueError: If the cursor is malformed or a field is unknown
     """
+    fields = _line_fields(fields)
+
     Session = get_session()
     session = Session()
 
     try:
-        query = (
-            session.query(Statlines, Books, Matchups, Props)
-            .join(Books, Statlines.book_id == Books.book_id)
-            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
-            .join(Props, Statlines.prop_id == Props.prop_id)
+        query = _lines_query(session, book, team, player, stat_type, sport, upcoming_only, fields)
+
+        # Line ids are assigned in write order, so newest first is line_id desc
+        results, pagination = paginate(
+            query,
+            columns=[Statlines.line_id],
+            key_of=lambda row: (row._line_id,),
+            count_key=('lines', (book or '').lower(), (team or '').lower(),
+                       (player or '').lower(), (stat_type or '').lower(),
+                       normalize_sport(sport), upcoming_key(upcoming_only)),
+            per_page=per_page,
+            page=page,
+            cursor=cursor,
+            include_total=include_total,
+            descending=True
         )
 
-        # Apply filters
-        if book and book.lower() != 'all':
-            query = query.filter(func.lower(Books.book_name) == book.lower())
+        return {
+            'data': [_format_line(row, fields) for row in results],
+            'pagination': pagination
+        }
+
+    finally:
+        session.close()
 
-        if team:
-            team_lower = f"%{team.lower()}%"
-            query = query.filter(
-                (func.lower(Matchups.home_team).like(team_lower)) |
-                (func.lower(Matchups.away_team).like(team_lower))
-            )
 
-        if player:
-            player_lower = f"%{player.lower()}%"
-            query = query.filter(func.lower(Statlines.player_name).like(player_lower))
+def iter_lines(book=None, team=None, player=None, stat_type=None, sport=None, upcoming_only=False,
+               fields=None):
+    """
+    Yield every matching line, newest first, straight from a server-side cursor.
 
-        if stat_type:
-            query = query.filter(func.lower(Props.units) == stat_type.lower())
+    Rows are fetched in batches of 1000 and never collected, so memory stays
+    flat however many lines match. The session opens on the first read and
+    closes when the generator is exhausted or closed.
 
-        # Get total count before pagination
-        total = query.count()
+    Args:
+        book: Filter by book name ('Pinnacle', 'PrizePicks', or None for all)
+        team: Filter by team name (matches home or away team)
+        player: Filter by player name (partial match)
+        stat_type: Filter by stat type (exact match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        fields: Line fields to return (optional, default all)
 
-        # Order by most recent first, then by player name
-        query = query.order_by(
-            Statlines.scrape_timestamp.desc(),
-            Statlines.player_name
-        )
+    Returns:
+        Generator of line dictionaries, in the same shape as get_lines
 
-        # Apply pagination
-        offset = (page - 1) * per_page
-        results = query.offset(offset).limit(per_page).all()
-
-        # Format results
-        lines = []
-        for statline, book_obj, matchup, prop in results:
-            lines.append({
-                'id': statline.line_id,
-                'player_name': statline.player_name,
-                'book': book_obj.book_name,
-                'book_type': book_obj.book_type,
-                'home_team': matchup.home_team,
-                'away_team': matchup.away_team,
-                'stat_type': prop.units,
-                'category': prop.category,
-                'points': float(statline.points) if statline.points else None,
-                'price': float(statline.price) if statline.price else None,
-                'designation': statline.designation,
-                'line_type': statline.line_type,
-                'scrape_timestamp': statline.scrape_timestamp.isoformat() if statline.scrape_timestamp else None
-            })
+    Raises:
+        ValueError: If a field is unknown
+    """
+    fields = _line_fields(fields)
+    return _stream_lines(fields, book, team, player, stat_type, sport, upcoming_only)
 
-        return {
-            'data': lines,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            }
-        }
+
+def _stream_lines(fields, *filters):
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = _lines_query(session, *filters, fields=fields).order_by(Statlines.line_id.desc())
+        for row in query.yield_per(1000):
+            yield _format_line(row, fields)
 
     finally:
         session.close()
@@ -102,34 +190,12 @@ def get_line_by_id(line_id):
     session = Session()
 
     try:
-        result = (
-            session.query(Statlines, Books, Matchups, Props)
-            .join(Books, Statlines.book_id == Books.book_id)
-            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
-            .join(Props, Statlines.prop_id == Props.prop_id)
-            .filter(Statlines.line_id == line_id)
-            .first()
-        )
+        result = _lines_query(session).filter(Statlines.line_id == line_id).first()
 
         if not result:
             return None
 
-        statline, book_obj, matchup, prop = result
-        return {
-            'id': statline.line_id,
-            'player_name': statline.player_name,
-            'book': book_obj.book_name,
-            'book_type': book_obj.book_type,
-            'home_team': matchup.home_team,
-            'away_team': matchup.away_team,
-            'stat_type': prop.units,
-            'category': prop.category,
-            'points': float(statline.points) if statline.points else None,
-            'price': float(statline.price) if statline.price else None,
-            'designation': statline.designation,
-            'line_type': statline.line_type,
-            'scrape_timestamp': statline.scrape_timestamp.isoformat() if statline.scrape_timestamp else None
-        }
+        return _format_line(result)
 
     finally:
         session.close()
@@ -0,0 +1,125 @@
+"""
+Game scoping for read services.
+
+Matchups carry their sport, start time and home/away team ids (recorded at
+ingest), so the `sport`, `upcoming_only` and `team` filters are indexed
+conditions on Matchups for services that query the database, and a set of
+matchup ids for services that filter rows they already built.
+
+What `upcoming_only` keeps changes as games start, not only when a sync
+commits, so anything cached for it is also keyed by `upcoming_key`.
+"""
+import bisect
+from datetime import datetime
+from sqlalchemy import or_
+from app.db.session import get_session
+from app.models.matchups import Matchups
+from app.data_sources import get_data_version
+from app.api.services.pagination import GenerationCache
+from app.api.services.search_service import match_teams
+
+_games = GenerationCache()
+
+
+def normalize_sport(sport):
+    """Canonical league name for a sport filter ('nba' -> 'NBA')."""
+    return sport.strip().upper() if sport and sport.strip() else None
+
+
+def game_filters(sport=None, upcoming_only=False):
+    """
+    SQL conditions on Matchups for a sport / upcoming-only filter.
+
+    Args:
+        sport: League name, e.g. 'NBA' (optional)
+        upcoming_only: Only games that haven't started yet (unknown start
+            times are left out)
+
+    Returns:
+        List of conditions to pass to Query.filter
+    """
+    conditions = []
+    sport = normalize_sport(sport)
+    if sport:
+        conditions.append(Matchups.sport == sport)
+    if upcoming_only:
+        conditions.append(Matchups.commence_time > datetime.utcnow())
+    return conditions
+
+
+def team_condition(team):
+    """
+    SQL condition on Matchups for a partial team filter.
+
+    The filter resolves (by name or alias) to team ids once per sync; the
+    condition is then an integer match on the home/away team id columns.
+    """
+    team_ids = sorted(match_teams(team))
+    return or_(Matchups.home_team_id.in_(team_ids), Matchups.away_team_id.in_(team_ids))
+
+
+def _load_games():
+    """(matchup_id, sport, commence_time) for every matchup, once per data version."""
+    version = get_data_version()
+    cached = _games.get('games', version)
+    if cached is not None:
+        return cached
+
+    Session = get_session()
+    session = Session()
+
+    try:
+        games = session.query(Matchups.matchup_id, Matchups.sport, Matchups.commence_time).all()
+        games = [tuple(game) for game in games]
+        _games.put('games', version, games)
+        return games
+
+    finally:
+        session.close()
+
+
+def upcoming_key(upcoming_only):
+    """
+    Cache-key part for an upcoming-only filter.
+
+    The set of upcoming games only changes when the next game starts, so the
+    key is that start time: results cached under it stay correct until then.
+
+    Args:
+        upcoming_only: Whether the upcoming-only filter is set
+
+    Returns:
+        None if the filter is off, else ('upcoming', next start time or None)
+    """
+    if not upcoming_only:
+        return None
+    version = get_data_version()
+    starts = _games.get('starts', version)
+    if starts is None:
+        starts = sorted(commence_time for _, _, commence_time in _load_games() if commence_time is not None)
+        _games.put('starts', version, starts)
+    position = bisect.bisect_right(starts, datetime.utcnow())
+    return ('upcoming', starts[position] if position < len(starts) else None)
+
+
+def game_ids(sport=None, upcoming_only=False):
+    """
+    Ids of the matchups a sport / upcoming-only filter keeps.
+
+    Args:
+        sport: League name, e.g. 'NBA' (optional)
+        upcoming_only: Only games that haven't started yet
+
+    Returns:
+        Frozenset of matchup ids, or None if nothing is filtered
+    """
+    sport = normalize_sport(sport)
+    if not sport and not upcoming_only:
+        return None
+
+    now = datetime.utcnow()
+    return frozenset(
+        matchup_id for matchup_id, game_sport, commence_time in _load_games()
+        if (not sport or game_sport == sport)
+        and (not upcoming_only or (commence_time is not None and commence_time > now))
+    )
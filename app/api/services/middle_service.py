@@ -0,0 +1,283 @@
+"""
+Middle finder.
+
+A middle is an Over at a low number at one book and an Under at a higher
+number at another (Over 24.5 / Under 27.5). Any result inside the window
+wins both bets; outside it, one side wins and roughly pays for the other.
+Spreads are treated the same way on the home team's margin: the home side
+is an Over on the margin and the away side an Under.
+"""
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.books import Books
+from app.models.matchups import Matchups
+from app.models.props import Props
+from app.data_sources import get_last_sync, on_sync
+from app.api.services.arbitrage_service import american_to_decimal, current_lines
+from app.api.services.search_service import match_matchups, match_players
+from app.api.services.matchup_service import game_ids
+
+# Latest full scan, keyed by the sync it was computed from
+_snapshot = {'sync': None, 'data': None}
+
+SORT_KEYS = {
+    'score': lambda m: (-m['score'], -m['width']),
+    'width': lambda m: (-m['width'], m['combined_implied']),
+    'price': lambda m: (m['combined_implied'], -m['width']),
+}
+
+
+def _over_under(row):
+    """Map a line onto (market key, side, threshold) for middle matching.
+
+    Returns:
+        Tuple of (market_key, 'over'|'under', threshold), or None if the
+        line can't be part of a middle
+    """
+    if row.points is None or not row.player_name:
+        return None
+    points = float(row.points)
+
+    designation = (row.designation or '').lower()
+    if designation in ('over', 'under'):
+        return (row.matchup_id, row.units, row.player_name.lower().strip()), designation, points
+
+    if row.line_type == 'spreads':
+        # Home -3.5 covers when home margin > 3.5; Away +6.5 covers when home margin < 6.5
+        market = (row.matchup_id, row.units, 'spread')
+        if row.player_name == row.home_team:
+            return market, 'over', -points
+        return market, 'under', points
+
+    return None
+
+
+def _priced_over_under(row):
+    return _over_under(row) if row.price is not None else None
+
+
+def _best_by_threshold(rows, books=None):
+    """Reduce lines to the two best prices per (market, side, threshold).
+
+    Lines are first reduced to the ones each book currently offers (see
+    current_lines): one per book per market side, from the market's latest
+    sync. Only then are they bucketed by threshold, so the two kept entries
+    always come from different books. The runner-up stands in when the best
+    Over and best Under are at the same book.
+
+    Args:
+        rows: Scanned lines for every sportsbook
+        books: Book names to take prices from (optional, default all)
+
+    Returns:
+        Dict of market_key -> {'over': {threshold: [entry, ...]}, 'under': {...}}
+    """
+    markets = {}
+    for row, (market, side, threshold) in current_lines(rows, _priced_over_under):
+        if books and row.book_name not in books:
+            continue
+
+        sides = markets.get(market)
+        if sides is None:
+            sides = markets[market] = {'over': {}, 'under': {}}
+
+        entries = sides[side].setdefault(threshold, [])
+        entries.append({'row': row, 'decimal_odds': american_to_decimal(row.price)})
+        if len(entries) > 2:
+            entries.sort(key=lambda entry: -entry['decimal_odds'])
+            entries.pop()
+
+    return markets
+
+
+def _pick_legs(overs, unders):
+    """Cheapest Over/Under pair from two different books, or None if there isn't one."""
+    pairs = [
+        (over, under) for over in overs for under in unders
+        if over['row'].book_name != under['row'].book_name
+    ]
+    if not pairs:
+        return None
+    return min(pairs, key=lambda pair: 1 / pair[0]['decimal_odds'] + 1 / pair[1]['decimal_odds'])
+
+
+def _sweep(overs, unders):
+    """Two-pointer sweep over sorted thresholds.
+
+    Walks the Unders from low to high, advancing a pointer over the Overs
+    whose threshold is below the current Under. Every Over behind the
+    pointer forms a window with that Under. Windows whose only prices are
+    both at the same book are skipped.
+
+    Yields:
+        (over_threshold, over_entry, under_threshold, under_entry)
+    """
+    over_points = sorted(overs)
+    under_points = sorted(unders)
+    j = 0
+    for high in under_points:
+        while j < len(over_points) and over_points[j] < high:
+            j += 1
+        for low in over_points[:j]:
+            legs = _pick_legs(overs[low], unders[high])
+            if legs is not None:
+                yield low, legs[0], high, legs[1]
+
+
+def _format_middle(low, over, high, under):
+    """Build a middle result from its two legs."""
+    over_row = over['row']
+    under_row = under['row']
+    over_implied = 1 / over['decimal_odds']
+    under_implied = 1 / under['decimal_odds']
+    combined = over_implied + under_implied
+    width = high - low
+
+    def leg(row, implied):
+        return {
+            'id': row.line_id,
+            'side': row.designation or row.player_name,
+            'book': row.book_name,
+            'points': float(row.points),
+            'odds': int(row.price),
+            'implied': round(implied * 100, 2),
+        }
+
+    return {
+        'player_name': over_row.player_name if over_row.designation else None,
+        'stat_type': over_row.units,
+        'matchup': f"{over_row.away_team} @ {over_row.home_team}" if over_row.home_team else "Unknown",
+        'matchup_id': over_row.matchup_id,
+        'over': leg(over_row, over_implied),
+        'under': leg(under_row, under_implied),
+        'width': round(width, 1),
+        'combined_implied': round(combined * 100, 2),
+        # Wider windows and cheaper combined prices both make a better middle
+        'score': round(width / combined, 3),
+    }
+
+
+def scan_middles(books=None):
+    """
+    Find every Over-low / Under-high window across books.
+
+    Cost is linear in the number of lines to build the per-threshold best
+    prices, plus a sort and sweep of the (few) distinct thresholds per market.
+
+    Args:
+        books: List of book names to include (optional, default all sportsbooks)
+
+    Returns:
+        List of middles, best score first
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = (
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.price,
+                Statlines.points, Statlines.designation, Statlines.line_type,
+                Statlines.matchup_id, Books.book_name, Props.units,
+                Matchups.home_team, Matchups.away_team
+            )
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+            .filter(Books.book_type == "Sports Book")
+        )
+
+        # Every book's lines are needed to tell which sync last wrote a market
+        markets = _best_by_threshold(query.yield_per(1000), books)
+
+        middles = []
+        for sides in markets.values():
+            if not sides['over'] or not sides['under']:
+                continue
+            for low, over, high, under in _sweep(sides['over'], sides['under']):
+                middles.append(_format_middle(low, over, high, under))
+
+        middles.sort(key=SORT_KEYS['score'])
+        return middles
+
+    finally:
+        session.close()
+
+
+@on_sync
+def refresh_middles(changes=None):
+    """Rescan all books and store the result for the current sync."""
+    _snapshot['data'] = scan_middles()
+    _snapshot['sync'] = get_last_sync()
+    return _snapshot['data']
+
+
+def get_middles(books=None, stat_type=None, player=None, team=None, sport=None,
+                upcoming_only=False, min_width=0.0, sort='score', page=1, per_page=50,
+                refresh=False):
+    """
+    Get ranked middles, served from the per-sync snapshot when possible.
+
+    Args:
+        books: List of book names to include (optional)
+        stat_type: Filter by stat type
+        player: Filter by player name (partial match)
+        team: Filter by team (partial match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        min_width: Minimum window width in points
+        sort: 'score' (default), 'width' or 'price'
+        page: Page number for pagination
+        per_page: Number of results per page
+        refresh: Force a rescan even if the snapshot is current
+
+    Returns:
+        Dictionary with data, pagination info
+    """
+    if books:
+        middles = scan_middles(books=books)
+    else:
+        if refresh or _snapshot['data'] is None or _snapshot['sync'] != get_last_sync():
+            refresh_middles()
+        middles = _snapshot['data']
+
+    stat_lower = stat_type.lower() if stat_type else None
+    players = match_players(player) if player else None
+    matchups = match_matchups(team) if team else None
+    games = game_ids(sport, upcoming_only)
+
+    results = [
+        m for m in middles
+        if m['width'] >= min_width
+        and (not stat_lower or (m['stat_type'] or '').lower() == stat_lower)
+        and (players is None or m['player_name'] in players)
+        and (matchups is None or m['matchup_id'] in matchups)
+        and (games is None or m['matchup_id'] in games)
+    ]
+
+    if sort != 'score':
+        results = sorted(results, key=SORT_KEYS[sort])
+
+    total = len(results)
+    offset = (page - 1) * per_page
+
+    return {
+        'data': results[offset:offset + per_page],
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': (total + per_page - 1) // per_page
+        },
+        'meta': {
+            'last_sync': get_last_sync(),
+            'sort': sort,
+            'min_width_applied': min_width,
+            'filters': {
+                'books': books,
+                'stat_type': stat_type,
+                'player': player,
+                'team': team
+            }
+        }
+    }
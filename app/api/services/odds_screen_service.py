@@ -0,0 +1,377 @@
+"""
+Best-price odds screen.
+
+Keeps a best-line index per (market, line, side): every book's current
+price, the best price and book, and the market-average implied probability.
+Each book sits at the line it currently offers, so a book moving its number
+(Over 235 -> Over 237.5) leaves the old line, and a book missing from a sync
+that rewrote the market drops out of it.
+
+The index follows the persisted sync log (see data_sources.sync_log) and is
+updated from each sync's change set, so a sync costs time proportional to
+the lines it wrote in every process, and reads never touch the database.
+"""
+import hashlib
+import threading
+from bisect import bisect_right
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.books import Books
+from app.models.matchups import Matchups
+from app.models.props import Props
+from app.data_sources import get_last_sync, on_sync
+from app.data_sources.sync_log import SyncFollower, sync_starts
+from app.api.services.arbitrage_service import american_to_decimal, market_side
+from app.api.services.comparison_service import american_to_implied_prob
+from app.api.services.search_service import match_matchups, match_players
+from app.api.services.matchup_service import game_ids
+
+
+class BestLineIndex:
+    """In-memory best price per (market, line, side), updated incrementally."""
+
+    def __init__(self):
+        self.entries = {}
+        self.offered = {}  # market -> {(side, book): entry key of the book's current line}
+        self.sync = None
+        self.built = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _entry_key(row):
+        """Index key for a change row, or None if the line has no opposing side."""
+        split = market_side(
+            row['line_type'], row['player_name'], row['designation'],
+            row['points'], row['home_team']
+        )
+        if split is None:
+            return None
+        market_key, side, line = split
+        return (row['matchup_id'], row['units'], market_key, line, side)
+
+    def apply(self, row):
+        """Apply one written line to the index.
+
+        O(1) unless the line moves or lowers the price of the book that was
+        best, in which case that one entry's books are rescanned.
+
+        Returns:
+            The line's market, or None if it isn't indexed
+        """
+        if row['price'] is None or not row['player_name']:
+            return None
+        key = self._entry_key(row)
+        if key is None:
+            return None
+        market, side = key[:3], key[4]
+        book = row['book_name']
+
+        offered = self.offered.setdefault(market, {})
+        current = offered.get((side, book))
+        if current is not None and current != key:
+            if self.entries[current]['books'][book]['line_id'] > row['line_id']:
+                return market
+            self._remove(current, book)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = {
+                'id': hashlib.md5(repr(key).encode()).hexdigest()[:12],
+                'player_name': row['player_name'] if row['designation'] else None,
+                'stat_type': row['units'],
+                'matchup': f"{row['away_team']} @ {row['home_team']}" if row['home_team'] else "Unknown",
+                'matchup_id': row['matchup_id'],
+                'side': row['designation'] or row['player_name'],
+                'points': row['points'],
+                'books': {},
+                'implied_sum': 0.0,
+                'best_book': None,
+                'best_decimal': 0.0,
+            }
+        offered[(side, book)] = key
+
+        books = entry['books']
+        previous = books.get(book)
+        if previous is not None and previous['line_id'] > row['line_id']:
+            return market
+
+        implied = american_to_implied_prob(row['price'])
+        decimal_odds = american_to_decimal(row['price'])
+        if previous is not None:
+            entry['implied_sum'] -= previous['implied']
+        entry['implied_sum'] += implied
+        books[book] = {
+            'line_id': row['line_id'],
+            'price': row['price'],
+            'points': row['points'],
+            'implied': implied,
+            'decimal_odds': decimal_odds,
+        }
+
+        if decimal_odds > entry['best_decimal']:
+            entry['best_book'] = book
+            entry['best_decimal'] = decimal_odds
+        elif book == entry['best_book'] and decimal_odds < entry['best_decimal']:
+            self._rescan(entry)
+        return market
+
+    def _remove(self, key, book):
+        """Take a book off one line, dropping the line once no book offers it."""
+        entry = self.entries[key]
+        entry['implied_sum'] -= entry['books'].pop(book)['implied']
+        if not entry['books']:
+            del self.entries[key]
+        elif book == entry['best_book']:
+            self._rescan(entry)
+
+    @staticmethod
+    def _rescan(entry):
+        books = entry['books']
+        best_book = max(books, key=lambda name: books[name]['decimal_odds'])
+        entry['best_book'] = best_book
+        entry['best_decimal'] = books[best_book]['decimal_odds']
+
+    def _apply_batch(self, rows):
+        """Apply one sync's lines; books the sync left out of a market it wrote are dropped."""
+        written = {}
+        for row in rows:
+            market = self.apply(row)
+            if market is not None:
+                written.setdefault(market, set()).add((self._entry_key(row)[4], row['book_name']))
+
+        for market, current in written.items():
+            offered = self.offered[market]
+            for side_book in [side_book for side_book in offered if side_book not in current]:
+                self._remove(offered.pop(side_book), side_book[1])
+
+    def apply_all(self, rows, sync=None):
+        """Apply a sync's change set and mark the index as current for `sync`."""
+        with self.lock:
+            self._apply_batch(rows)
+            self.sync = sync
+
+    def rebuild(self, rows, sync=None):
+        """Replace the index with one built from scratch.
+
+        Rows must be ordered by line_id; they are applied a recorded sync at
+        a time. The new entries are built aside and swapped in, so readers
+        never see a half-built index.
+        """
+        fresh = BestLineIndex()
+        starts = sync_starts()
+        batch, batch_sync = [], None
+        for row in rows:
+            row_sync = bisect_right(starts, row['line_id'])
+            if row_sync != batch_sync:
+                fresh._apply_batch(batch)
+                batch, batch_sync = [], row_sync
+            batch.append(row)
+        fresh._apply_batch(batch)
+
+        with self.lock:
+            self.entries = fresh.entries
+            self.offered = fresh.offered
+            self.sync = sync
+            self.built = True
+
+
+_index = BestLineIndex()
+_build_lock = threading.Lock()
+
+
+def _load_rows(before_line_id=None):
+    """Load sportsbook lines as change rows, oldest first.
+
+    Used once per process to build the index up to the first sync it
+    follows. With no `before_line_id` every line is loaded.
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = (
+            session.query(
+                Statlines.line_id, Statlines.player_name, Statlines.price,
+                Statlines.points, Statlines.designation, Statlines.line_type,
+                Statlines.matchup_id, Books.book_name, Books.book_type, Props.units,
+                Matchups.home_team, Matchups.away_team
+            )
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+            .filter(Books.book_type == "Sports Book")
+            .order_by(Statlines.line_id)
+        )
+        if before_line_id is not None:
+            query = query.filter(Statlines.line_id < before_line_id)
+
+        rows = []
+        for r in query.yield_per(1000):
+            rows.append({
+                'line_id': r.line_id,
+                'book_name': r.book_name,
+                'book_type': r.book_type,
+                'matchup_id': r.matchup_id,
+                'home_team': r.home_team,
+                'away_team': r.away_team,
+                'units': r.units,
+                'player_name': r.player_name,
+                'designation': r.designation,
+                'line_type': r.line_type,
+                'points': float(r.points) if r.points is not None else None,
+                'price': float(r.price) if r.price is not None else None,
+            })
+        return rows
+
+    finally:
+        session.close()
+
+
+def _apply_sync(changes, sync):
+    """Fold one recorded sync into the index, building it first if needed."""
+    if not _index.built:
+        with _build_lock:
+            if not _index.built:
+                _index.rebuild(_load_rows(sync.first_line_id))
+    _index.apply_all(
+        [row for row in changes if row['book_type'] == "Sports Book"],
+        sync.synced_at.isoformat() + 'Z'
+    )
+
+
+_follower = SyncFollower(_apply_sync, backlog=1)
+
+
+@on_sync
+def update_best_lines(changes):
+    """Fold the sync that just committed (and any this process missed) into the index."""
+    return _follower.catch_up(changes)
+
+
+def get_index():
+    """Get the best-line index, applying any syncs run in other processes."""
+    _follower.catch_up()
+    if not _index.built:
+        # No recorded sync to follow yet; index everything there is
+        with _build_lock:
+            if not _index.built:
+                _index.rebuild(_load_rows(), get_last_sync())
+    return _index
+
+
+def _summarize(entry, books=None):
+    """Summary row for an index entry, optionally restricted to some books."""
+    prices = entry['books']
+    if books:
+        prices = {name: p for name, p in prices.items() if name.lower() in books}
+        if not prices:
+            return None
+        best_book = max(prices, key=lambda name: prices[name]['decimal_odds'])
+        implied_sum = sum(p['implied'] for p in prices.values())
+    else:
+        best_book = entry['best_book']
+        implied_sum = entry['implied_sum']
+
+    best = prices[best_book]
+    avg_implied = implied_sum / len(prices)
+    return {
+        'id': entry['id'],
+        'player_name': entry['player_name'],
+        'stat_type': entry['stat_type'],
+        'matchup': entry['matchup'],
+        'side': entry['side'],
+        'points': best['points'],
+        'best_book': best_book,
+        'best_price': int(best['price']),
+        'best_implied': round(best['implied'] * 100, 2),
+        'market_avg_implied': round(avg_implied * 100, 2),
+        'edge_vs_market': round((avg_implied - best['implied']) * 100, 2),
+        'book_count': len(prices),
+    }
+
+
+def get_odds_screen(books=None, stat_type=None, player=None, team=None, sport=None,
+                    upcoming_only=False, expand=None, page=1, per_page=50):
+    """
+    Get the best price for each market side, with optional per-book detail.
+
+    Args:
+        books: List of book names to consider (optional, default all)
+        stat_type: Filter by stat type
+        player: Filter by player name (partial match)
+        team: Filter by team (partial match)
+        sport: Filter by league (e.g., 'NBA')
+        upcoming_only: Only games that haven't started yet
+        expand: List of row ids to include per-book prices for (optional)
+        page: Page number for pagination
+        per_page: Number of results per page
+
+    Returns:
+        Dictionary with summary rows, details for expanded rows, and pagination
+    """
+    index = get_index()
+
+    books_lower = {b.lower() for b in books} if books else None
+    stat_lower = stat_type.lower() if stat_type else None
+    players = match_players(player) if player else None
+    matchups = match_matchups(team) if team else None
+    games = game_ids(sport, upcoming_only)
+    expand = set(expand or [])
+
+    rows = []
+    details = {}
+    with index.lock:
+        for entry in index.entries.values():
+            if stat_lower and (entry['stat_type'] or '').lower() != stat_lower:
+                continue
+            if players is not None and entry['player_name'] not in players:
+                continue
+            if matchups is not None and entry['matchup_id'] not in matchups:
+                continue
+            if games is not None and entry['matchup_id'] not in games:
+                continue
+
+            summary = _summarize(entry, books_lower)
+            if summary is None:
+                continue
+            rows.append(summary)
+
+            if entry['id'] in expand:
+                details[entry['id']] = sorted(
+                    [
+                        {
+                            'book': name,
+                            'points': p['points'],
+                            'price': int(p['price']),
+                            'implied': round(p['implied'] * 100, 2),
+                        }
+                        for name, p in entry['books'].items()
+                        if not books_lower or name.lower() in books_lower
+                    ],
+                    key=lambda x: x['book']
+                )
+
+    rows.sort(key=lambda x: (x['player_name'] or x['matchup'], x['stat_type'] or '', x['side'] or '', x['points'] or 0))
+
+    total = len(rows)
+    offset = (page - 1) * per_page
+
+    return {
+        'data': rows[offset:offset + per_page],
+        'details': details,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': (total + per_page - 1) // per_page
+        },
+        'meta': {
+            'last_sync': index.sync,
+            'filters': {
+                'books': books,
+                'stat_type': stat_type,
+                'player': player,
+                'team': team
+            }
+        }
+    }
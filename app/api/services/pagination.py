@@ -0,0 +1,180 @@
+"""
+Keyset pagination helpers.
+
+Pages are fetched with a WHERE on the sort key instead of an OFFSET, so a
+deep page costs the same as the first one. Clients page forward with the
+opaque `next_cursor` from the previous response. Plain `page` numbers still
+work: boundaries of pages already served are remembered per data version,
+so stepping through pages in order stays on the keyset path, and only an
+arbitrary jump falls back to OFFSET.
+
+Total counts are optional and cached per data version, since they can
+only change when a sync commits.
+"""
+import base64
+import json
+import threading
+from collections import OrderedDict
+from sqlalchemy import and_, or_
+from app.db.session import get_engine
+from app.data_sources import get_data_version
+
+# Most page boundaries / counts remembered per data version
+MAX_REMEMBERED = 10000
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort-key values of the last row on a page."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor into its sort-key values.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def after(columns, values, descending=False):
+    """Row-value comparison `(columns) > (values)` (or < when descending)."""
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, and_(column == value, after(columns[1:], values[1:], descending)))
+
+
+class GenerationCache:
+    """Small LRU dict that empties itself whenever the data version moves.
+
+    Callers read the data version before computing a value and pass it to
+    put, so a value computed from data a sync has since replaced is dropped
+    instead of being stored under the new version.
+    """
+
+    def __init__(self, max_entries=MAX_REMEMBERED):
+        self.version = None
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def _check_version(self, version):
+        """Drop everything if the data version moved forward (caller holds the lock).
+
+        Returns:
+            True if `version` is the cache's current version
+        """
+        if self.version is None or version > self.version:
+            self.entries = OrderedDict()
+            self.version = version
+        return version == self.version
+
+    def get(self, key, version):
+        with self.lock:
+            if not self._check_version(version):
+                return None
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, version, value):
+        with self.lock:
+            if not self._check_version(version):
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+_counts = GenerationCache()
+_anchors = GenerationCache()
+_indexed_tables = set()
+
+
+def ensure_indexes(table):
+    """Create a table's declared indexes if this database predates them."""
+    if table.name not in _indexed_tables:
+        for index in table.indexes:
+            index.create(get_engine(), checkfirst=True)
+        _indexed_tables.add(table.name)
+
+
+def paginate(query, columns, key_of, count_key, per_page, page=1, cursor=None,
+             include_total=True, descending=False):
+    """
+    Fetch one page of `query` ordered by `columns`.
+
+    Args:
+        query: Filtered (unordered) query
+        columns: Sort-key columns; the last must make the key unique
+        key_of: Function returning a result row's sort-key values
+        count_key: Hashable identity of the query's filters (for caching)
+        per_page: Rows per page
+        page: Page number, used when no cursor is given
+        cursor: Cursor from a previous page's `next_cursor` (optional)
+        include_total: Whether to report total/total_pages
+        descending: Sort direction for every column
+
+    Returns:
+        Tuple of (rows, pagination dict)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    version = get_data_version()
+    order = [c.desc() for c in columns] if descending else list(columns)
+    ordered = query.order_by(*order)
+
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        page = None
+    elif page == 1:
+        values = None
+    else:
+        values = _anchors.get((count_key, per_page, page), version)
+
+    if values is not None:
+        rows = ordered.filter(after(columns, values, descending)).limit(per_page + 1).all()
+    elif page == 1 or page is None:
+        rows = ordered.limit(per_page + 1).all()
+    else:
+        rows = ordered.offset((page - 1) * per_page).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_more:
+        next_values = list(key_of(rows[-1]))
+        next_cursor = encode_cursor(next_values)
+        if page is not None:
+            _anchors.put((count_key, per_page, page + 1), version, next_values)
+
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': next_cursor,
+    }
+
+    if include_total:
+        total = _counts.get(count_key, version)
+        if total is None:
+            total = query.order_by(None).count()
+            _counts.put(count_key, version, total)
+        pagination['total'] = total
+        pagination['total_pages'] = (total + per_page - 1) // per_page
+
+    return rows, pagination
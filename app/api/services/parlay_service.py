@@ -1,13 +1,24 @@
 """
 Parlay builder service for finding +EV lines and validating parlays.
 """
+import heapq
+import time
 from sqlalchemy import func
 from app.db.session import get_session
 from app.models.statlines import Statlines
 from app.models.books import Books
 from app.models.matchups import Matchups
 from app.models.props import Props
-from app.api.services.calculator_service import BREAKEVEN_PROBS
+from app.api.services.search_service import match_players
+from app.api.services.matchup_service import game_filters, normalize_sport, team_condition, upcoming_key
+from app.api.services.pagination import ensure_indexes, paginate
+from app.api.services.calculator_service import (
+    get_breakeven_prob,
+    get_parlay_types,
+    get_payout_table,
+    calculate_slip_ev,
+    score_slips
+)
 
 
 def american_to_implied_prob(american_odds):
@@ -31,7 +42,16 @@ def implied_prob_to_american(prob):
         return round(100 * (1 - prob) / prob)
 
 
-def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None, stat_type=None):
+# Fields of an EV line, in response order
+EV_LINE_FIELDS = (
+    'id', 'player_name', 'stat_type', 'points', 'designation', 'matchup', 'betting_book',
+    'edge', 'edge_percent', 'sharp_implied_prob', 'sharp_implied_percent',
+    'sharp_implied_odds', 'breakeven_prob', 'sharp_books_data',
+)
+
+
+def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None, stat_type=None,
+                  sport=None, upcoming_only=False, fields=None):
     """
     Find lines where sharp book odds imply better probability than break-even.
 
@@ -52,15 +72,30 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
         team: Filter by team (optional)
         player: Filter by player name (optional)
         stat_type: Filter by stat type (optional)
+        sport: Filter by league, e.g. 'NBA' (optional)
+        upcoming_only: Only games that haven't started yet
+        fields: EV line fields to return (optional, default all); the matchup
+            columns are only selected when 'matchup' is asked for
 
     Returns:
         Dictionary with +EV lines and metadata
     """
-    breakeven_prob = BREAKEVEN_PROBS.get(parlay_type)
+    if fields:
+        unknown = [name for name in fields if name not in EV_LINE_FIELDS]
+        if unknown:
+            return {
+                'error': f"Invalid fields: {', '.join(unknown)}",
+                'valid_fields': list(EV_LINE_FIELDS)
+            }
+        fields = [name for name in EV_LINE_FIELDS if name in fields]
+    else:
+        fields = list(EV_LINE_FIELDS)
+
+    breakeven_prob = get_breakeven_prob(parlay_type, betting_book)
     if not breakeven_prob:
         return {
             'error': f'Invalid parlay type: {parlay_type}',
-            'valid_types': list(BREAKEVEN_PROBS.keys())
+            'valid_types': get_parlay_types(betting_book)
         }
 
     Session = get_session()
@@ -68,9 +103,13 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
 
     try:
         # Build base query with filters
-        def build_query(book_names):
+        def build_query(book_names, *columns):
             query = (
-                session.query(Statlines, Books, Matchups, Props)
+                session.query(
+                    Statlines.player_name, Statlines.designation, Statlines.points,
+                    Books.book_name, Props.units, *columns
+                )
+                .select_from(Statlines)
                 .join(Books, Statlines.book_id == Books.book_id)
                 .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
                 .join(Props, Statlines.prop_id == Props.prop_id)
@@ -81,59 +120,62 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
                 query = query.filter(func.lower(Props.units) == stat_type.lower())
 
             if player:
-                player_pattern = f"%{player.lower()}%"
-                query = query.filter(func.lower(Statlines.player_name).like(player_pattern))
+                query = query.filter(Statlines.player_name.in_(sorted(match_players(player))))
 
             if team:
-                team_pattern = f"%{team.lower()}%"
-                query = query.filter(
-                    (func.lower(Matchups.home_team).like(team_pattern)) |
-                    (func.lower(Matchups.away_team).like(team_pattern))
-                )
+                query = query.filter(team_condition(team))
 
-            return query
+            return query.filter(*game_filters(sport, upcoming_only))
 
-        # Get lines from betting book
-        betting_lines = build_query([betting_book]).all()
+        # Get lines from betting book (labels only when the matchup is returned)
+        matchup_columns = (Matchups.home_team, Matchups.away_team) if 'matchup' in fields else ()
+        betting_lines = build_query([betting_book], Statlines.line_id, *matchup_columns).all()
 
         # Get lines from sharp books
-        sharp_lines = build_query(sharp_books).all()
+        sharp_lines = build_query(sharp_books, Statlines.price).all()
 
-        # Build lookup for sharp book lines: key -> list of {book, price, points}
+        # Build lookup for sharp book lines: key -> list of {book, price, points}, or
+        # just their implied probabilities when sharp_books_data isn't returned
+        book_details = 'sharp_books_data' in fields
         sharp_lookup = {}
-        for statline, book, matchup, prop in sharp_lines:
-            if not statline.player_name or not prop.units:
+        for line in sharp_lines:
+            if not line.player_name or not line.units:
                 continue
 
             key = (
-                statline.player_name.lower().strip(),
-                prop.units.lower().strip(),
-                statline.designation.lower() if statline.designation else 'over'
+                line.player_name.lower().strip(),
+                line.units.lower().strip(),
+                line.designation.lower() if line.designation else 'over'
             )
 
             if key not in sharp_lookup:
                 sharp_lookup[key] = []
 
-            if statline.price is not None:
+            if line.price is None:
+                continue
+            implied_prob = american_to_implied_prob(float(line.price))
+            if book_details:
                 sharp_lookup[key].append({
-                    'book': book.book_name,
-                    'price': float(statline.price),
-                    'points': float(statline.points) if statline.points else None,
-                    'implied_prob': american_to_implied_prob(float(statline.price))
+                    'book': line.book_name,
+                    'price': float(line.price),
+                    'points': float(line.points) if line.points else None,
+                    'implied_prob': implied_prob
                 })
+            elif implied_prob is not None:
+                sharp_lookup[key].append(implied_prob)
 
         # Find +EV lines from betting book
         ev_lines = []
         seen_keys = set()
 
-        for statline, book, matchup, prop in betting_lines:
-            if not statline.player_name or not prop.units:
+        for line in betting_lines:
+            if not line.player_name or not line.units:
                 continue
 
             key = (
-                statline.player_name.lower().strip(),
-                prop.units.lower().strip(),
-                statline.designation.lower() if statline.designation else 'over'
+                line.player_name.lower().strip(),
+                line.units.lower().strip(),
+                line.designation.lower() if line.designation else 'over'
             )
 
             # Skip duplicates
@@ -148,7 +190,10 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
             sharp_data = sharp_lookup[key]
 
             # Calculate average implied probability across sharp books
-            implied_probs = [s['implied_prob'] for s in sharp_data if s['implied_prob'] is not None]
+            if book_details:
+                implied_probs = [s['implied_prob'] for s in sharp_data if s['implied_prob'] is not None]
+            else:
+                implied_probs = sharp_data
             if not implied_probs:
                 continue
 
@@ -162,28 +207,36 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
 
             # Only include lines with positive edge (sharp books think it hits more than breakeven requires)
             if edge > 0:
-                ev_lines.append({
-                    'id': statline.line_id,
-                    'player_name': statline.player_name,
-                    'stat_type': prop.units,
-                    'points': float(statline.points) if statline.points else None,
-                    'designation': statline.designation,
-                    'matchup': f"{matchup.away_team} @ {matchup.home_team}" if matchup.home_team else "Unknown",
-                    'betting_book': book.book_name,
-                    'edge': round(edge, 4),
-                    'edge_percent': round(edge * 100, 2),
-                    'sharp_implied_prob': round(avg_sharp_implied, 4),
-                    'sharp_implied_percent': round(avg_sharp_implied * 100, 2),
-                    'sharp_implied_odds': implied_prob_to_american(avg_sharp_implied),
-                    'breakeven_prob': breakeven_prob,
-                    'sharp_books_data': sharp_data,
-                })
+                ev_lines.append((edge, line, avg_sharp_implied, sharp_data))
 
         # Sort by edge (highest first)
-        ev_lines.sort(key=lambda x: x['edge'], reverse=True)
+        ev_lines.sort(key=lambda x: round(x[0], 4), reverse=True)
+
+        def ev_line(edge, line, avg_sharp_implied, sharp_data):
+            if matchup_columns:
+                matchup = f"{line.away_team} @ {line.home_team}" if line.home_team else "Unknown"
+            else:
+                matchup = None
+            values = {
+                'id': line.line_id,
+                'player_name': line.player_name,
+                'stat_type': line.units,
+                'points': float(line.points) if line.points else None,
+                'designation': line.designation,
+                'matchup': matchup,
+                'betting_book': line.book_name,
+                'edge': round(edge, 4),
+                'edge_percent': round(edge * 100, 2),
+                'sharp_implied_prob': round(avg_sharp_implied, 4),
+                'sharp_implied_percent': round(avg_sharp_implied * 100, 2),
+                'sharp_implied_odds': implied_prob_to_american(avg_sharp_implied),
+                'breakeven_prob': breakeven_prob,
+                'sharp_books_data': sharp_data,
+            }
+            return {name: values[name] for name in fields}
 
         return {
-            'data': ev_lines,
+            'data': [ev_line(*entry) for entry in ev_lines],
             'meta': {
                 'betting_book': betting_book,
                 'sharp_books': sharp_books,
@@ -195,7 +248,9 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
                 'filters': {
                     'team': team,
                     'player': player,
-                    'stat_type': stat_type
+                    'stat_type': stat_type,
+                    'sport': sport,
+                    'upcoming_only': upcoming_only
                 }
             }
         }
@@ -204,7 +259,7 @@ def find_ev_lines(betting_book, sharp_books, parlay_type, team=None, player=None
         session.close()
 
 
-def validate_parlay_lines(line_ids, sharp_books, parlay_type):
+def validate_parlay_lines(line_ids, sharp_books, parlay_type, betting_book=None):
     """
     Validate user-selected lines against sharp books.
 
@@ -212,15 +267,16 @@ def validate_parlay_lines(line_ids, sharp_books, parlay_type):
         line_ids: List of line IDs from the betting book
         sharp_books: List of sharp book names to compare against
         parlay_type: Type of parlay (determines break-even probability)
+        betting_book: Platform whose payout table to use (optional)
 
     Returns:
         Dictionary with validation results for each line
     """
-    breakeven_prob = BREAKEVEN_PROBS.get(parlay_type)
+    breakeven_prob = get_breakeven_prob(parlay_type, betting_book)
     if not breakeven_prob:
         return {
             'error': f'Invalid parlay type: {parlay_type}',
-            'valid_types': list(BREAKEVEN_PROBS.keys())
+            'valid_types': get_parlay_types(betting_book)
         }
 
     if not line_ids:
@@ -277,6 +333,7 @@ def validate_parlay_lines(line_ids, sharp_books, parlay_type):
 
         # Validate each selected line
         validated_lines = []
+        leg_probs = []
         total_edge = 0
         ev_count = 0
 
@@ -307,6 +364,7 @@ def validate_parlay_lines(line_ids, sharp_books, parlay_type):
 
             if edge is not None:
                 total_edge += edge
+                leg_probs.append(avg_sharp_implied)
                 if is_ev:
                     ev_count += 1
 
@@ -325,8 +383,16 @@ def validate_parlay_lines(line_ids, sharp_books, parlay_type):
                 'has_sharp_data': len(sharp_data) > 0,
             })
 
+        # Exact slip EV from each leg's own probability, when every leg has sharp data
+        slip = None
+        if leg_probs and len(leg_probs) == len(validated_lines):
+            slip = calculate_slip_ev(leg_probs, parlay_type, betting_book)
+            if 'error' in slip:
+                slip = None
+
         return {
             'validated_lines': validated_lines,
+            'slip': slip,
             'summary': {
                 'total_lines': len(validated_lines),
                 'ev_lines': ev_count,
@@ -343,7 +409,8 @@ def validate_parlay_lines(line_ids, sharp_books, parlay_type):
         session.close()
 
 
-def get_available_lines(betting_book, team=None, player=None, stat_type=None, page=1, per_page=50):
+def get_available_lines(betting_book, team=None, player=None, stat_type=None, sport=None,
+                        upcoming_only=False, page=1, per_page=50, cursor=None, include_total=True):
     """
     Get available lines from a betting book for manual selection.
 
@@ -352,12 +419,21 @@ def get_available_lines(betting_book, team=None, player=None, stat_type=None, pa
         team: Filter by team (optional)
         player: Filter by player name (optional)
         stat_type: Filter by stat type (optional)
+        sport: Filter by league, e.g. 'NBA' (optional)
+        upcoming_only: Only games that haven't started yet
         page: Page number for pagination
         per_page: Items per page
+        cursor: Cursor from the previous page (optional, takes precedence over page)
+        include_total: Whether to include the (cached) total count
 
     Returns:
         Dictionary with lines and pagination info
+
+    Raises:
+        ValueError: If the cursor is malformed
     """
+    ensure_indexes(Statlines.__table__)
+
     Session = get_session()
     session = Session()
 
@@ -368,28 +444,34 @@ def get_available_lines(betting_book, team=None, player=None, stat_type=None, pa
             .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
             .join(Props, Statlines.prop_id == Props.prop_id)
             .filter(func.lower(Books.book_name) == betting_book.lower())
+            # Lines without a player can't be picked, and NULL would break the keyset
+            .filter(Statlines.player_name.isnot(None))
         )
 
         if stat_type:
             query = query.filter(func.lower(Props.units) == stat_type.lower())
 
         if player:
-            player_pattern = f"%{player.lower()}%"
-            query = query.filter(func.lower(Statlines.player_name).like(player_pattern))
+            query = query.filter(Statlines.player_name.in_(sorted(match_players(player))))
 
         if team:
-            team_pattern = f"%{team.lower()}%"
-            query = query.filter(
-                (func.lower(Matchups.home_team).like(team_pattern)) |
-                (func.lower(Matchups.away_team).like(team_pattern))
-            )
-
-        # Get total count
-        total = query.count()
-
-        # Apply pagination
-        offset = (page - 1) * per_page
-        results = query.order_by(Statlines.player_name).offset(offset).limit(per_page).all()
+            query = query.filter(team_condition(team))
+
+        query = query.filter(*game_filters(sport, upcoming_only))
+
+        # (player_name, line_id) is unique and covered by ix_statlines_book_player
+        results, pagination = paginate(
+            query,
+            columns=[Statlines.player_name, Statlines.line_id],
+            key_of=lambda row: (row[0].player_name, row[0].line_id),
+            count_key=('parlay_lines', betting_book.lower(), (team or '').lower(),
+                       (player or '').lower(), (stat_type or '').lower(),
+                       normalize_sport(sport), upcoming_key(upcoming_only)),
+            per_page=per_page,
+            page=page,
+            cursor=cursor,
+            include_total=include_total
+        )
 
         lines = []
         for statline, book, matchup, prop in results:
@@ -404,13 +486,208 @@ def get_available_lines(betting_book, team=None, player=None, stat_type=None, pa
 
         return {
             'data': lines,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            }
+            'pagination': pagination
         }
 
     finally:
         session.close()
+
+
+def _search_top_slips(legs, picks, parlay_type, platform, top_k, max_per_matchup, deadline):
+    """Branch-and-bound search for the top-K slips by exact expected ROI.
+
+    Legs must be sorted by probability, highest first. Slip EV only grows
+    when a leg's probability grows, so the best completion of a partial slip
+    can never beat filling its open slots with the next highest-probability
+    legs. That relaxation (which ignores the constraints) is the upper bound
+    used to prune.
+
+    Returns:
+        Tuple of (list of (roi, expected_return, variance, leg indexes), nodes, complete)
+    """
+    probs = [leg['sharp_implied_prob'] for leg in legs]
+    best = []  # min-heap of (roi, expected_return, variance, indexes)
+    stats = {'nodes': 0, 'complete': True}
+    matchup_counts = {}
+    used_markets = set()
+    chosen = []
+
+    def threshold():
+        return best[0][0] if len(best) >= top_k else float('-inf')
+
+    def search(start):
+        stats['nodes'] += 1
+        if stats['nodes'] % 256 == 0 and time.perf_counter() > deadline:
+            stats['complete'] = False
+            return
+
+        open_slots = picks - len(chosen)
+        if open_slots == 0:
+            expected, roi, variance = score_slips(
+                [[probs[i] for i in chosen]], parlay_type, platform
+            )[0]
+            entry = (roi, expected, variance, tuple(chosen))
+            if len(best) < top_k:
+                heapq.heappush(best, entry)
+            elif roi > best[0][0]:
+                heapq.heapreplace(best, entry)
+            return
+
+        for i in range(start, len(legs) - open_slots + 1):
+            # Optimistic bound: current legs plus the best legs still available
+            bound_probs = [probs[j] for j in chosen] + probs[i:i + open_slots]
+            bound = score_slips([bound_probs], parlay_type, platform)[0][1]
+            if bound <= threshold():
+                # Later legs only have lower probabilities, so nothing past i can do better
+                return
+
+            leg = legs[i]
+            market = leg['market_key']
+            matchup = leg['matchup']
+            if market in used_markets:
+                continue
+            if max_per_matchup and matchup_counts.get(matchup, 0) >= max_per_matchup:
+                continue
+
+            chosen.append(i)
+            used_markets.add(market)
+            matchup_counts[matchup] = matchup_counts.get(matchup, 0) + 1
+
+            search(i + 1)
+
+            chosen.pop()
+            used_markets.discard(market)
+            matchup_counts[matchup] -= 1
+
+            if not stats['complete']:
+                return
+
+    search(0)
+    ranked = sorted(best, key=lambda entry: entry[0], reverse=True)
+    return ranked, stats['nodes'], stats['complete']
+
+
+def optimize_parlay(betting_book, sharp_books, parlay_type, top_k=5, max_per_matchup=None,
+                    required_books=None, time_budget_ms=500, pool_size=200,
+                    team=None, player=None, stat_type=None, sport=None, upcoming_only=False):
+    """
+    Build the top-K slips from the +EV pool by exact expected ROI.
+
+    Constraints:
+        - At most max_per_matchup legs from the same game (optional)
+        - Never both sides (or the same side twice) of one player's stat
+        - Every leg priced by all of required_books (optional)
+
+    Args:
+        betting_book: User's betting platform (e.g., 'PrizePicks')
+        sharp_books: List of sharp book names to compare against
+        parlay_type: Type of parlay (determines slip size and payout table)
+        top_k: Number of slips to return
+        max_per_matchup: Maximum legs per matchup (optional)
+        required_books: Sharp books that must price every leg (optional)
+        time_budget_ms: Search time budget; best slips found so far are returned
+        pool_size: Maximum number of +EV legs considered (highest probability first)
+        team: Filter by team (optional)
+        player: Filter by player name (optional)
+        stat_type: Filter by stat type (optional)
+        sport: Filter by league, e.g. 'NBA' (optional)
+        upcoming_only: Only games that haven't started yet
+
+    Returns:
+        Dictionary with ranked slips and search metadata
+    """
+    table = get_payout_table(parlay_type, betting_book)
+    if table is None:
+        return {
+            'error': f'Invalid parlay type: {parlay_type}',
+            'valid_types': get_parlay_types(betting_book)
+        }
+
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000
+
+    # Per-book sharp prices are only needed to check required_books
+    required = {b.lower() for b in (required_books or [])}
+    fields = ['id', 'player_name', 'stat_type', 'points', 'designation', 'matchup', 'sharp_implied_prob']
+    if required:
+        fields.append('sharp_books_data')
+
+    ev_result = find_ev_lines(
+        betting_book=betting_book,
+        sharp_books=sharp_books,
+        parlay_type=parlay_type,
+        team=team,
+        player=player,
+        stat_type=stat_type,
+        sport=sport,
+        upcoming_only=upcoming_only,
+        fields=fields
+    )
+    if 'error' in ev_result:
+        return ev_result
+
+    legs = []
+    for line in ev_result['data']:
+        if required:
+            priced_by = {s['book'].lower() for s in line['sharp_books_data']}
+            if not required <= priced_by:
+                continue
+        leg = dict(line)
+        leg['market_key'] = (line['player_name'].lower().strip(), line['stat_type'].lower().strip())
+        legs.append(leg)
+
+    legs.sort(key=lambda leg: leg['sharp_implied_prob'], reverse=True)
+    legs = legs[:pool_size]
+
+    picks = table['total_picks']
+    ranked, nodes, complete = [], 0, True
+    if len(legs) >= picks:
+        ranked, nodes, complete = _search_top_slips(
+            legs, picks, parlay_type, betting_book, top_k, max_per_matchup, deadline
+        )
+
+    slips = []
+    for roi, expected, variance, indexes in ranked:
+        slips.append({
+            'legs': [
+                {
+                    'id': legs[i]['id'],
+                    'player_name': legs[i]['player_name'],
+                    'stat_type': legs[i]['stat_type'],
+                    'points': legs[i]['points'],
+                    'designation': legs[i]['designation'],
+                    'matchup': legs[i]['matchup'],
+                    'sharp_implied_prob': legs[i]['sharp_implied_prob'],
+                }
+                for i in indexes
+            ],
+            'expected_return': round(expected, 4),
+            'roi': round(roi, 4),
+            'roi_percent': round(roi * 100, 2),
+            'variance': round(variance, 4),
+        })
+
+    return {
+        'data': slips,
+        'meta': {
+            'betting_book': betting_book,
+            'sharp_books': sharp_books,
+            'parlay_type': parlay_type,
+            'total_picks': picks,
+            'pool_size': len(legs),
+            'nodes_explored': nodes,
+            'complete': complete,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'constraints': {
+                'max_per_matchup': max_per_matchup,
+                'required_books': required_books,
+            },
+            'filters': {
+                'team': team,
+                'player': player,
+                'stat_type': stat_type,
+                'sport': sport,
+                'upcoming_only': upcoming_only
+            }
+        }
+    }
@@ -0,0 +1,323 @@
+"""
+Player and team search.
+
+An in-memory index of every player and team name, rebuilt once per sync.
+Names are folded (accents stripped, case-folded, punctuation to spaces) and
+posted under each token's prefixes and under their trigrams, so autocomplete
+and partial-match filters are set lookups rather than LIKE scans. Results
+are ranked by how well the name matches, then by popularity (line count).
+
+The player/team filters of the other services resolve through here: a
+player filter becomes the exact set of matching names and a team filter the
+set of matching team ids (a team's aliases match too), which SQL services
+turn into indexed predicates on Matchups' home/away ids and in-memory
+services into the set of matchup ids those teams play in. Filters keep
+punctuation significant ('la &' is not 'la'); only autocomplete ignores it.
+"""
+import re
+import threading
+import unicodedata
+from sqlalchemy import func
+from app.db.session import get_session
+from app.models.statlines import Statlines
+from app.models.matchups import Matchups
+from app.models.teams import Teams
+from app.data_sources import get_data_version, on_sync
+
+# Entity types in search results
+SEARCH_TYPES = ('player', 'team')
+
+# Longest token prefix posted; longer query tokens are checked against the names
+MAX_PREFIX = 12
+
+# Trigram similarity (shared / union) a fuzzy match needs
+MIN_SIMILARITY = 0.3
+
+# Most distinct filter values whose resolved sets are remembered per sync
+MAX_RESOLVED = 1000
+
+# Match tiers, best first
+EXACT, LEADING, PREFIX, SUBSTRING, FUZZY = range(5)
+MATCH_NAMES = ('exact', 'prefix', 'prefix', 'substring', 'fuzzy')
+
+_non_alnum = re.compile(r'[^0-9a-z]+')
+
+
+def _unaccented(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def fold(text):
+    """Accent- and case-insensitive form of a name: 'Montréal  Canadiens' -> 'montreal canadiens'."""
+    return _non_alnum.sub(' ', _unaccented(text)).strip()
+
+
+def literal(text):
+    """Accent- and case-insensitive form that keeps punctuation: "D'Angelo  Russell" -> "d'angelo russell"."""
+    return ' '.join(_unaccented(text).split())
+
+
+def _trigrams(folded, padded=False):
+    text = f'  {folded} ' if padded else folded
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Prefix and trigram postings over player and team names."""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.entries = []       # id -> {type, name, folded, literal, tokens, count, team_id, listed}
+        self.prefixes = {}      # token prefix -> set of ids
+        self.grams = {}         # trigram of the folded name -> set of ids
+        self.fuzzy_grams = {}   # trigram of the padded folded name -> set of ids
+        self.team_games = {}    # team id -> frozenset of matchup ids
+        self.team_entries = {}  # team id -> id of the team's listed entry
+        self.resolved = {}
+        self.lock = threading.Lock()
+
+    def add(self, type_, name, count, team_id=None, listed=True):
+        folded = fold(name)
+        if not folded:
+            return
+        entity_id = len(self.entries)
+        tokens = folded.split()
+        self.entries.append({
+            'type': type_,
+            'name': name,
+            'folded': folded,
+            'literal': literal(name),
+            'tokens': tokens,
+            'count': count,
+            'team_id': team_id,
+            'listed': listed,
+        })
+        for token in tokens:
+            for end in range(1, min(len(token), MAX_PREFIX) + 1):
+                self.prefixes.setdefault(token[:end], set()).add(entity_id)
+        for gram in _trigrams(folded):
+            self.grams.setdefault(gram, set()).add(entity_id)
+        for gram in _trigrams(folded, padded=True):
+            self.fuzzy_grams.setdefault(gram, set()).add(entity_id)
+
+    @classmethod
+    def build(cls, version):
+        """Index every player and team name in the database."""
+        Session = get_session()
+        session = Session()
+
+        try:
+            players = (
+                session.query(Statlines.player_name, func.count())
+                .filter(Statlines.player_name.isnot(None))
+                .group_by(Statlines.player_name)
+                .all()
+            )
+            teams = session.query(Teams.team_id, Teams.team_name, Teams.aliases).all()
+            matchups = (
+                session.query(Matchups.matchup_id, Matchups.home_team_id, Matchups.away_team_id, func.count())
+                .join(Statlines, Statlines.matchup_id == Matchups.matchup_id)
+                .group_by(Matchups.matchup_id, Matchups.home_team_id, Matchups.away_team_id)
+                .all()
+            )
+        finally:
+            session.close()
+
+        index = cls(version)
+        counts = {}
+        games = {}
+        for matchup_id, home_id, away_id, count in matchups:
+            for team_id in (home_id, away_id):
+                if team_id is not None:
+                    counts[team_id] = counts.get(team_id, 0) + count
+                    games.setdefault(team_id, set()).add(matchup_id)
+        index.team_games = {team_id: frozenset(ids) for team_id, ids in games.items()}
+
+        team_names = set()
+        for team_id, name, aliases in teams:
+            if team_id not in counts:
+                continue
+            index.team_entries[team_id] = len(index.entries)
+            index.add('team', name, counts[team_id], team_id)
+            for alias in aliases or ():
+                index.add('team', alias, counts[team_id], team_id, listed=False)
+            team_names.update(fold(alias) for alias in [name, *(aliases or ())])
+
+        # Game lines (moneyline, spread, total) carry the team as player name;
+        # they still match player filters but aren't suggested as players
+        for name, count in players:
+            index.add('player', name, count, listed=fold(name) not in team_names)
+        return index
+
+    def _containing(self, folded):
+        """Ids whose folded name contains `folded` as a substring."""
+        if len(folded) < 3:
+            return {i for i, entry in enumerate(self.entries) if folded in entry['folded']}
+        candidates = None
+        for gram in _trigrams(folded):
+            posting = self.grams.get(gram, set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        return {i for i in candidates if folded in self.entries[i]['folded']}
+
+    def _prefixed(self, tokens):
+        """Ids where every query token starts some token of the name."""
+        candidates = None
+        for token in tokens:
+            posting = self.prefixes.get(token[:MAX_PREFIX], set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        return {
+            i for i in candidates
+            if all(any(t.startswith(q) for t in self.entries[i]['tokens']) for q in tokens)
+        }
+
+    def _fuzzy(self, folded):
+        """Ids whose padded trigrams overlap the query's enough, with their similarity."""
+        query_grams = _trigrams(folded, padded=True)
+        shared = {}
+        for gram in query_grams:
+            for i in self.fuzzy_grams.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        matches = {}
+        for i, common in shared.items():
+            grams = len(_trigrams(self.entries[i]['folded'], padded=True))
+            similarity = common / (len(query_grams) + grams - common)
+            if similarity >= MIN_SIMILARITY:
+                matches[i] = similarity
+        return matches
+
+    def search(self, query, types=SEARCH_TYPES, limit=10):
+        """Ranked matches for an autocomplete query."""
+        folded = fold(query)
+        if not folded:
+            return []
+        tokens = folded.split()
+
+        tiers = {}
+        for i in self._prefixed(tokens):
+            entry = self.entries[i]
+            if entry['folded'] == folded:
+                tiers[i] = (EXACT, 0)
+            elif entry['folded'].startswith(folded):
+                tiers[i] = (LEADING, 0)
+            else:
+                tiers[i] = (PREFIX, 0)
+        for i in self._containing(folded):
+            tiers.setdefault(i, (SUBSTRING, 0))
+        if len(tiers) < limit and len(folded) >= 3:
+            for i, similarity in self._fuzzy(folded).items():
+                tiers.setdefault(i, (FUZZY, -similarity))
+
+        # A hit on a team alias suggests the team under its own name
+        for i, tier in list(tiers.items()):
+            canonical = self.team_entries.get(self.entries[i]['team_id'])
+            if canonical is not None and canonical != i:
+                tiers[canonical] = min(tiers.get(canonical, tier), tier)
+
+        ranked = sorted(
+            (i for i in tiers if self.entries[i]['listed'] and self.entries[i]['type'] in types),
+            key=lambda i: (tiers[i], -self.entries[i]['count'], self.entries[i]['folded'])
+        )
+        return [
+            {
+                'type': self.entries[i]['type'],
+                'value': self.entries[i]['name'],
+                'count': self.entries[i]['count'],
+                'match': MATCH_NAMES[tiers[i][0]],
+            }
+            for i in ranked[:limit]
+        ]
+
+    def resolve(self, kind, query):
+        """Exact player names / team ids / matchup ids whose name contains `query`.
+
+        Matching ignores accents and case but not punctuation. A query with
+        no letters or digits matches nothing.
+        """
+        key = (kind, literal(query))
+        with self.lock:
+            cached = self.resolved.get(key)
+        if cached is not None:
+            return cached
+
+        type_ = 'player' if kind == 'players' else 'team'
+        folded = fold(query)
+        # A literal match always contains the folded query, so the trigram
+        # postings narrow the candidates before the exact check
+        candidates = self._containing(folded) if folded else ()
+        matched = [
+            self.entries[i] for i in candidates
+            if self.entries[i]['type'] == type_ and key[1] in self.entries[i]['literal']
+        ]
+        if kind == 'players':
+            result = frozenset(entry['name'] for entry in matched)
+        else:
+            team_ids = frozenset(entry['team_id'] for entry in matched)
+            result = team_ids if kind == 'teams' else frozenset().union(
+                *(self.team_games.get(team_id, ()) for team_id in team_ids)
+            )
+
+        with self.lock:
+            if len(self.resolved) >= MAX_RESOLVED:
+                self.resolved.clear()
+            self.resolved[key] = result
+        return result
+
+
+_state = {'index': None}
+_build_lock = threading.Lock()
+
+
+def get_search_index():
+    """Get the search index for the current data version, building it if needed."""
+    version = get_data_version()
+    index = _state['index']
+    if index is None or index.version != version:
+        with _build_lock:
+            index = _state['index']
+            if index is None or index.version != version:
+                index = _state['index'] = SearchIndex.build(version)
+    return index
+
+
+@on_sync
+def rebuild_search_index(changes=None):
+    """Rebuild the search index once a sync commits."""
+    with _build_lock:
+        _state['index'] = SearchIndex.build(get_data_version())
+
+
+def search(query, types=SEARCH_TYPES, limit=10):
+    """
+    Autocomplete players and teams.
+
+    Args:
+        query: Text typed so far (accent- and case-insensitive)
+        types: Entity types to include ('player', 'team')
+        limit: Maximum results
+
+    Returns:
+        List of {type, value, count, match}, best match first: exact, then
+        name or word prefix, substring, and finally fuzzy (typo) matches;
+        ties go to the name with more lines
+    """
+    return get_search_index().search(query, types, limit)
+
+
+def match_players(query):
+    """Exact player names matching a partial player filter."""
+    return get_search_index().resolve('players', query)
+
+
+def match_teams(query):
+    """Ids of the teams matching a partial team filter (name or alias)."""
+    return get_search_index().resolve('teams', query)
+
+
+def match_matchups(query):
+    """Ids of the matchups involving a team matching a partial team filter."""
+    return get_search_index().resolve('matchups', query)
@@ -0,0 +1,300 @@
+"""
+Steam-move and stale-line detection.
+
+Runs on each sync's change set and keeps rolling per-market state: the last
+few prices of every book on every market side. Only markets where some book
+actually moved are evaluated, so the cost of a sync follows the number of
+changes rather than the size of the slate. A book a sync leaves out of a
+market it wrote is dropped from that market, and markets of games a sync no
+longer lists are dropped.
+
+Syncs are followed through the persisted sync log (see
+data_sources.sync_log), so every server process sees every sync, whichever
+process ran it; a process that starts following replays the last
+HISTORY_LENGTH syncs to rebuild its price history.
+
+Two signals are raised:
+    steam: several books moved the same side the same way in one sync
+    stale: a book sits away from the consensus of the other books while
+           the market around it is moving
+"""
+import threading
+from collections import deque
+from datetime import datetime
+from statistics import median
+from app.data_sources import on_sync
+from app.data_sources.sync_log import SyncFollower
+from app.api.services.arbitrage_service import market_side
+from app.api.services.comparison_service import american_to_implied_prob
+
+# Prices remembered per book per market side
+HISTORY_LENGTH = 5
+
+# Minimum implied-probability move (in probability points) that counts as a move
+MOVE_THRESHOLD = 0.02
+
+# Books that must move the same way in one sync to call it steam
+STEAM_MIN_BOOKS = 3
+
+# Gap from consensus (in probability points) that makes a book stale
+STALE_THRESHOLD = 0.03
+
+# Alerts kept for the endpoint
+MAX_SIGNALS = 1000
+
+_state = {}  # market side key -> {book: deque of observations}
+_markets = {}  # market side key -> display info
+_signals = deque(maxlen=MAX_SIGNALS)
+_lock = threading.Lock()
+
+
+def _market_info(row):
+    return {
+        'player_name': row['player_name'] if row['designation'] else None,
+        'stat_type': row['units'],
+        'matchup': f"{row['away_team']} @ {row['home_team']}" if row['home_team'] else "Unknown",
+        'side': row['designation'] or row['player_name'],
+    }
+
+
+def _observe(changes, observed_at):
+    """Fold a change set into the rolling state.
+
+    Each book keeps one history per market side whatever its line; moving
+    to a new line starts the history over rather than counting as a move.
+
+    Returns:
+        Tuple of (moved, written): market side key -> {book: (previous, current)}
+        for books whose price moved, and market -> {(side, book)} for every
+        line the change set wrote
+    """
+    moved = {}
+    written = {}
+    for row in changes:
+        if row['price'] is None or not row['player_name']:
+            continue
+        split = market_side(
+            row['line_type'], row['player_name'], row['designation'],
+            row['points'], row['home_team']
+        )
+        if split is None:
+            continue
+        market_key, side, _ = split
+        market = (row['matchup_id'], row['units'], market_key)
+        key = market + (side,)
+        book = row['book_name']
+        written.setdefault(market, set()).add((side, book))
+
+        books = _state.get(key)
+        if books is None:
+            books = _state[key] = {}
+            _markets[key] = _market_info(row)
+
+        history = books.get(book)
+        if history is None:
+            history = books[book] = deque(maxlen=HISTORY_LENGTH)
+
+        current = {
+            'price': row['price'],
+            'points': row['points'],
+            'implied': american_to_implied_prob(row['price']),
+            'observed_at': observed_at,
+        }
+        previous = history[-1] if history else None
+        if previous is not None and previous['points'] != current['points']:
+            history.clear()
+            previous = None
+        if previous is not None and previous['price'] == current['price']:
+            continue
+
+        history.append(current)
+        if previous is not None:
+            moved.setdefault(key, {})[book] = (previous, current)
+
+    return moved, written
+
+
+def _expire(written):
+    """Drop books a change set left out of markets it wrote (caller holds the lock).
+
+    A sync rewrites every line of a market it fetched, so a book missing
+    from it no longer lists that market.
+    """
+    for key in [key for key in _state if key[:3] in written]:
+        current = written[key[:3]]
+        books = _state[key]
+        for book in [book for book in books if (key[3], book) not in current]:
+            del books[book]
+        if not books:
+            del _state[key]
+            del _markets[key]
+
+
+def _detect(key, moves, observed_at):
+    """Evaluate one market where books moved this sync.
+
+    Books are only compared at the same line.
+    """
+    signals = []
+    info = _markets[key]
+    detected_at = observed_at.isoformat() + 'Z'
+
+    # Steam: enough books moved the same direction by a meaningful amount at one line
+    for direction in (1, -1):
+        by_points = {}
+        for book, (prev, cur) in moves.items():
+            if direction * (cur['implied'] - prev['implied']) >= MOVE_THRESHOLD:
+                by_points.setdefault(cur['points'], []).append((book, prev, cur))
+        for points, movers in by_points.items():
+            if len(movers) < STEAM_MIN_BOOKS:
+                continue
+            signals.append(dict(
+                info,
+                points=points,
+                type='steam',
+                direction='shortening' if direction > 0 else 'drifting',
+                books=[
+                    {
+                        'book': book,
+                        'from_price': int(prev['price']),
+                        'to_price': int(cur['price']),
+                        'move': round((cur['implied'] - prev['implied']) * 100, 2),
+                    }
+                    for book, prev, cur in sorted(movers, key=lambda mover: mover[0])
+                ],
+                avg_move=round(sum(cur['implied'] - prev['implied'] for _, prev, cur in movers) / len(movers) * 100, 2),
+                detected_at=detected_at,
+            ))
+
+    # Stale: books that didn't move and now sit away from everyone else on their line
+    latest = {book: history[-1] for book, history in _state.get(key, {}).items() if history}
+    for book, obs in latest.items():
+        if book in moves:
+            continue
+        others = [o['implied'] for name, o in latest.items() if name != book and o['points'] == obs['points']]
+        if len(others) < 2:
+            continue
+        consensus = median(others)
+        gap = consensus - obs['implied']
+        if abs(gap) >= STALE_THRESHOLD:
+            signals.append(dict(
+                info,
+                points=obs['points'],
+                type='stale',
+                book=book,
+                book_price=int(obs['price']),
+                book_implied=round(obs['implied'] * 100, 2),
+                consensus_implied=round(consensus * 100, 2),
+                gap=round(gap * 100, 2),
+                # Positive gap: the book still offers a better price than the market
+                favorable=gap > 0,
+                last_moved_at=obs['observed_at'].isoformat() + 'Z',
+                detected_at=detected_at,
+            ))
+
+    return signals
+
+
+def _retain(matchup_ids):
+    """Forget markets of games that are no longer in the slate (caller holds the lock)."""
+    for key in [key for key in _state if key[0] not in matchup_ids]:
+        del _state[key]
+        del _markets[key]
+
+
+def detect_signals(changes, observed_at=None):
+    """Update rolling state from a change set and publish new signals.
+
+    Returns:
+        List of signals raised by this sync
+    """
+    observed_at = observed_at or datetime.utcnow()
+    with _lock:
+        moved, written = _observe(changes, observed_at)
+        _expire(written)
+        raised = []
+        for key, moves in moved.items():
+            raised.extend(_detect(key, moves, observed_at))
+        _signals.extend(raised)
+        # Every sync rewrites the whole slate, so games it didn't list are gone
+        if changes:
+            _retain({row['matchup_id'] for row in changes})
+    return raised
+
+
+_follower = SyncFollower(
+    lambda changes, sync: detect_signals(changes, sync.synced_at),
+    backlog=HISTORY_LENGTH
+)
+
+
+@on_sync
+def follow_syncs(changes):
+    """Detect signals for the sync that just committed (and any this process missed)."""
+    return _follower.catch_up(changes)
+
+
+def get_signals(signal_type=None, book=None, stat_type=None, min_gap=0.0, since=None, limit=100):
+    """
+    Get recent steam and stale-line signals, newest first.
+
+    Args:
+        signal_type: 'steam' or 'stale' (optional, default both)
+        book: Only signals involving this book (optional)
+        stat_type: Filter by stat type (optional)
+        min_gap: Minimum |gap| (stale) or |avg_move| (steam) in %
+        since: Naive UTC datetime; only signals detected after it (optional)
+        limit: Maximum number of signals returned
+
+    Returns:
+        Dictionary with signals and metadata
+    """
+    book_lower = book.lower() if book else None
+    stat_lower = stat_type.lower() if stat_type else None
+
+    _follower.catch_up()
+    with _lock:
+        signals = list(_signals)
+        markets_tracked = len(_state)
+
+    results = []
+    for signal in reversed(signals):
+        if signal_type and signal['type'] != signal_type:
+            continue
+        if since and datetime.fromisoformat(signal['detected_at'].rstrip('Z')) <= since:
+            continue
+        if stat_lower and (signal['stat_type'] or '').lower() != stat_lower:
+            continue
+        if signal['type'] == 'stale':
+            if abs(signal['gap']) < min_gap:
+                continue
+            if book_lower and signal['book'].lower() != book_lower:
+                continue
+        else:
+            if abs(signal['avg_move']) < min_gap:
+                continue
+            if book_lower and not any(b['book'].lower() == book_lower for b in signal['books']):
+                continue
+        results.append(signal)
+        if len(results) >= limit:
+            break
+
+    return {
+        'data': results,
+        'meta': {
+            'count': len(results),
+            'markets_tracked': markets_tracked,
+            'thresholds': {
+                'move': MOVE_THRESHOLD * 100,
+                'steam_min_books': STEAM_MIN_BOOKS,
+                'stale_gap': STALE_THRESHOLD * 100,
+            },
+            'filters': {
+                'type': signal_type,
+                'book': book,
+                'stat_type': stat_type,
+                'min_gap': min_gap,
+                'since': since.isoformat() + 'Z' if since else None
+            }
+        }
+    }
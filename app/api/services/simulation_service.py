@@ -0,0 +1,326 @@
+"""
+Monte Carlo simulation of parlay slips with correlated legs.
+
+Same-game legs are not independent: a player's Points and Pts+Rebs+Asts
+usually hit together, and teammates' props move with the game script. Legs
+are modelled with a Gaussian copula: each leg gets a latent standard normal,
+the latents are correlated according to a structure keyed on player and
+matchup, and a leg hits when its latent falls below the normal quantile of
+its probability. Each leg's marginal hit rate is therefore exactly its
+input probability, and only the joint behaviour changes.
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from statistics import NormalDist
+
+from config import get_config
+
+from app.api.services.calculator_service import (
+    get_payout_table,
+    get_parlay_types,
+    calculate_slip_ev
+)
+
+# Default correlation between the latents of two legs
+DEFAULT_CORRELATIONS = {
+    'same_player': 0.5,      # Different stats for the same player
+    'same_matchup': 0.1,     # Different players in the same game
+}
+
+# Stat pairs that overlap heavily for the same player (overrides same_player)
+STAT_PAIR_CORRELATIONS = {
+    frozenset(['Points', 'Pts+Rebs+Asts']): 0.85,
+    frozenset(['Points', 'Pts+Asts']): 0.85,
+    frozenset(['Points', 'Pts+Rebs']): 0.85,
+    frozenset(['Rebounds', 'Pts+Rebs+Asts']): 0.6,
+    frozenset(['Rebounds', 'Rebs+Asts']): 0.75,
+    frozenset(['Rebounds', 'Pts+Rebs']): 0.6,
+    frozenset(['Assists', 'Pts+Rebs+Asts']): 0.5,
+    frozenset(['Assists', 'Rebs+Asts']): 0.7,
+    frozenset(['Assists', 'Pts+Asts']): 0.55,
+    frozenset(['Passing Yards', 'Passing TDs']): 0.55,
+    frozenset(['Receptions', 'Receiving Yards']): 0.75,
+    frozenset(['Hits', 'Total Bases']): 0.8,
+}
+
+# Sims per worker task; large enough to amortise process round trips
+BATCH_SIZE = 50000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Get the shared process pool, creating it on first use (sized by SIMULATION_WORKERS)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max(get_config().SIMULATION_WORKERS, 1))
+        return _executor
+
+
+def _reset_executor(broken):
+    """Drop a pool whose worker died, so the next call starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _leg_correlation(leg_a, leg_b, correlations):
+    """Correlation between two legs' latents, signed by their sides.
+
+    An Over and an Under on related stats move in opposite directions, so
+    the correlation flips sign when exactly one leg is an Under.
+    """
+    rho = 0.0
+    if leg_a.get('player_name') and leg_a.get('player_name') == leg_b.get('player_name'):
+        pair = frozenset([leg_a.get('stat_type'), leg_b.get('stat_type')])
+        rho = correlations.get('stat_pairs', {}).get(pair, correlations['same_player'])
+    elif leg_a.get('matchup') and leg_a.get('matchup') == leg_b.get('matchup'):
+        rho = correlations['same_matchup']
+
+    under_a = (leg_a.get('designation') or '').lower() == 'under'
+    under_b = (leg_b.get('designation') or '').lower() == 'under'
+    if rho and under_a != under_b:
+        return -rho
+    return rho
+
+
+def build_correlation_matrix(legs, correlations=None):
+    """Build the leg correlation matrix from the player/matchup structure.
+
+    Args:
+        legs: List of leg dicts with player_name, stat_type, designation, matchup
+        correlations: Overrides for DEFAULT_CORRELATIONS (optional)
+
+    Returns:
+        n x n correlation matrix as nested lists
+    """
+    settings = dict(DEFAULT_CORRELATIONS)
+    settings['stat_pairs'] = STAT_PAIR_CORRELATIONS
+    settings.update(correlations or {})
+
+    n = len(legs)
+    matrix = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            rho = _leg_correlation(legs[i], legs[j], settings)
+            matrix[i][j] = matrix[j][i] = rho
+    return matrix
+
+
+def _cholesky(matrix):
+    """Lower-triangular Cholesky factor, or None if the matrix is not positive definite."""
+    n = len(matrix)
+    lower = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            total = matrix[i][j] - sum(lower[i][k] * lower[j][k] for k in range(j))
+            if i == j:
+                if total <= 1e-12:
+                    return None
+                lower[i][j] = math.sqrt(total)
+            else:
+                lower[i][j] = total / lower[j][j]
+    return lower
+
+
+def _factorize(matrix):
+    """Cholesky-factor a correlation matrix, shrinking it toward identity if needed.
+
+    Hand-set correlations for three or more legs are not always jointly
+    consistent; shrinking the off-diagonals keeps their signs and ordering.
+    """
+    n = len(matrix)
+    scale = 1.0
+    while scale > 0:
+        scaled = [[matrix[i][j] * (scale if i != j else 1.0) for j in range(n)] for i in range(n)]
+        lower = _cholesky(scaled)
+        if lower is not None:
+            return lower, scale
+        scale = round(scale - 0.05, 2)
+    return _cholesky([[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]), 0.0
+
+
+def _simulate_batch(lower, thresholds, returns, n_sims, seed):
+    """Simulate one batch of slips (runs in a worker process).
+
+    Returns:
+        Tuple of (sum of returns, sum of squared returns, bust count, n_sims)
+    """
+    rng = random.Random(seed)
+    gauss = rng.gauss
+    n = len(thresholds)
+    rows = [list(enumerate(row[:i + 1])) for i, row in enumerate(lower)]
+
+    total = 0.0
+    total_sq = 0.0
+    busts = 0
+    for _ in range(n_sims):
+        draws = [gauss(0.0, 1.0) for _ in range(n)]
+        hits = 0
+        for i in range(n):
+            z = 0.0
+            for k, weight in rows[i]:
+                z += weight * draws[k]
+            if z <= thresholds[i]:
+                hits += 1
+        payout = returns[hits]
+        if payout:
+            total += payout
+            total_sq += payout * payout
+        else:
+            busts += 1
+
+    return total, total_sq, busts, n_sims
+
+
+def _run_round(lower, thresholds, returns, batch_sizes, seeds):
+    """Run one round of batches on the shared pool, replacing the pool if it broke."""
+    executor = _get_executor()
+    try:
+        futures = [
+            executor.submit(_simulate_batch, lower, thresholds, returns, size, seed)
+            for size, seed in zip(batch_sizes, seeds)
+        ]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def _interval(mean, variance, n, z=1.96):
+    """Normal-approximation confidence interval for a mean."""
+    half_width = z * math.sqrt(max(variance, 0.0) / n) if n else float('inf')
+    return half_width, [round(mean - half_width, 4), round(mean + half_width, 4)]
+
+
+def simulate_slip(legs, parlay_type, platform=None, correlations=None,
+                  max_sims=1000000, ci_target=0.01, seed=None, time_budget_ms=None):
+    """
+    Simulate a slip with correlated legs and report EV, variance and bust probability.
+
+    Batches are farmed out to a process pool round by round. After each round
+    the 95% confidence interval of the expected return is checked, and the
+    run stops early once its half-width is within ci_target, or once the
+    time budget is spent (the result then reports what was simulated).
+
+    Args:
+        legs: List of leg dicts with 'prob' plus player_name, stat_type, designation, matchup
+        parlay_type: A registered parlay type (e.g., '5-pick-flex')
+        platform: Platform whose payout table to use (optional)
+        correlations: Overrides for same_player / same_matchup correlations (optional)
+        max_sims: Upper limit on simulated slips (capped at SIMULATION_MAX_SIMS)
+        ci_target: Stop once the 95% CI half-width of expected return is below this
+        seed: Base random seed for reproducible runs (optional)
+        time_budget_ms: Wall-clock budget (default and cap SIMULATION_TIME_BUDGET_MS)
+
+    Returns:
+        Dictionary with simulated and independent-legs results
+    """
+    table = get_payout_table(parlay_type, platform)
+    if table is None:
+        return {
+            'error': f'Invalid parlay type: {parlay_type}',
+            'valid_types': get_parlay_types(platform)
+        }
+
+    if len(legs) != table['total_picks']:
+        return {'error': f"{parlay_type} needs {table['total_picks']} legs, got {len(legs)}"}
+
+    probs = [leg.get('prob') for leg in legs]
+    if any(p is None or p <= 0 or p >= 1 for p in probs):
+        return {'error': 'Every leg needs a probability between 0 and 1'}
+
+    returns = [0.0] * (table['total_picks'] + 1)
+    for hits, multiplier in table['structure_key'][1]:
+        returns[hits] = multiplier
+
+    matrix = build_correlation_matrix(legs, correlations)
+    lower, shrink = _factorize(matrix)
+    normal = NormalDist()
+    thresholds = [normal.inv_cdf(p) for p in probs]
+
+    config = get_config()
+    max_sims = min(max_sims, config.SIMULATION_MAX_SIMS)
+    budget_ms = min(time_budget_ms or config.SIMULATION_TIME_BUDGET_MS, config.SIMULATION_TIME_BUDGET_MS)
+    deadline = time.monotonic() + budget_ms / 1000
+    workers = max(config.SIMULATION_WORKERS, 1)
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+
+    total = total_sq = 0.0
+    busts = sims = 0
+    rounds = 0
+    half_width = float('inf')
+    out_of_time = False
+
+    while sims < max_sims:
+        remaining = max_sims - sims
+        batch_sizes = []
+        for _ in range(workers):
+            size = min(BATCH_SIZE, remaining)
+            if size <= 0:
+                break
+            batch_sizes.append(size)
+            remaining -= size
+
+        seeds = [base_seed + rounds * workers + i for i in range(len(batch_sizes))]
+        try:
+            results = _run_round(lower, thresholds, returns, batch_sizes, seeds)
+        except BrokenProcessPool:
+            # A worker died; the pool was replaced, so retry the round once
+            results = _run_round(lower, thresholds, returns, batch_sizes, seeds)
+        for batch_total, batch_sq, batch_busts, batch_sims in results:
+            total += batch_total
+            total_sq += batch_sq
+            busts += batch_busts
+            sims += batch_sims
+        rounds += 1
+
+        mean = total / sims
+        variance = total_sq / sims - mean * mean
+        half_width, _ = _interval(mean, variance, sims)
+        if half_width <= ci_target:
+            break
+        if time.monotonic() >= deadline:
+            out_of_time = True
+            break
+
+    mean = total / sims
+    variance = total_sq / sims - mean * mean
+    half_width, ev_ci = _interval(mean, variance, sims)
+    bust_prob = busts / sims
+    bust_half_width, bust_ci = _interval(bust_prob, bust_prob * (1 - bust_prob), sims)
+
+    independent = calculate_slip_ev(probs, parlay_type, platform)
+
+    return {
+        'parlay_type': parlay_type,
+        'platform': table['platform'],
+        'simulations': sims,
+        'rounds': rounds,
+        'converged': half_width <= ci_target,
+        'time_budget_exhausted': out_of_time,
+        'expected_return': round(mean, 4),
+        'expected_return_ci95': ev_ci,
+        'roi': round(mean - 1, 4),
+        'roi_percent': round((mean - 1) * 100, 2),
+        'variance': round(variance, 4),
+        'std_dev': round(math.sqrt(max(variance, 0.0)), 4),
+        'bust_prob': round(bust_prob, 4),
+        'bust_prob_ci95': bust_ci,
+        'correlation_matrix': [[round(rho, 3) for rho in row] for row in matrix],
+        'correlation_shrinkage': round(1 - shrink, 2),
+        'independent': {
+            'expected_return': independent['expected_return'],
+            'roi': independent['roi'],
+            'variance': independent['variance'],
+            'bust_prob': independent['bust_prob'],
+        },
+    }
@@ -3,10 +3,34 @@ import os
 from datetime import datetime
 from pathlib import Path
 from app.data_sources.theoddsapi import fetch as fetch_theoddsapi
+from app.data_sources.sync_log import record_sync, version_of
 
 # Path to store last sync timestamp
 LAST_SYNC_FILE = Path(__file__).parent / 'last_sync.txt'
 
+# Callbacks run after every successful sync (e.g., to rebuild derived views)
+_sync_listeners = []
+
+
+def on_sync(listener):
+    """Register a callback to run after each successful sync.
+
+    Can be used as a decorator. Listeners are called in registration order
+    with the sync's change set: a list of dicts, one per line written (see
+    theoddsapi.change_row). A failing listener is reported and skipped.
+    """
+    _sync_listeners.append(listener)
+    return listener
+
+
+def _notify_sync_listeners(changes):
+    """Run every registered post-sync callback with the sync's change set."""
+    for listener in _sync_listeners:
+        try:
+            listener(changes)
+        except Exception as e:
+            print(f"Warning: post-sync hook {listener.__name__} failed: {e}")
+
 
 def get_last_sync():
     """Get the last sync timestamp as ISO string, or None if never synced."""
@@ -18,10 +42,37 @@ def get_last_sync():
     return None
 
 
-def _save_sync_timestamp():
-    """Save current timestamp to file."""
+_version_cache = {'mtime': None, 'version': 0}
+
+
+def get_data_version():
+    """Get the current data version: the last sync time in epoch milliseconds.
+
+    Monotonic across syncs and shared by every process reading the same
+    sync file. Returns 0 if there has never been a sync. The file is only
+    re-read when its modification time changes.
+    """
+    try:
+        mtime = LAST_SYNC_FILE.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+    if mtime != _version_cache['mtime']:
+        last_sync = get_last_sync()
+        try:
+            version = version_of(datetime.fromisoformat(last_sync.rstrip('Z')))
+        except (AttributeError, ValueError):
+            version = 0
+        _version_cache['mtime'] = mtime
+        _version_cache['version'] = version
+
+    return _version_cache['version']
+
+
+def _save_sync_timestamp(moment=None):
+    """Save the sync timestamp (default now) to file."""
     try:
-        timestamp = datetime.utcnow().isoformat() + 'Z'
+        timestamp = (moment or datetime.utcnow()).isoformat() + 'Z'
         LAST_SYNC_FILE.write_text(timestamp)
     except Exception as e:
         print(f"Warning: Could not save sync timestamp: {e}")
@@ -31,11 +82,20 @@ def sync_all_data():
     """Fetch data from all configured API sources."""
     print("Fetching data from The Odds API...")
     try:
-        fetch_theoddsapi()
+        changes = fetch_theoddsapi()
+        if changes is None:
+            return
         print("The Odds API fetch completed.")
-        _save_sync_timestamp()
+        synced_at = datetime.utcnow()
+        # Logged before the version moves, so other processes find the sync once they see it
+        try:
+            record_sync(changes, synced_at)
+        except Exception as e:
+            print(f"Warning: Could not record sync: {e}")
+        _save_sync_timestamp(synced_at)
+        _notify_sync_listeners(changes)
     except Exception as e:
         print(f"The Odds API fetch failed: {e}")
 
 
-__all__ = ['sync_all_data', 'fetch_theoddsapi', 'get_last_sync']
+__all__ = ['sync_all_data', 'fetch_theoddsapi', 'get_last_sync', 'get_data_version', 'on_sync']
@@ -0,0 +1,161 @@
+"""
+Persisted log of committed syncs.
+
+Every sync records its data version and the range of statline ids it wrote
+before the new version becomes visible. Statlines are append-only, so any
+process - not only the one that ran the sync - can rebuild a sync's change
+set from that range. Services that keep per-sync state (the change feed,
+signal detection) follow this log instead of relying on their on_sync hook
+having run in their own process.
+"""
+import threading
+from datetime import datetime
+from app.db import get_session
+from app.models import Books, Matchups, Props, Statlines, Syncs
+from app.data_sources.theoddsapi import change_row
+
+
+def version_of(moment):
+    """Data version (epoch milliseconds) of a sync time."""
+    return int((moment - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def record_sync(changes, synced_at):
+    """Record a committed sync and the statline ids it wrote."""
+    line_ids = [row['line_id'] for row in changes]
+
+    Session = get_session()
+    session = Session()
+
+    try:
+        session.merge(Syncs(
+            version=version_of(synced_at),
+            synced_at=synced_at,
+            first_line_id=min(line_ids) if line_ids else None,
+            last_line_id=max(line_ids) if line_ids else None,
+        ))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def syncs_after(version=None, limit=None):
+    """Recorded syncs newer than `version`, oldest first.
+
+    Args:
+        version: Data version already seen (None for all)
+        limit: Only the most recent `limit` syncs (optional)
+
+    Returns:
+        List of rows with version, synced_at, first_line_id and last_line_id
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = session.query(Syncs.version, Syncs.synced_at, Syncs.first_line_id, Syncs.last_line_id)
+        if version is not None:
+            query = query.filter(Syncs.version > version)
+        if limit:
+            return list(reversed(query.order_by(Syncs.version.desc()).limit(limit).all()))
+        return query.order_by(Syncs.version).all()
+
+    finally:
+        session.close()
+
+
+def sync_starts():
+    """First statline id of every recorded sync, ascending.
+
+    bisect_right(starts, line_id) numbers the sync a line was written by;
+    lines from before the log all share sync 0.
+    """
+    Session = get_session()
+    session = Session()
+
+    try:
+        return [
+            first_line_id for (first_line_id,) in
+            session.query(Syncs.first_line_id)
+            .filter(Syncs.first_line_id.isnot(None))
+            .order_by(Syncs.first_line_id)
+        ]
+
+    finally:
+        session.close()
+
+
+def load_changes(sync):
+    """Rebuild a recorded sync's change set (see theoddsapi.change_row)."""
+    if sync.first_line_id is None:
+        return []
+
+    Session = get_session()
+    session = Session()
+
+    try:
+        query = (
+            session.query(Statlines, Books, Matchups, Props)
+            .join(Books, Statlines.book_id == Books.book_id)
+            .join(Matchups, Statlines.matchup_id == Matchups.matchup_id)
+            .join(Props, Statlines.prop_id == Props.prop_id)
+            .filter(Statlines.line_id.between(sync.first_line_id, sync.last_line_id))
+            .order_by(Statlines.line_id)
+        )
+        return [change_row(*entry) for entry in query.yield_per(1000)]
+
+    finally:
+        session.close()
+
+
+class SyncFollower:
+    """Hands every recorded sync's change set to a consumer once, in order.
+
+    Works the same in every process: the syncing process catches up from its
+    on_sync hook (reusing the change set it was given), and any other
+    process catches up whenever it sees the data version move. A process
+    that starts following replays the last `backlog` syncs first.
+    """
+
+    def __init__(self, apply, backlog):
+        self.apply = apply          # apply(changes, sync)
+        self.backlog = backlog
+        self.version = None         # last sync applied
+        self.checked = None         # data version the log was last read at
+        self.lock = threading.Lock()
+
+    def catch_up(self, changes=None):
+        """Apply every sync recorded since the last one applied.
+
+        Cheap when nothing moved: only the data version is compared.
+
+        Args:
+            changes: The current sync's change set, if the caller has it
+
+        Returns:
+            Number of syncs applied
+        """
+        from app.data_sources import get_data_version
+
+        current = get_data_version()
+        if current == self.checked:
+            return 0
+
+        with self.lock:
+            if current == self.checked:
+                return 0
+            limit = self.backlog if self.version is None else None
+            applied = 0
+            for sync in syncs_after(self.version, limit):
+                if changes is not None and sync.version == current:
+                    rows = changes
+                else:
+                    rows = load_changes(sync)
+                self.apply(rows, sync)
+                self.version = sync.version
+                applied += 1
+            self.checked = current
+            return applied
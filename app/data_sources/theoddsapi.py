@@ -5,12 +5,12 @@ Fetches real-time odds from 50+ sportsbooks via The Odds API.
 Supports NFL, NBA, MLB, NHL with both game lines and player props.
 """
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 from config import get_config
 from app.db import get_session
-from app.models import Books, Statlines, Matchups, Props
-from app.utils import normalize_stat_type
+from app.models import Books, Statlines, Matchups, Props, Teams
+from app.utils import normalize_stat_type, TEAM_ALIASES, canonical_team_name, sport_for_team
 
 # Configuration
 config = get_config()
@@ -116,19 +116,74 @@ def get_or_create_book(session, book_name, book_type, timestamp):
     return book
 
 
-def get_or_create_matchup(session, home_team, away_team, timestamp):
-    """Get existing matchup or create new one."""
-    matchup = session.query(Matchups).filter_by(
-        home_team=home_team,
-        away_team=away_team
-    ).first()
+def get_or_create_team(session, team_name, sport=None):
+    """Get existing team or create new one, matching the feed's name by alias."""
+    if not team_name:
+        return None
+    name = canonical_team_name(team_name)
+    sport = sport or sport_for_team(name)
+    team = session.query(Teams).filter_by(sport=sport, team_name=name).first()
+    if not team:
+        team = Teams(sport=sport, team_name=name, aliases=TEAM_ALIASES.get(name, []))
+        session.add(team)
+        session.flush()
+    return team
+
+
+def parse_commence_time(value):
+    """Parse an Odds API commence_time ('2025-01-05T18:00:00Z') as naive UTC."""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def get_or_create_matchup(session, home_team, away_team, timestamp, sport=None,
+                          event_id=None, commence_time=None):
+    """Get existing matchup or create new one.
+
+    Matchups are keyed on the Odds API event id, so each game of a series
+    gets its own row. A matchup stored before event ids were recorded is
+    adopted by the first event between the same teams.
+    """
+    if event_id is None:
+        matchup = session.query(Matchups).filter_by(
+            home_team=home_team,
+            away_team=away_team
+        ).first()
+    else:
+        matchup = session.query(Matchups).filter_by(event_id=event_id).first()
+        if not matchup:
+            matchup = session.query(Matchups).filter_by(
+                home_team=home_team,
+                away_team=away_team,
+                event_id=None
+            ).first()
+
     if not matchup:
         matchup = Matchups(
             home_team=home_team,
             away_team=away_team,
         )
         session.add(matchup)
-        session.flush()
+
+    if matchup.home_team_id is None or matchup.away_team_id is None:
+        home = get_or_create_team(session, home_team, sport or matchup.sport)
+        away = get_or_create_team(session, away_team, sport or matchup.sport)
+        matchup.home_team_id = home.team_id if home else None
+        matchup.away_team_id = away.team_id if away else None
+
+    # Games get rescheduled; keep the latest start time
+    if event_id is not None:
+        matchup.event_id = event_id
+        matchup.sport = sport or matchup.sport
+        matchup.commence_time = commence_time or matchup.commence_time
+    session.flush()
     return matchup
 
 
@@ -152,7 +207,7 @@ def get_or_create_prop(session, category, units, description):
 
 
 def add_statline(session, book_id, player_name, matchup_id, prop_id, price, designation, points, line_type, timestamp):
-    """Add a statline to the database."""
+    """Add a statline to the database and return it."""
     statline = Statlines(
         book_id=book_id,
         player_name=player_name,
@@ -164,17 +219,49 @@ def add_statline(session, book_id, player_name, matchup_id, prop_id, price, desi
         line_type=line_type,
     )
     session.add(statline)
+    return statline
+
 
+def change_row(statline, book, matchup, prop):
+    """Flatten a written statline into a plain dict for post-sync consumers.
 
-def process_game_odds(session, odds_data, sport_name, market_type, timestamp, books_cache):
-    """Process game odds (h2h, spreads, totals) and store in database."""
+    Must be called after a flush (so line_id is set) and before commit
+    (which expires the ORM objects).
+    """
+    return {
+        'line_id': statline.line_id,
+        'book_id': book.book_id,
+        'book_name': book.book_name,
+        'book_type': book.book_type,
+        'matchup_id': matchup.matchup_id,
+        'home_team': matchup.home_team,
+        'away_team': matchup.away_team,
+        'prop_id': prop.prop_id,
+        'units': prop.units,
+        'player_name': statline.player_name,
+        'designation': statline.designation,
+        'line_type': statline.line_type,
+        'points': float(statline.points) if statline.points is not None else None,
+        'price': float(statline.price) if statline.price is not None else None,
+    }
+
+
+def process_game_odds(session, odds_data, sport_name, market_type, timestamp, books_cache, written=None):
+    """Process game odds (h2h, spreads, totals) and store in database.
+
+    Each written statline is appended to `written` (if given) together with
+    its book, matchup and prop.
+    """
     count = 0
 
     for game in odds_data:
         home_team = game.get('home_team', 'Unknown')
         away_team = game.get('away_team', 'Unknown')
 
-        matchup = get_or_create_matchup(session, home_team, away_team, timestamp)
+        matchup = get_or_create_matchup(
+            session, home_team, away_team, timestamp, sport=sport_name,
+            event_id=game.get('id'), commence_time=parse_commence_time(game.get('commence_time'))
+        )
 
         # Determine category and stat type based on market
         category = "Game Lines"
@@ -210,7 +297,7 @@ def process_game_odds(session, odds_data, sport_name, market_type, timestamp, bo
                         designation = None
                         player_name = team_name
 
-                    add_statline(
+                    statline = add_statline(
                         session=session,
                         book_id=book.book_id,
                         player_name=player_name,
@@ -222,13 +309,19 @@ def process_game_odds(session, odds_data, sport_name, market_type, timestamp, bo
                         line_type=market_key,
                         timestamp=timestamp
                     )
+                    if written is not None:
+                        written.append((statline, book, matchup, prop))
                     count += 1
 
     return count
 
 
-def process_player_props(session, event_odds, sport_name, matchup, timestamp, books_cache):
-    """Process player prop odds and store in database."""
+def process_player_props(session, event_odds, sport_name, matchup, timestamp, books_cache, written=None):
+    """Process player prop odds and store in database.
+
+    Each written statline is appended to `written` (if given) together with
+    its book, matchup and prop.
+    """
     count = 0
 
     for bookmaker in event_odds.get('bookmakers', []):
@@ -258,7 +351,7 @@ def process_player_props(session, event_odds, sport_name, matchup, timestamp, bo
                 point = outcome.get('point')
                 designation = outcome.get('name', '').capitalize()  # Over/Under
 
-                add_statline(
+                statline = add_statline(
                     session=session,
                     book_id=book.book_id,
                     player_name=player_name,
@@ -270,6 +363,8 @@ def process_player_props(session, event_odds, sport_name, matchup, timestamp, bo
                     line_type=market_key,
                     timestamp=timestamp
                 )
+                if written is not None:
+                    written.append((statline, book, matchup, prop))
                 count += 1
 
     return count
@@ -280,10 +375,14 @@ def fetch():
     Fetch odds from The Odds API and store in database.
 
     This is the main entry point for the data fetcher.
+
+    Returns:
+        List of change rows (see change_row) for every line written, or
+        None if nothing was fetched
     """
     if not API_KEY:
         print("ERROR: ODDS_API_KEY not configured. Please set it in .env file.")
-        return
+        return None
 
     print("\n" + "=" * 50)
     print("FETCHING DATA FROM THE ODDS API")
@@ -295,6 +394,7 @@ def fetch():
 
     total_lines = 0
     books_cache = {}  # Cache books to avoid repeated queries
+    written = []  # (statline, book, matchup, prop) for every line added
 
     with Session() as session:
         try:
@@ -308,7 +408,8 @@ def fetch():
                     try:
                         odds_data = client.get_odds(sport_key, markets=market)
                         count = process_game_odds(
-                            session, odds_data, sport_name, market, timestamp, books_cache
+                            session, odds_data, sport_name, market, timestamp, books_cache,
+                            written
                         )
                         total_lines += count
                         print(f"    Added {count} lines")
@@ -333,7 +434,9 @@ def fetch():
                             away_team = event.get('away_team', 'Unknown')
 
                             matchup = get_or_create_matchup(
-                                session, home_team, away_team, timestamp
+                                session, home_team, away_team, timestamp, sport=sport_name,
+                                event_id=event_id,
+                                commence_time=parse_commence_time(event.get('commence_time'))
                             )
 
                             try:
@@ -342,7 +445,7 @@ def fetch():
                                 )
                                 count = process_player_props(
                                     session, event_odds, sport_name,
-                                    matchup, timestamp, books_cache
+                                    matchup, timestamp, books_cache, written
                                 )
                                 total_lines += count
                                 print(f"    {home_team} vs {away_team}: {count} prop lines")
@@ -357,10 +460,15 @@ def fetch():
                     except Exception as e:
                         print(f"    Error fetching events: {e}")
 
+            # Assign line ids, then capture the change set before commit expires the objects
+            session.flush()
+            changes = [change_row(*entry) for entry in written]
+
             session.commit()
             print(f"\n{'=' * 50}")
             print(f"FETCH COMPLETE: {total_lines} total lines from {len(books_cache)} sportsbooks")
             print(f"{'=' * 50}")
+            return changes
 
         except Exception as e:
             print(f"Database error: {e}")
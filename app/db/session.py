@@ -32,6 +32,10 @@ def get_engine():
                 cursor.execute("PRAGMA foreign_keys=ON")
                 cursor.close()
 
+        # Add any columns this database predates before the first query
+        from app.db.setup import upgrade_schema
+        upgrade_schema(_engine)
+
     return _engine
 
 
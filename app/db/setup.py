@@ -1,5 +1,8 @@
-from app.models import Base
+from datetime import datetime
+from sqlalchemy import bindparam, column, func, inspect, select, text
+from app.models import Base, Matchups, Statlines, Syncs, Teams
 from app.db.session import get_engine
+from app.utils import TEAM_TO_SPORT, TEAM_ALIASES, canonical_team_name, sport_for_team
 from config import get_config
 
 
@@ -18,3 +21,134 @@ def setup_database():
     Base.metadata.create_all(engine)
     print("Database setup complete.")
 
+
+def upgrade_schema(engine):
+    """Add tables, columns (and their indexes) that an existing database predates.
+
+    create_all only creates missing tables, so nullable columns added to a
+    model later are added here with ALTER TABLE. Matchups stored before
+    sport was recorded get it from their team names, matchups stored
+    before the teams table get their team ids, and statlines stored before
+    the sync log get their syncs back from their scrape timestamps.
+
+    Returns:
+        List of 'table.column' names added
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(Matchups.__tablename__):
+        return []
+
+    created = [table for table in Base.metadata.sorted_tables if not inspector.has_table(table.name)]
+    Base.metadata.create_all(engine, tables=created)
+    added = []
+
+    for table in Base.metadata.sorted_tables:
+        if table in created:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        if not missing:
+            continue
+
+        with engine.begin() as connection:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+        added.extend(f'{table.name}.{column.name}' for column in missing)
+
+    if 'matchups.sport' in added:
+        _backfill_matchup_sports(engine)
+    if 'matchups.home_team_id' in added:
+        _backfill_matchup_teams(engine)
+    _backfill_syncs(engine, inspector)
+
+    return added
+
+
+def _backfill_matchup_sports(engine):
+    table = Matchups.__table__
+    with engine.begin() as connection:
+        for team, sport in TEAM_TO_SPORT.items():
+            connection.execute(
+                table.update()
+                .where(table.c.sport.is_(None))
+                .where((table.c.home_team == team) | (table.c.away_team == team))
+                .values(sport=sport)
+            )
+
+
+
+def _backfill_matchup_teams(engine):
+    matchups = Matchups.__table__
+    teams = Teams.__table__
+    with engine.begin() as connection:
+        games = connection.execute(
+            select(matchups.c.matchup_id, matchups.c.home_team, matchups.c.away_team, matchups.c.sport)
+        ).all()
+
+        team_ids = {}
+
+        def team_id(name, sport):
+            if not name:
+                return None
+            name = canonical_team_name(name)
+            key = (sport or sport_for_team(name), name)
+            if key not in team_ids:
+                team_ids[key] = connection.execute(
+                    teams.insert().values(sport=key[0], team_name=name, aliases=TEAM_ALIASES.get(name, []))
+                ).inserted_primary_key[0]
+            return team_ids[key]
+
+        updates = [
+            {
+                'id': matchup_id,
+                'home_id': team_id(home, sport),
+                'away_id': team_id(away, sport),
+            }
+            for matchup_id, home, away, sport in games
+        ]
+        if updates:
+            connection.execute(
+                matchups.update()
+                .where(matchups.c.matchup_id == bindparam('id'))
+                .values(home_team_id=bindparam('home_id'), away_team_id=bindparam('away_id')),
+                updates
+            )
+
+
+def _backfill_syncs(engine, inspector):
+    # Older databases stamped every statline with its sync's scrape_timestamp
+    existing = {column['name'] for column in inspector.get_columns(Statlines.__tablename__)}
+    if 'scrape_timestamp' not in existing:
+        return
+
+    from app.data_sources.sync_log import version_of
+
+    statlines = Statlines.__table__
+    syncs_table = Syncs.__table__
+    scraped = column('scrape_timestamp')
+    with engine.begin() as connection:
+        if connection.execute(select(syncs_table.c.version).limit(1)).first() is not None:
+            return
+
+        batches = connection.execute(
+            select(scraped, func.min(statlines.c.line_id), func.max(statlines.c.line_id))
+            .select_from(statlines)
+            .where(scraped.isnot(None))
+            .group_by(scraped)
+        ).all()
+
+        syncs = {}
+        for synced_at, first_line_id, last_line_id in batches:
+            if isinstance(synced_at, str):
+                synced_at = datetime.fromisoformat(synced_at)
+            syncs[version_of(synced_at)] = {
+                'version': version_of(synced_at),
+                'synced_at': synced_at,
+                'first_line_id': first_line_id,
+                'last_line_id': last_line_id,
+            }
+        if syncs:
+            connection.execute(syncs_table.insert(), list(syncs.values()))
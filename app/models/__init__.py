@@ -1,8 +1,12 @@
 """SQLAlchemy models for BetterBets database."""
 from app.models.base import Base
 from app.models.books import Books
+from app.models.teams import Teams
 from app.models.matchups import Matchups
 from app.models.props import Props
 from app.models.statlines import Statlines
+from app.models.outcomes import Outcomes
+from app.models.line_history import LineHistory
+from app.models.syncs import Syncs
 
-__all__ = ['Base', 'Books', 'Matchups', 'Props', 'Statlines']
+__all__ = ['Base', 'Books', 'Teams', 'Matchups', 'Props', 'Statlines', 'Outcomes', 'LineHistory', 'Syncs']
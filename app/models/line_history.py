@@ -0,0 +1,19 @@
+from app.models.base import Base
+from sqlalchemy import Column, Integer, ForeignKey
+
+class LineHistory(Base):
+    """Delta-encoded price/points movement for an outcome.
+
+    Keyed by (outcome_id, seq) so one outcome's full history is a single
+    primary-key range scan. The first record (seq 0) holds absolute values:
+    epoch seconds, price and points in tenths. Later records hold the change
+    since the previous record. A NULL price or points means the outcome had
+    none (moneylines have no points); a value following a NULL is absolute.
+    """
+    __tablename__ = 'line_history'
+
+    outcome_id = Column(Integer, ForeignKey("outcomes.outcome_id"), primary_key=True)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    dt = Column(Integer)
+    d_price = Column(Integer)
+    d_points = Column(Integer)
@@ -1,13 +1,32 @@
 from app.models.base import Base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class Matchups(Base):
     __tablename__ = 'matchups'
 
     matchup_id = Column(Integer, primary_key=True, index=True)
+    home_team_id = Column(Integer, ForeignKey("teams.team_id"))
+    away_team_id = Column(Integer, ForeignKey("teams.team_id"))
+    # Display names, kept alongside the ids for labels
     home_team = Column(String(255))
     away_team = Column(String(255))
 
+    # Set at ingest from the Odds API event (league name, e.g. 'NBA'; start in UTC)
+    sport = Column(String(32))
+    event_id = Column(String(64))
+    commence_time = Column(DateTime)
+
     statlines = relationship("Statlines", back_populates="matchup")
+    home = relationship("Teams", foreign_keys=[home_team_id])
+    away = relationship("Teams", foreign_keys=[away_team_id])
 
+    __table_args__ = (
+        # One matchup per Odds API event, so games of a series stay apart
+        Index('ix_matchups_event_id', 'event_id', unique=True),
+        # Sport / upcoming-only filters
+        Index('ix_matchups_sport_commence', 'sport', 'commence_time'),
+        # Team filters
+        Index('ix_matchups_home_team_id', 'home_team_id'),
+        Index('ix_matchups_away_team_id', 'away_team_id'),
+    )
@@ -0,0 +1,24 @@
+from app.models.base import Base
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey, Index
+
+class Outcomes(Base):
+    """One priced outcome (book + game + prop + player + side), tracked across syncs."""
+    __tablename__ = 'outcomes'
+
+    outcome_id = Column(Integer, primary_key=True, index=True)
+    book_id = Column(Integer, ForeignKey("books.book_id"))
+    matchup_id = Column(Integer, ForeignKey("matchups.matchup_id"))
+    prop_id = Column(Integer, ForeignKey("props.prop_id"))
+    player_name = Column(String(255))
+    designation = Column(String(255))
+    line_type = Column(String(255))
+
+    # Latest recorded state, so new syncs can be diffed without reading history
+    last_price = Column(DECIMAL)
+    last_points = Column(DECIMAL(precision=10, scale=1))
+    last_recorded_at = Column(DateTime)
+    record_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('ix_outcomes_identity', 'matchup_id', 'book_id', 'prop_id', 'player_name', 'designation', 'line_type', unique=True),
+    )
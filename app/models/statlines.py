@@ -1,5 +1,5 @@
 from app.models.base import Base
-from sqlalchemy import Column, Integer, String, DECIMAL, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class Statlines(Base):
@@ -19,3 +19,8 @@ class Statlines(Base):
     book = relationship("Books", back_populates ="statlines")
     matchup = relationship("Matchups", back_populates="statlines")
 
+    __table_args__ = (
+        # Keyset pagination of a book's lines by player
+        Index('ix_statlines_book_player', 'book_id', 'player_name', 'line_id'),
+    )
+
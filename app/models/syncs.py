@@ -0,0 +1,15 @@
+from app.models.base import Base
+from sqlalchemy import Column, Integer, BigInteger, DateTime
+
+class Syncs(Base):
+    """One committed sync: its data version and the statline ids it wrote.
+
+    Syncs only append statlines, so a sync's change set is exactly the lines
+    from first_line_id to last_line_id, and any process can rebuild it.
+    """
+    __tablename__ = 'syncs'
+
+    version = Column(BigInteger, primary_key=True, autoincrement=False)
+    synced_at = Column(DateTime)
+    first_line_id = Column(Integer)
+    last_line_id = Column(Integer)
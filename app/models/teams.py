@@ -0,0 +1,15 @@
+from app.models.base import Base
+from sqlalchemy import Column, Integer, String, JSON, UniqueConstraint
+
+class Teams(Base):
+    __tablename__ = 'teams'
+
+    team_id = Column(Integer, primary_key=True, index=True)
+    sport = Column(String(32))
+    team_name = Column(String(255))
+    # Other names the feeds use for the team (list of strings)
+    aliases = Column(JSON)
+
+    __table_args__ = (
+        UniqueConstraint('sport', 'team_name', name='uq_teams_sport_name'),
+    )
@@ -1,4 +1,5 @@
 """Utility functions for BetterBets."""
 from app.utils.stat_mapping import normalize_stat_type
+from app.utils.teams import TEAM_TO_SPORT, TEAM_ALIASES, canonical_team_name, sport_for_team
 
-__all__ = ['normalize_stat_type']
+__all__ = ['normalize_stat_type', 'TEAM_TO_SPORT', 'TEAM_ALIASES', 'canonical_team_name', 'sport_for_team']
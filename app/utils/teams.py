@@ -0,0 +1,73 @@
+"""Team name to league lookup and alternate team names."""
+
+# League of each team, for matchups stored before sport was recorded at ingest
+TEAM_TO_SPORT = {
+    # NFL Teams
+    'Arizona Cardinals': 'NFL', 'Atlanta Falcons': 'NFL', 'Baltimore Ravens': 'NFL',
+    'Buffalo Bills': 'NFL', 'Carolina Panthers': 'NFL', 'Chicago Bears': 'NFL',
+    'Cincinnati Bengals': 'NFL', 'Cleveland Browns': 'NFL', 'Dallas Cowboys': 'NFL',
+    'Denver Broncos': 'NFL', 'Detroit Lions': 'NFL', 'Green Bay Packers': 'NFL',
+    'Houston Texans': 'NFL', 'Indianapolis Colts': 'NFL', 'Jacksonville Jaguars': 'NFL',
+    'Kansas City Chiefs': 'NFL', 'Las Vegas Raiders': 'NFL', 'Los Angeles Chargers': 'NFL',
+    'Los Angeles Rams': 'NFL', 'Miami Dolphins': 'NFL', 'Minnesota Vikings': 'NFL',
+    'New England Patriots': 'NFL', 'New Orleans Saints': 'NFL', 'New York Giants': 'NFL',
+    'New York Jets': 'NFL', 'Philadelphia Eagles': 'NFL', 'Pittsburgh Steelers': 'NFL',
+    'San Francisco 49ers': 'NFL', 'Seattle Seahawks': 'NFL', 'Tampa Bay Buccaneers': 'NFL',
+    'Tennessee Titans': 'NFL', 'Washington Commanders': 'NFL',
+    # NBA Teams
+    'Atlanta Hawks': 'NBA', 'Boston Celtics': 'NBA', 'Brooklyn Nets': 'NBA',
+    'Charlotte Hornets': 'NBA', 'Chicago Bulls': 'NBA', 'Cleveland Cavaliers': 'NBA',
+    'Dallas Mavericks': 'NBA', 'Denver Nuggets': 'NBA', 'Detroit Pistons': 'NBA',
+    'Golden State Warriors': 'NBA', 'Houston Rockets': 'NBA', 'Indiana Pacers': 'NBA',
+    'Los Angeles Clippers': 'NBA', 'Los Angeles Lakers': 'NBA', 'Memphis Grizzlies': 'NBA',
+    'Miami Heat': 'NBA', 'Milwaukee Bucks': 'NBA', 'Minnesota Timberwolves': 'NBA',
+    'New Orleans Pelicans': 'NBA', 'New York Knicks': 'NBA', 'Oklahoma City Thunder': 'NBA',
+    'Orlando Magic': 'NBA', 'Philadelphia 76ers': 'NBA', 'Phoenix Suns': 'NBA',
+    'Portland Trail Blazers': 'NBA', 'Sacramento Kings': 'NBA', 'San Antonio Spurs': 'NBA',
+    'Toronto Raptors': 'NBA', 'Utah Jazz': 'NBA', 'Washington Wizards': 'NBA',
+    # NHL Teams
+    'Anaheim Ducks': 'NHL', 'Arizona Coyotes': 'NHL', 'Boston Bruins': 'NHL',
+    'Buffalo Sabres': 'NHL', 'Calgary Flames': 'NHL', 'Carolina Hurricanes': 'NHL',
+    'Chicago Blackhawks': 'NHL', 'Colorado Avalanche': 'NHL', 'Columbus Blue Jackets': 'NHL',
+    'Dallas Stars': 'NHL', 'Detroit Red Wings': 'NHL', 'Edmonton Oilers': 'NHL',
+    'Florida Panthers': 'NHL', 'Los Angeles Kings': 'NHL', 'Minnesota Wild': 'NHL',
+    'Montréal Canadiens': 'NHL', 'Nashville Predators': 'NHL', 'New Jersey Devils': 'NHL',
+    'New York Islanders': 'NHL', 'New York Rangers': 'NHL', 'Ottawa Senators': 'NHL',
+    'Philadelphia Flyers': 'NHL', 'Pittsburgh Penguins': 'NHL', 'San Jose Sharks': 'NHL',
+    'Seattle Kraken': 'NHL', 'St. Louis Blues': 'NHL', 'Tampa Bay Lightning': 'NHL',
+    'Toronto Maple Leafs': 'NHL', 'Vancouver Canucks': 'NHL', 'Vegas Golden Knights': 'NHL',
+    'Washington Capitals': 'NHL', 'Winnipeg Jets': 'NHL', 'Utah Mammoth': 'NHL',
+    # MLB Teams
+    'Arizona Diamondbacks': 'MLB', 'Atlanta Braves': 'MLB', 'Baltimore Orioles': 'MLB',
+    'Boston Red Sox': 'MLB', 'Chicago Cubs': 'MLB', 'Chicago White Sox': 'MLB',
+    'Cincinnati Reds': 'MLB', 'Cleveland Guardians': 'MLB', 'Colorado Rockies': 'MLB',
+    'Detroit Tigers': 'MLB', 'Houston Astros': 'MLB', 'Kansas City Royals': 'MLB',
+    'Los Angeles Angels': 'MLB', 'Los Angeles Dodgers': 'MLB', 'Miami Marlins': 'MLB',
+    'Milwaukee Brewers': 'MLB', 'Minnesota Twins': 'MLB', 'New York Mets': 'MLB',
+    'New York Yankees': 'MLB', 'Oakland Athletics': 'MLB', 'Philadelphia Phillies': 'MLB',
+    'Pittsburgh Pirates': 'MLB', 'San Diego Padres': 'MLB', 'San Francisco Giants': 'MLB',
+    'Seattle Mariners': 'MLB', 'St. Louis Cardinals': 'MLB', 'Tampa Bay Rays': 'MLB',
+    'Texas Rangers': 'MLB', 'Toronto Blue Jays': 'MLB', 'Washington Nationals': 'MLB',
+}
+
+# Other names the feeds have used for a team, by the name we store it under
+TEAM_ALIASES = {
+    'Los Angeles Clippers': ['LA Clippers'],
+    'Montréal Canadiens': ['Montreal Canadiens'],
+    'Oakland Athletics': ['Athletics', 'Sacramento Athletics'],
+    'St. Louis Blues': ['St Louis Blues'],
+    'St. Louis Cardinals': ['St Louis Cardinals'],
+    'Utah Mammoth': ['Utah Hockey Club'],
+}
+
+_CANONICAL_NAMES = {alias: name for name, aliases in TEAM_ALIASES.items() for alias in aliases}
+
+
+def canonical_team_name(team_name):
+    """Name a team is stored under ('LA Clippers' -> 'Los Angeles Clippers')."""
+    return _CANONICAL_NAMES.get(team_name, team_name)
+
+
+def sport_for_team(team_name):
+    """League of a team (e.g. 'NBA'), or None if unknown."""
+    return TEAM_TO_SPORT.get(canonical_team_name(team_name))
@@ -22,6 +22,25 @@ class Config:
     ODDS_API_REGIONS = 'us,us2'  # US regions for American odds
     ODDS_API_ODDS_FORMAT = 'american'
 
+    # Response cache for heavy read endpoints (bytes of serialized JSON held)
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Seconds browsers may reuse filter lists before revalidating (ETag)
+    FILTER_CACHE_MAX_AGE = int(os.environ.get('FILTER_CACHE_MAX_AGE', 60))
+
+    # JSON responses at least this large are gzip/brotli compressed when accepted
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+    # POST /api/batch: most sub-requests per call, and how many run at once
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+
+    # POST /parlay/simulate: worker processes, most slips per run, and wall-clock budget
+    SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', min(os.cpu_count() or 1, 4)))
+    SIMULATION_MAX_SIMS = int(os.environ.get('SIMULATION_MAX_SIMS', 2000000))
+    SIMULATION_TIME_BUDGET_MS = int(os.environ.get('SIMULATION_TIME_BUDGET_MS', 2000))
+
 
 class ProductionConfig(Config):
     """Production configuration using MySQL."""
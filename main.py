@@ -5,6 +5,10 @@ Usage:
     python main.py              # Fetch data, then start web server
     python main.py --no-fetch   # Start web server only (skip data fetch)
     python main.py --fetch-only # Fetch data only (no server)
+
+A running server picks up syncs made by another process (e.g. --fetch-only
+from cron) through the sync log. Under gunicorn, use threaded or async
+workers so /api/stream connections don't each hold a worker process.
 """
 import argparse
 import subprocess
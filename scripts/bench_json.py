@@ -0,0 +1,112 @@
+"""
+Benchmark JSON serialization and compression for a large /compare payload.
+
+Builds a synthetic comparison response shaped like /api/compare (one row per
+player+stat with every book's line) and reports serialization time for the
+stdlib encoder and orjson, and bytes on the wire for identity, gzip and
+brotli (when installed).
+
+Usage:
+    python scripts/bench_json.py [--rows 50000] [--books 9] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path so we can import app modules
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.api.responses import brotli, orjson
+
+BOOKS = [
+    'DraftKings', 'FanDuel', 'BetMGM', 'Caesars', 'BetRivers',
+    'Bovada', 'Fliff', 'Hard Rock Bet', 'Pinnacle', 'PrizePicks', 'Underdog'
+]
+STATS = ['Points', 'Rebounds', 'Assists', 'Pass Yds', 'Rush Yds', 'Receptions', 'Anytime TD']
+TEAMS = ['Los Angeles Rams', 'Seattle Seahawks', 'Boston Celtics', 'Denver Nuggets', 'New York Rangers']
+
+
+def build_payload(rows, books):
+    """Synthetic /compare response with `rows` player+stat groups."""
+    rng = random.Random(7)
+    data = []
+    for i in range(rows):
+        points = rng.choice([None, round(rng.uniform(0.5, 300.5) * 2) / 2])
+        data.append({
+            'player_name': f'Player {i}',
+            'stat_type': rng.choice(STATS),
+            'matchup': f'{rng.choice(TEAMS)} @ {rng.choice(TEAMS)}',
+            'lines': [
+                {
+                    'book': book,
+                    'book_type': 'Sports Book',
+                    'designation': rng.choice(['Over', 'Under', 'Yes']),
+                    'points': points,
+                    'price': float(rng.choice([-150, -120, -115, -110, -105, 100, 110, 215])),
+                }
+                for book in BOOKS[:books]
+            ],
+        })
+    return {'data': data, 'meta': {'total_groups': rows, 'filters': {'books': None}}}
+
+
+def stdlib_dumps(payload):
+    # Same options Flask's default provider uses for jsonify
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()
+
+
+def orjson_dumps(payload):
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+def timed(func, arg, repeat):
+    """Best-of-`repeat` wall time in ms, and the last result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--books', type=int, default=9)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = build_payload(args.rows, args.books)
+    print(f"Payload: {args.rows:,} rows x {args.books} books\n")
+
+    print("Serialization")
+    ms, body = timed(stdlib_dumps, payload, args.repeat)
+    print(f"  stdlib json   {ms:8.1f} ms  {len(body):>12,} bytes")
+    if orjson is not None:
+        ms, fast = timed(orjson_dumps, payload, args.repeat)
+        print(f"  orjson        {ms:8.1f} ms  {len(fast):>12,} bytes")
+        body = fast
+    else:
+        print("  orjson        not installed")
+
+    print("\nOn the wire")
+    print(f"  identity      {'':>8}     {len(body):>12,} bytes")
+    for level in (1, 6):
+        ms, packed = timed(lambda b: gzip.compress(b, compresslevel=level, mtime=0), body, args.repeat)
+        print(f"  gzip -{level}       {ms:8.1f} ms  {len(packed):>12,} bytes  ({len(body) / len(packed):.1f}x)")
+    if brotli is not None:
+        for quality in (4, 6):
+            ms, packed = timed(lambda b: brotli.compress(b, quality=quality), body, args.repeat)
+            print(f"  brotli q{quality}     {ms:8.1f} ms  {len(packed):>12,} bytes  ({len(body) / len(packed):.1f}x)")
+    else:
+        print("  brotli        not installed")
+
+
+if __name__ == '__main__':
+    main()